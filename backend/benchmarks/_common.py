@@ -0,0 +1,111 @@
+"""
+ابزارهای مشترک بنچمارک‌ها
+
+هر بنچمارک یک پایگاه داده‌ی SQLite موقت می‌سازد و با درج دسته‌ای (executemany)
+حساب‌ها و اسناد مصنوعی را در آن می‌نویسد.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from services.ledger_service import LedgerService
+
+
+def make_engine(path=None, connect_args=None, **kwargs):
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="accountech-bench-"), "bench.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, **(connect_args or {})},
+        **kwargs
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def make_session(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(engine, n_transactions, n_accounts=300, start=datetime(2023, 3, 21),
+         days=730, batch=20000, rng_seed=42, amounts=None):
+    """
+    درج n_transactions ردیف تراکنش (دو ردیف در هر سند) روی n_accounts حساب
+    
+    amounts تابع rng -> مبلغ هر سند است؛ پیش‌فرض مضرب هزار ریال تا پنج میلیون.
+    """
+    rng = random.Random(rng_seed)
+    types = list(models.AccountType)
+    amount_fn = amounts or (lambda rng: rng.randint(1, 5000) * 1000)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Account), [
+            {
+                "id": i,
+                "code": str(1000 + i),
+                "name": f"حساب {i}",
+                "account_type": types[i % len(types)],
+                "balance": 0,
+                "is_active": True,
+            }
+            for i in range(1, n_accounts + 1)
+        ])
+
+    n_entries = n_transactions // 2
+    entry_id = 0
+    while entry_id < n_entries:
+        entries, transactions = [], []
+        for _ in range(min(batch, n_entries - entry_id)):
+            entry_id += 1
+            amount = amount_fn(rng)
+            debit_acc = rng.randint(1, n_accounts)
+            credit_acc = rng.randint(1, n_accounts)
+            entries.append({
+                "id": entry_id,
+                "entry_number": f"JE-{entry_id:06d}",
+                "date": start + timedelta(days=rng.randrange(days), seconds=rng.randrange(86400)),
+                "description": "سند آزمایشی",
+                "source": "manual",
+            })
+            transactions.append({
+                "journal_entry_id": entry_id,
+                "account_id": debit_acc,
+                "transaction_type": models.TransactionType.DEBIT,
+                "amount": amount,
+            })
+            transactions.append({
+                "journal_entry_id": entry_id,
+                "account_id": credit_acc,
+                "transaction_type": models.TransactionType.CREDIT,
+                "amount": amount,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(models.JournalEntry), entries)
+            conn.execute(insert(models.Transaction), transactions)
+    
+    db = make_session(engine)
+    try:
+        LedgerService.reconcile(db, fix=True)
+    finally:
+        db.close()
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
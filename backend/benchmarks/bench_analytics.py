@@ -0,0 +1,106 @@
+"""
+بنچمارک گزارش تحلیلی ماهانه: NumPy ستونی در برابر SQL معادل و حلقه‌ی پایتونی
+
+هر سه روش گردش ماهانه‌ی هر حساب و مانده‌ی تجمعی آن را روی کل تاریخچه
+می‌سازند (تقویم میلادی، تا SQL معادل با strftime قابل نوشتن باشد):
+
+- numpy: AnalyticsService.period_report (بارگذاری ستونی و جمع برداری)
+- sql: GROUP BY حساب و ماه با SUM(...) OVER برای مانده‌ی تجمعی
+- python: پیمایش ردیف به ردیف مانند get_ledger و جمع در dict
+
+نتیجه‌ی هر سه روش (خانه‌های با گردش غیر صفر) با هم مقایسه می‌شود.
+
+اجرا:
+    python benchmarks/bench_analytics.py [--sizes 1000000] [--accounts 300]
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import _common
+
+from sqlalchemy import text
+
+import models
+from services.analytics_service import AnalyticsService, load_columns
+
+SQL_MONTHLY = text("""
+    SELECT t.account_id, strftime('%Y-%m', j.date) AS month,
+           SUM(CASE WHEN t.transaction_type = 'DEBIT' THEN t.amount ELSE -t.amount END) AS change,
+           SUM(SUM(CASE WHEN t.transaction_type = 'DEBIT' THEN t.amount ELSE -t.amount END))
+               OVER (PARTITION BY t.account_id ORDER BY strftime('%Y-%m', j.date)) AS balance
+    FROM transactions t JOIN journal_entries j ON j.id = t.journal_entry_id
+    GROUP BY t.account_id, month
+""")
+
+
+def run_numpy(db):
+    report = AnalyticsService.period_report(db, "month", "account", calendar="gregorian")
+    codes = {account.code: account.id for account in db.query(models.Account.code, models.Account.id)}
+    return {
+        (codes[row.key], period.label): (change, balance)
+        for row in report.rows
+        for period, change, balance in zip(report.periods, row.changes, row.balances)
+        if change
+    }
+
+
+def run_sql(db):
+    return {
+        (row.account_id, row.month): (row.change, row.balance)
+        for row in db.execute(SQL_MONTHLY)
+        if row.change
+    }
+
+
+def run_python(db):
+    changes = defaultdict(int)
+    query = db.query(
+        models.Transaction.account_id, models.Transaction.transaction_type, models.Transaction.amount,
+        models.JournalEntry.date
+    ).join(models.JournalEntry).yield_per(10000)
+    for account_id, transaction_type, amount, date in query:
+        if transaction_type == models.TransactionType.DEBIT:
+            changes[(account_id, date.strftime('%Y-%m'))] += amount
+        else:
+            changes[(account_id, date.strftime('%Y-%m'))] -= amount
+    
+    result = {}
+    balances = defaultdict(int)
+    for (account_id, month), change in sorted(changes.items()):
+        balances[account_id] += change
+        if change:
+            result[(account_id, month)] = (change, balances[account_id])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'transactions':>12} {'load (s)':>9} {'numpy (s)':>10} {'sql (s)':>8} {'python (s)':>11} {'cells':>7} match")
+    for size in args.sizes:
+        engine = _common.make_engine()
+        _common.seed(engine, size, n_accounts=args.accounts)
+        db = _common.make_session(engine)
+        
+        t_load = _common.best_of(lambda: load_columns(db), args.repeat)
+        t_numpy = _common.best_of(lambda: run_numpy(db), args.repeat)
+        t_sql = _common.best_of(lambda: run_sql(db), args.repeat)
+        started = time.perf_counter()
+        python_result = run_python(db)
+        t_python = time.perf_counter() - started
+        
+        numpy_result, sql_result = run_numpy(db), run_sql(db)
+        match = numpy_result == sql_result == python_result
+        print(f"{size:>12,} {t_load:>9.2f} {t_numpy:>10.2f} {t_sql:>8.2f} {t_python:>11.2f} "
+              f"{len(numpy_result):>7,} {'yes' if match else 'NO'}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
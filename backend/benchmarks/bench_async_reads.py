@@ -0,0 +1,161 @@
+"""
+بنچمارک تأخیر endpointهای خواندنی با کلاینت‌های هم‌زمان
+
+همان endpointها یک بار به شکل قدیمی (def همگام با get_db که هر درخواست یک
+نخ threadpool را تا پایان کار پایگاه داده نگه می‌دارد) و یک بار از main.app
+(async با get_async_db) در یک پردازه‌ی uvicorn جدا اجرا می‌شوند و --clients
+کلاینت هم‌زمان آن‌ها را صدا می‌زنند. p50، p99، تعداد درخواست در ثانیه و
+خطاها (500 یا timeout) گزارش می‌شود.
+
+در شکل قدیمی بستن نشست get_db هم به نخ threadpool نیاز دارد؛ وقتی هر 40 نخ
+منتظر اتصال از استخر باشند، اتصالی آزاد نمی‌شود و درخواست‌ها با timeout
+استخر (30 ثانیه) شکست می‌خورند.
+
+اجرا:
+    python benchmarks/bench_async_reads.py [--clients 200] [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import _common
+
+PATHS = [
+    "/reports/trial-balance",
+    "/reports/dashboard",
+    "/journal/?limit=20",
+    "/accounts/?limit=50",
+]
+
+
+def legacy_app():
+    from typing import List
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    import schemas
+    from database import get_db
+    from routers.accounts import _accounts_offset_page
+    from routers.journal import _journal_offset_page
+    from services.accounting_service import AccountingService
+    
+    app = FastAPI()
+    
+    @app.get("/reports/trial-balance", response_model=List[schemas.TrialBalanceItem])
+    def get_trial_balance(db: Session = Depends(get_db)):
+        return AccountingService.get_trial_balance(db)
+    
+    @app.get("/reports/dashboard", response_model=schemas.DashboardStats)
+    def get_dashboard_stats(db: Session = Depends(get_db)):
+        return AccountingService.get_dashboard_stats(db)
+    
+    @app.get("/journal/", response_model=List[schemas.JournalEntryResponse])
+    def get_journal_entries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return _journal_offset_page(db, None, None, skip, limit)
+    
+    @app.get("/accounts/", response_model=List[schemas.AccountResponse])
+    def get_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return _accounts_offset_page(db, skip, limit)
+    
+    return app
+
+
+def serve(mode, port):
+    import uvicorn
+    if mode == "sync":
+        app = legacy_app()
+    else:
+        import main
+        app = main.app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def load(port, clients, requests):
+    import httpx
+    
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(PATHS[i % len(PATHS)])
+                    # مثلاً 500 به خاطر پر شدن استخر اتصال (QueuePool limit ... reached)
+                    failed = response.status_code >= 500
+                except httpx.TransportError:
+                    failed = True
+                latencies.append(time.perf_counter() - started)
+                errors += failed
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return sorted(latencies), errors, elapsed
+
+
+async def wait_ready(port, timeout=60):
+    import httpx
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                await client.get(f"http://127.0.0.1:{port}/accounts/?limit=1")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run(mode, port, env, args):
+    server = subprocess.Popen([sys.executable, __file__, "--serve", mode, "--port", str(port)], env=env,
+                              stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_ready(port))
+        asyncio.run(load(port, args.clients, args.clients))  # گرم کردن
+        latencies, errors, elapsed = asyncio.run(load(port, args.clients, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+    
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{mode:<6} p50={p50 * 1000:8.1f} ms  p99={p99 * 1000:8.1f} ms  {len(latencies) / elapsed:7.1f} req/s  "
+          f"errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+    
+    work_dir = tempfile.mkdtemp(prefix="accountech-bench-")
+    path = os.path.join(work_dir, "bench.db")
+    _common.seed(_common.make_engine(path), args.transactions)
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "STORAGE_ROOT": os.path.join(work_dir, "blobs"),
+        "OCR_ENGINE": "stub",
+    }
+    for mode in args.modes:
+        run(mode, args.port, env, args)
+
+
+if __name__ == "__main__":
+    main()
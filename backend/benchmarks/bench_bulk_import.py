@@ -0,0 +1,85 @@
+"""
+بنچمارک ورود دسته‌ای اسناد (JournalBulkImporter) روی SQLite در حالت WAL
+
+اجرا:
+    python benchmarks/bench_bulk_import.py [--entries 50000] [--chunk-size 1000] [--format jsonl]
+"""
+import argparse
+import io
+import json
+import random
+import time
+
+import _common
+from sqlalchemy import event
+
+from services.bulk_import_service import JournalBulkImporter, parse_csv, parse_jsonl
+
+
+def build_jsonl(n_entries, n_accounts, rng):
+    buffer = io.StringIO()
+    for i in range(n_entries):
+        amount = rng.randint(1, 5000) * 1000
+        buffer.write(json.dumps({
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00",
+            "description": f"سند انتقالی {i}",
+            "reference": f"OLD-{i}",
+            "transactions": [
+                {"account_code": str(1000 + rng.randint(1, n_accounts)), "transaction_type": "debit", "amount": amount},
+                {"account_code": str(1000 + rng.randint(1, n_accounts)), "transaction_type": "credit", "amount": amount},
+            ]
+        }, ensure_ascii=False))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def build_csv(n_entries, n_accounts, rng):
+    buffer = io.StringIO()
+    buffer.write("entry,date,description,account_code,transaction_type,amount\n")
+    for i in range(n_entries):
+        amount = rng.randint(1, 5000) * 1000
+        date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        buffer.write(f"OLD-{i},{date},سند انتقالی,{1000 + rng.randint(1, n_accounts)},debit,{amount}\n")
+        buffer.write(f"OLD-{i},{date},سند انتقالی,{1000 + rng.randint(1, n_accounts)},credit,{amount}\n")
+    buffer.seek(0)
+    return buffer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    args = parser.parse_args()
+    
+    engine = _common.make_engine()
+    
+    @event.listens_for(engine, "connect")
+    def set_wal(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    _common.seed(engine, 0, n_accounts=args.accounts)
+    db = _common.make_session(engine)
+    
+    rng = random.Random(7)
+    if args.format == "csv":
+        parsed = parse_csv(build_csv(args.entries, args.accounts, rng))
+    else:
+        parsed = parse_jsonl(build_jsonl(args.entries, args.accounts, rng))
+    
+    started = time.perf_counter()
+    result = JournalBulkImporter(db, args.chunk_size).run(parsed)
+    elapsed = time.perf_counter() - started
+    
+    print(f"format={args.format} entries={result.imported:,} failed={result.failed} "
+          f"chunk={args.chunk_size} time={elapsed:.2f}s rate={result.imported / elapsed:,.0f} entries/s")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+بنچمارک آمار داشبورد
+
+روش قدیمی (دو شمارش، دو SUM جدا و بارگذاری تنبل آرتیکل‌های ده سند اخیر)،
+محاسبه‌ی تازه (یک کوئری برای جمع‌ها و selectinload) و پاسخ از کش با نسخه‌ی
+داده‌ی ثابت مقایسه می‌شوند؛ زمان هر فراخوانی و تعداد کوئری‌ها گزارش می‌شود.
+
+اجرا:
+    python benchmarks/bench_dashboard.py [--transactions 200000]
+"""
+import argparse
+
+import _common
+from sqlalchemy import event, func
+
+import models
+import schemas
+from services.accounting_service import AccountingService, dashboard_cache
+
+
+def legacy_dashboard_stats(db):
+    total_entries = db.query(func.count(models.JournalEntry.id)).scalar()
+    total_accounts = db.query(func.count(models.Account.id)).filter(
+        models.Account.is_active == True
+    ).scalar()
+    total_debit = db.query(func.sum(models.Transaction.amount)).filter(
+        models.Transaction.transaction_type == models.TransactionType.DEBIT
+    ).scalar() or 0.0
+    total_credit = db.query(func.sum(models.Transaction.amount)).filter(
+        models.Transaction.transaction_type == models.TransactionType.CREDIT
+    ).scalar() or 0.0
+    recent_entries = db.query(models.JournalEntry).order_by(
+        models.JournalEntry.created_at.desc()
+    ).limit(10).all()
+    return schemas.DashboardStats(
+        total_entries=total_entries,
+        total_accounts=total_accounts,
+        total_debit=total_debit,
+        total_credit=total_credit,
+        balance_difference=total_debit - total_credit,
+        recent_entries=[schemas.JournalEntryResponse.from_orm(e) for e in recent_entries]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--hits", type=int, default=2000)
+    args = parser.parse_args()
+    
+    engine = _common.make_engine()
+    _common.seed(engine, args.transactions)
+    queries = {"count": 0}
+    event.listen(engine, "before_cursor_execute", lambda *_: queries.__setitem__("count", queries["count"] + 1))
+    
+    db = _common.make_session(engine)
+    try:
+        def measure(name, fn, repeat=1):
+            queries["count"] = 0
+            elapsed = _common.best_of(lambda: [fn(db) for _ in range(repeat)]) / repeat
+            print(f"{name:<10} {elapsed * 1000:9.3f} ms/call  queries/call={queries['count'] / (3 * repeat):.0f}")
+        
+        def uncached(db):
+            dashboard_cache.clear()
+            AccountingService.get_dashboard_stats(db)
+        
+        measure("legacy", legacy_dashboard_stats)
+        measure("uncached", uncached)
+        AccountingService.get_dashboard_stats(db)
+        measure("cache hit", AccountingService.get_dashboard_stats, args.hits)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+آزمون بار شماره‌گذاری اسناد با کلاینت‌های هم‌زمان
+
+هر کلاینت در یک نخ جداگانه با نشست (Session) خودش سند ثبت می‌کند. روش قدیمی
+(خواندن آخرین سند با ORDER BY id DESC) و شمارنده‌ی number_sequences مقایسه
+می‌شوند: تعداد برخورد روی entry_number یکتا و تعداد کوئری‌های خواندن از
+journal_entries در هر درج شمرده می‌شود.
+
+اجرا:
+    python benchmarks/bench_entry_numbers.py [--clients 50] [--entries 20] [--fiscal-year]
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+import _common
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+import models
+from config import settings
+from services.sequence_service import EntryNumberAllocator
+
+
+def legacy_entry_number(db):
+    last_entry = db.query(models.JournalEntry).order_by(models.JournalEntry.id.desc()).first()
+    if last_entry:
+        last_number = int(last_entry.entry_number.split('-')[-1])
+        return f"JE-{last_number + 1:06d}"
+    return "JE-000001"
+
+
+def allocator_entry_number(db):
+    return EntryNumberAllocator.reserve(db, datetime.now())[0]
+
+
+def run(engine, generate, clients, entries_per_client):
+    scans = []
+    collisions = []
+    numbers = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+    
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "journal_entries" in statement:
+            with lock:
+                scans.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", on_execute)
+    
+    def client():
+        db = _common.make_session(engine)
+        barrier.wait()
+        try:
+            for _ in range(entries_per_client):
+                try:
+                    number = generate(db)
+                    db.add(models.JournalEntry(
+                        entry_number=number,
+                        date=datetime.now(),
+                        description="آزمون بار",
+                        source="manual"
+                    ))
+                    db.commit()
+                    with lock:
+                        numbers.append(number)
+                except IntegrityError:
+                    db.rollback()
+                    with lock:
+                        collisions.append(1)
+        finally:
+            db.close()
+    
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    event.remove(engine, "before_cursor_execute", on_execute)
+    return numbers, len(collisions), len(scans), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=20, help="تعداد سند برای هر کلاینت")
+    parser.add_argument("--fiscal-year", action="store_true", help="پیشوند سال مالی (JE-1403-000001)")
+    args = parser.parse_args()
+    
+    settings.ENTRY_NUMBER_PER_FISCAL_YEAR = args.fiscal_year
+    
+    for label, generate in (("legacy", legacy_entry_number), ("sequence", allocator_entry_number)):
+        engine = _common.make_engine(connect_args={"timeout": 60})
+        # حالت WAL در فایل پایگاه داده ماندگار است؛ تغییر آن هنگام اتصال هم‌زمان قفل می‌گیرد
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        
+        numbers, collisions, scans, elapsed = run(engine, generate, args.clients, args.entries)
+        attempts = args.clients * args.entries
+        duplicates = len(numbers) - len(set(numbers))
+        print(f"{label:9s} clients={args.clients} inserted={len(numbers)}/{attempts} "
+              f"collisions={collisions} duplicates={duplicates} "
+              f"journal_entries reads/insert={scans / attempts:.2f} time={elapsed:.2f}s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
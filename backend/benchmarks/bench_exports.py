@@ -0,0 +1,99 @@
+"""
+بنچمارک خروجی روزنامه: ساختن کل پاسخ JSON در حافظه در برابر نوشتن جریانی
+CSV، XLSX و Parquet در فایل (services.export_service)
+
+اوج حافظه‌ی پایتون با tracemalloc و اوج حافظه‌ی Arrow (که tracemalloc آن را
+نمی‌بیند) با یک memory pool جدا برای هر اندازه‌گیری گزارش می‌شود؛ خروجی‌های
+جریانی باید با بزرگ شدن روزنامه تقریباً ثابت بمانند.
+
+اجرا:
+    python benchmarks/bench_exports.py [--sizes 100000 500000] [--formats csv xlsx parquet]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import _common
+
+from services.export_service import ExportParams, REPORTS, prepare_export
+
+
+try:
+    import pyarrow as pa
+    BASE_POOL = pa.default_memory_pool()
+except ImportError:
+    pa = None
+
+
+def measure(fn):
+    # pool جدا برای هر اندازه‌گیری تا اوج حافظه‌ی Arrow از اندازه‌گیری قبلی نماند
+    pool = pa.proxy_memory_pool(BASE_POOL) if pa else None
+    if pool is not None:
+        pa.set_memory_pool(pool)
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        count = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if pool is not None:
+            pa.set_memory_pool(BASE_POOL)
+    arrow_peak = pool.max_memory() if pool is not None else 0
+    return count, elapsed, peak / 1024 / 1024, arrow_peak / 1024 / 1024
+
+
+def build_json(db, params):
+    """شکل قدیمی: همه‌ی ردیف‌ها در یک فهرست و سپس یک رشته‌ی JSON"""
+    export = REPORTS["journal"]
+    names = [column.name for column in export.columns]
+    rows = [dict(zip(names, row)) for row in export.rows(db, params)]
+    json.dumps(rows, default=str, ensure_ascii=False)
+    return len(rows)
+
+
+def write_file(db, params, format, path):
+    export, writer = prepare_export("journal", format, params)
+    with open(path, "wb") as sink:
+        return writer.write(export.columns, export.rows(db, params), sink)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "xlsx", "parquet"],
+                        default=["csv", "xlsx", "parquet"])
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="accountech-bench-")
+    params = ExportParams()
+    print(f"{'transactions':>12} {'output':>8} {'rows':>8} {'time (s)':>9} {'peak MiB':>9} {'arrow MiB':>10} {'file MiB':>9}")
+    for size in args.sizes:
+        engine = _common.make_engine()
+        _common.seed(engine, size)
+        db = _common.make_session(engine)
+        
+        rows, elapsed, peak, _ = measure(lambda: build_json(db, params))
+        print(f"{size:>12,} {'json':>8} {rows:>8,} {elapsed:>9.2f} {peak:>9.1f} {'-':>10} {'-':>9}")
+        
+        for format in args.formats:
+            path = os.path.join(work_dir, f"journal.{format}")
+            try:
+                rows, elapsed, peak, arrow_peak = measure(lambda: write_file(db, params, format, path))
+            except ValueError as e:
+                print(f"{size:>12,} {format:>8} skipped: {e}")
+                continue
+            file_size = os.path.getsize(path) / 1024 / 1024
+            print(f"{size:>12,} {format:>8} {rows:>8,} {elapsed:>9.2f} {peak:>9.1f} {arrow_peak:>10.1f} {file_size:>9.1f}")
+            os.remove(path)
+        
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
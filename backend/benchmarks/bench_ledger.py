@@ -0,0 +1,48 @@
+"""
+بنچمارک حافظه‌ی دفتر حساب: ساختن فهرست کامل LedgerItem در برابر جریان
+AccountingService.iter_ledger
+
+اجرا:
+    python benchmarks/bench_ledger.py [--sizes 100000 500000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import _common
+
+from services.accounting_service import AccountingService
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    args = parser.parse_args()
+    
+    print(f"{'transactions':>12} {'rows':>8} {'list (s)':>9} {'list MiB':>9} {'stream (s)':>10} {'stream MiB':>10}")
+    for size in args.sizes:
+        engine = _common.make_engine()
+        _common.seed(engine, size, n_accounts=4)
+        db = _common.make_session(engine)
+        
+        rows, t_list, m_list = measure(lambda: len(AccountingService.get_ledger(db, 1)))
+        _, t_stream, m_stream = measure(
+            lambda: sum(1 for _ in AccountingService.iter_ledger(db, 1))
+        )
+        print(f"{size:>12,} {rows:>8,} {t_list:>9.2f} {m_list:>9.1f} {t_stream:>10.2f} {m_stream:>10.1f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+بنچمارک جمع مبالغ: ستون FLOAT قدیمی در برابر BIGINT ریالی
+
+همان آرتیکل‌ها یک بار در جدول transactions (BIGINT) و یک بار در کپی
+transactions_float با ستون FLOAT (تعریف قدیمی) هستند. زمان تراز گروه‌بندی‌شده
+(جمع شرطی بدهکار/بستانکار به تفکیک حساب) و جمع کل، و اختلاف نتیجه‌ی FLOAT با
+جمع دقیق صحیح گزارش می‌شود. مبالغ تا --max-amount ریال با دقت یک ریال‌اند تا
+جمع کل از 2^53 (بزرگ‌ترین عدد صحیحی که double دقیق نگه می‌دارد) بگذرد.
+
+اجرا:
+    python benchmarks/bench_money_aggregation.py [--transactions 1000000] [--max-amount 50000000000]
+"""
+import argparse
+
+import _common
+from sqlalchemy import select, text
+
+from services import trial_balance
+
+# تعریف قدیمی جدول transactions با همان ستون‌ها، تا عرض ردیف‌ها یکسان باشد
+FLOAT_TABLE = """
+CREATE TABLE transactions_float (
+    id INTEGER PRIMARY KEY,
+    journal_entry_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    transaction_type VARCHAR(6) NOT NULL,
+    amount FLOAT NOT NULL,
+    description TEXT,
+    created_at DATETIME
+)
+"""
+
+# همان SQL که services.trial_balance برای هر دو تعریف می‌سازد (else_=0.0 پیش از تبدیل)
+TOTALS = """
+SELECT account_id,
+       SUM(CASE WHEN transaction_type = 'DEBIT' THEN amount ELSE {zero} END) AS debit,
+       SUM(CASE WHEN transaction_type = 'CREDIT' THEN amount ELSE {zero} END) AS credit
+FROM {table} GROUP BY account_id
+"""
+QUERIES = {
+    "float": (text(TOTALS.format(table="transactions_float", zero="0.0")),
+              text("SELECT SUM(amount) FROM transactions_float")),
+    "bigint": (text(TOTALS.format(table="transactions", zero="0")),
+               text("SELECT SUM(amount) FROM transactions")),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--max-amount", type=int, default=50_000_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    engine = _common.make_engine()
+    _common.seed(engine, args.transactions, n_accounts=args.accounts,
+                 amounts=lambda rng: rng.randint(1, args.max_amount))
+    with engine.begin() as conn:
+        conn.execute(text(FLOAT_TABLE))
+        conn.execute(text("INSERT INTO transactions_float SELECT * FROM transactions"))
+        conn.execute(text("CREATE INDEX ix_transactions_float_account_id ON transactions_float (account_id)"))
+    
+    db = _common.make_session(engine)
+    try:
+        totals = trial_balance.get_backend(db).totals_subquery()
+        exact = {
+            row.account_id: (row.debit, row.credit)
+            for row in db.execute(select(totals.c.account_id, totals.c.debit, totals.c.credit))
+        }
+        legacy = {row.account_id: (row.debit, row.credit) for row in db.execute(QUERIES["float"][0])}
+        errors = [
+            abs(int(legacy[account_id][i]) - exact[account_id][i])
+            for account_id in exact for i in (0, 1)
+        ]
+        exact_total = db.execute(QUERIES["bigint"][1]).scalar()
+        legacy_total = db.execute(QUERIES["float"][1]).scalar()
+        
+        print(f"{args.transactions:,} transactions, grand total {exact_total:,} rials "
+              f"({'above' if exact_total > 2 ** 53 else 'below'} 2^53)")
+        print(f"float drift: {sum(1 for e in errors if e)} of {len(errors)} account sums differ "
+              f"(max {max(errors):,} rials), grand total off by {abs(int(legacy_total) - exact_total):,} rials")
+        
+        for i, name in enumerate(("trial balance", "grand total")):
+            t_float = _common.best_of(lambda: db.execute(QUERIES["float"][i]).all(), args.repeat)
+            t_int = _common.best_of(lambda: db.execute(QUERIES["bigint"][i]).all(), args.repeat)
+            print(f"{name:<14} float {t_float * 1000:8.1f} ms  bigint {t_int * 1000:8.1f} ms  "
+                  f"{t_float / t_int:5.2f}x")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
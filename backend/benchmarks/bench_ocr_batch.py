@@ -0,0 +1,66 @@
+"""
+بنچمارک مقیاس‌پذیری OCR دسته‌ای با تعداد کارگرها
+
+پیکره‌ی مصنوعی فیش با استخر دسته‌ها (services.ocr_jobs.submit_batch) و
+تعداد کارگرهای مختلف پردازش و زمان کل و شتاب نسبت به یک کارگر گزارش می‌شود.
+زمان راه‌اندازی کارگرها (spawn و بارگذاری موتور) جدا سنجیده می‌شود.
+
+اجرا:
+    python benchmarks/bench_ocr_batch.py [--count 40] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+
+import receipt_corpus
+
+from config import settings
+from services import ocr_jobs
+
+
+def run(paths, workers):
+    settings.OCR_BATCH_WORKERS = workers
+    ocr_jobs.shutdown_queue()
+    
+    # گرم کردن: هر کارگر یک بار ساخته شود
+    started = time.perf_counter()
+    wait(ocr_jobs.submit_batch([(paths[0], False)] * workers))
+    warmup = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    futures = ocr_jobs.submit_batch([(path, True) for path in paths])
+    results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    
+    ocr_jobs.shutdown_queue()
+    return warmup, elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "accountech-receipts"))
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    
+    manifest = receipt_corpus.build(args.corpus, args.count)
+    paths = [os.path.join(args.corpus, item["file"]) for item in manifest]
+    
+    print(f"engine={settings.OCR_ENGINE} preset={settings.OCR_PREPROCESS_PRESET} cpus={os.cpu_count()}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        warmup, elapsed, results = run(paths, workers)
+        baseline = baseline or elapsed
+        correct = sum(
+            1 for (_, parsed, _), item in zip(results, manifest)
+            if parsed.get("amount") is not None and abs(parsed["amount"] - item["amount"]) < 0.5
+        )
+        print(f"workers={workers:2d} warmup={warmup:5.2f}s time={elapsed:6.2f}s "
+              f"{len(paths) / elapsed:6.2f} images/s speedup={baseline / elapsed:4.2f}x "
+              f"accuracy={100 * correct / len(paths):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
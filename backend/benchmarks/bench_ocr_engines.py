@@ -0,0 +1,79 @@
+"""
+بنچمارک توان عملیاتی موتورهای OCR (تصویر در ثانیه)
+
+تصویرهای پیکره‌ی مصنوعی یک بار با پیش‌تنظیم داده‌شده پیش‌پردازش می‌شوند و
+سپس فقط زمان تشخیص متن سنجیده می‌شود:
+    
+    tesseract        pytesseract؛ یک پردازه‌ی tesseract برای هر تصویر
+    tesserocr-cold   handle تازه‌ی libtesseract برای هر تصویر (بارگذاری دوباره‌ی traineddata)
+    tesserocr        یک handle ماندگار برای همه‌ی تصویرها
+
+اجرا:
+    python benchmarks/bench_ocr_engines.py [--count 20] [--preset balanced]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import receipt_corpus
+from PIL import Image
+
+from services.image_preprocessing import PreprocessPreset, preprocess
+from services.ocr_service import OCRService, TesseractEngine, TesserocrEngine
+
+
+class ColdTesserocrEngine:
+    def recognize(self, image):
+        engine = TesserocrEngine()
+        try:
+            return engine.recognize(image)
+        finally:
+            engine.close()
+
+
+ENGINES = {
+    "tesseract": TesseractEngine,
+    "tesserocr-cold": ColdTesserocrEngine,
+    "tesserocr": TesserocrEngine,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "accountech-receipts"))
+    parser.add_argument("--preset", default="balanced")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    args = parser.parse_args()
+    
+    manifest = receipt_corpus.build(args.corpus, args.count)
+    preset = PreprocessPreset.named(args.preset)
+    images = []
+    for item in manifest:
+        with Image.open(os.path.join(args.corpus, item["file"])) as image:
+            images.append((preprocess(image, preset), item["amount"]))
+    
+    parser_service = OCRService("stub")
+    for name in args.engines.split(","):
+        try:
+            started = time.perf_counter()
+            engine = ENGINES[name]()
+            init = time.perf_counter() - started
+            
+            correct = 0
+            started = time.perf_counter()
+            for image, expected in images:
+                amount = parser_service.parse_receipt(engine.recognize(image)).get("amount")
+                correct += amount is not None and abs(amount - expected) < 0.5
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"{name:15s} unavailable: {e}")
+            continue
+        
+        print(f"{name:15s} init={init * 1000:6.0f}ms  {len(images) / elapsed:6.2f} images/s  "
+              f"{elapsed / len(images) * 1000:6.0f}ms/image  accuracy={100 * correct / len(images):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
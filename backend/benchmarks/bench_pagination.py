@@ -0,0 +1,62 @@
+"""
+بنچمارک صفحه‌بندی فهرست اسناد
+
+زمان خواندن یک صفحه از /journal/ در عمق‌های مختلف با OFFSET/LIMIT و با کرسر
+keyset روی (date، id). کرسر هر عمق پیش از زمان‌گیری از روی آخرین ردیف
+صفحه‌ی قبل ساخته می‌شود.
+
+اجرا:
+    python benchmarks/bench_pagination.py [--transactions 400000] [--limit 50]
+"""
+import argparse
+
+import _common
+
+import models
+from pagination import encode_cursor, decode_keyset_cursor, keyset_page
+from services.accounting_service import AccountingService
+
+
+def offset_page(db, page, limit):
+    return AccountingService.journal_entries(db).order_by(
+        models.JournalEntry.date.desc()
+    ).offset(page * limit).limit(limit).all()
+
+
+def cursor_for(db, page, limit):
+    if page == 0:
+        return None
+    date, entry_id = db.query(models.JournalEntry.date, models.JournalEntry.id).order_by(
+        models.JournalEntry.date.desc(), models.JournalEntry.id.desc()
+    ).offset(page * limit - 1).limit(1).one()
+    return encode_cursor(date, entry_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=400_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    
+    engine = _common.make_engine()
+    _common.seed(engine, args.transactions)
+    entries = args.transactions // 2
+    pages = [0, 100, 1000, entries // args.limit // 2, entries // args.limit - 1]
+    
+    db = _common.make_session(engine)
+    try:
+        for page in pages:
+            cursor = decode_keyset_cursor(cursor_for(db, page, args.limit))
+            offset_time = _common.best_of(lambda: offset_page(db, page, args.limit))
+            keyset_time = _common.best_of(lambda: keyset_page(
+                AccountingService.journal_entries(db), models.JournalEntry.date, models.JournalEntry.id,
+                cursor, args.limit, descending=True
+            ))
+            print(f"page {page:>6}  offset {offset_time * 1000:8.2f} ms  keyset {keyset_time * 1000:6.2f} ms")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
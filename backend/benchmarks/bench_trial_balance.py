@@ -0,0 +1,75 @@
+"""
+بنچمارک تراز آزمایشی: پیاده‌سازی قدیمی (دو کوئری SUM برای هر حساب) در برابر
+موتور تک‌کوئری services.trial_balance و مانده‌های نگهداری‌شده در accounts
+
+اجرا:
+    python benchmarks/bench_trial_balance.py [--sizes 10000 100000 1000000] [--accounts 3000]
+"""
+import argparse
+from datetime import datetime
+
+import _common
+from sqlalchemy import func, and_
+
+import models
+from services.accounting_service import AccountingService
+from services import trial_balance
+
+
+def legacy_trial_balance(db):
+    accounts = db.query(models.Account).filter(models.Account.is_active == True).all()
+    result = []
+    for account in accounts:
+        debit_sum = db.query(func.sum(models.Transaction.amount)).filter(
+            and_(
+                models.Transaction.account_id == account.id,
+                models.Transaction.transaction_type == models.TransactionType.DEBIT
+            )
+        ).scalar() or 0.0
+        credit_sum = db.query(func.sum(models.Transaction.amount)).filter(
+            and_(
+                models.Transaction.account_id == account.id,
+                models.Transaction.transaction_type == models.TransactionType.CREDIT
+            )
+        ).scalar() or 0.0
+        result.append((account.code, debit_sum, credit_sum))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--accounts", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'transactions':>12} {'legacy (s)':>12} {'grouped (s)':>12} {'as_of (s)':>12} "
+          f"{'stored (s)':>12} {'speedup':>8}")
+    for size in args.sizes:
+        engine = _common.make_engine()
+        _common.seed(engine, size, n_accounts=args.accounts)
+        db = _common.make_session(engine)
+        
+        backend = trial_balance.get_backend(db)
+        grouped_query = backend.build_query()
+        
+        legacy = {row[0]: (row[1], row[2]) for row in legacy_trial_balance(db)}
+        for rows in (db.execute(grouped_query).all(), db.execute(backend.stored_totals_query()).all()):
+            assert legacy.keys() == {row.code for row in rows}
+            assert all(abs(legacy[row.code][0] - row.debit) < 1e-6 and abs(legacy[row.code][1] - row.credit) < 1e-6
+                       for row in rows)
+        
+        t_legacy = _common.best_of(lambda: legacy_trial_balance(db), args.repeat)
+        t_grouped = _common.best_of(lambda: db.execute(grouped_query).all(), args.repeat)
+        t_as_of = _common.best_of(
+            lambda: AccountingService.get_trial_balance(db, as_of=datetime(2024, 3, 20)), args.repeat
+        )
+        t_stored = _common.best_of(lambda: AccountingService.get_trial_balance(db), args.repeat)
+        print(f"{size:>12,} {t_legacy:>12.3f} {t_grouped:>12.3f} {t_as_of:>12.3f} "
+              f"{t_stored:>12.3f} {t_legacy / t_grouped:>7.1f}x")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+بنچمارک حافظه‌ی ذخیره‌ی فایل بارگذاری‌شده
+
+اوج حافظه‌ی پایتون (tracemalloc) برای روش قدیمی (خواندن کل فایل با یک read و
+نوشتن آن) و uploads.spool (کپی تکه‌تکه با hash که store_stream پیش از سپردن
+فایل به ذخیره‌ساز انجام می‌دهد) در اندازه‌های مختلف.
+
+اجرا:
+    python benchmarks/bench_uploads.py [--sizes 10 50 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import _common
+
+from uploads import spool
+
+
+def legacy_store(stream, directory, max_size):
+    path = os.path.join(directory, "target.bin")
+    with open(path, 'wb') as f:
+        f.write(stream.read())
+    return path
+
+
+def streaming_store(stream, directory, max_size):
+    return spool(stream, directory, max_size)[0]
+
+
+def measure(store, source, directory):
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(source, 'rb') as stream:
+        target = store(stream, directory, 1 << 40)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.remove(target)
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="مگابایت")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="accountech-bench-")
+    for size in args.sizes:
+        source = os.path.join(work_dir, "source.bin")
+        with open(source, 'wb') as f:
+            for _ in range(size):
+                f.write(os.urandom(1024 * 1024))
+        
+        for name, store in (("legacy", legacy_store), ("streaming", streaming_store)):
+            peak, elapsed = measure(store, source, work_dir)
+            print(f"{size:>5} MB  {name:<10} peak={peak / (1024 * 1024):8.1f} MB  {elapsed:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+بنچمارک ثبت دسته‌ای دستورهای صوتی
+
+همان دستورها یک بار مثل چند درخواست پشت‌سرهم POST /voice/process (هر دستور
+تراکنش و commit خودش) و یک بار با VoiceBatchService (یک تراکنش یا
+تراکنش‌های chunk_size تایی) روی پایگاه داده‌ی SQLite تازه ثبت می‌شوند و
+زمان، تعداد کوئری‌ها و تعداد commit گزارش می‌شود.
+
+اجرا:
+    python benchmarks/bench_voice_batch.py [--commands 500] [--chunk-size 100]
+"""
+import argparse
+import time
+
+import _common
+from sqlalchemy import event
+
+import bench_voice_parser
+from services.accounting_service import AccountingService
+from services.voice_batch_service import VoiceBatchService
+from services.voice_service import VoiceService
+
+
+def run(texts, post):
+    engine = _common.make_engine()
+    counts = {"queries": 0, "commits": 0}
+    
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["queries"] += 1
+    
+    def on_commit(conn):
+        counts["commits"] += 1
+    
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    
+    db = _common.make_session(engine)
+    try:
+        started = time.perf_counter()
+        post(db, texts)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+        engine.dispose()
+    return elapsed, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    args = parser.parse_args()
+    
+    voice = VoiceService()
+    texts = [text for text, _ in bench_voice_parser.build(args.commands)]
+    
+    def sequential(db, texts):
+        for text in texts:
+            AccountingService.create_journal_entry_from_voice(db, voice.parse_voice_command(text), text)
+    
+    modes = [
+        ("sequential", sequential),
+        ("batch", lambda db, texts: VoiceBatchService(db, voice).run(texts)),
+        (f"batch chunk={args.chunk_size}",
+         lambda db, texts: VoiceBatchService(db, voice, args.chunk_size).run(texts)),
+    ]
+    for name, post in modes:
+        elapsed, counts = run(texts, post)
+        print(f"{name:<18} {elapsed:7.3f}s  {len(texts) / elapsed:8.0f} commands/s  "
+              f"queries={counts['queries']:,} commits={counts['commits']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+بررسی N+1 در endpointهای فهرستی
+
+هر endpoint با دو اندازه‌ی صفحه روی یک پایگاه داده‌ی SQLite موقت فراخوانده
+می‌شود و تعداد کوئری‌های هر درخواست شمرده می‌شود. اگر تعداد کوئری با بزرگ
+شدن صفحه بیشتر شود (مثلاً بارگذاری تنبل آرتیکل‌های هر سند هنگام ساخت
+JournalEntryResponse)، اسکریپت با کد 1 خارج می‌شود؛ برای اجرا در CI.
+
+اجرا:
+    python benchmarks/check_query_counts.py [--small 5] [--large 50]
+"""
+import argparse
+import os
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="accountech-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORK_DIR, 'queries.db')}")
+os.environ.setdefault("STORAGE_ROOT", os.path.join(WORK_DIR, "blobs"))
+os.environ.setdefault("OCR_ENGINE", "stub")
+
+import _common
+from sqlalchemy import event, insert
+
+import models
+from database import engine, get_async_engine
+
+# (مسیر، پارامتر اندازه‌ی صفحه)
+ENDPOINTS = [
+    ("/journal/", "limit"),
+    ("/accounts/", "limit"),
+    ("/ocr/receipts", "limit"),
+    ("/reports/ledger/1/page", "limit"),
+]
+
+
+class QueryCounter:
+    """شمارش کوئری‌های اجراشده روی موتورها (همگام و async) در یک بلوک with"""
+    
+    def __init__(self, *engines):
+        self.engines = engines
+        self.count = 0
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+    
+    def __enter__(self):
+        self.count = 0
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+def seed_receipts(count):
+    with engine.begin() as conn:
+        conn.execute(insert(models.Receipt), [
+            {"image_path": f"receipts/{i}", "extracted_text": "فیش", "amount": 1000, "is_processed": False}
+            for i in range(count)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=50)
+    args = parser.parse_args()
+    
+    from fastapi.testclient import TestClient
+    import main as app_module
+    
+    _common.seed(engine, args.large * 20, n_accounts=args.large * 2)
+    seed_receipts(args.large * 2)
+    
+    failed = []
+    with TestClient(app_module.app) as client:
+        for path, size_param in ENDPOINTS:
+            counts = []
+            for size in (args.small, args.large):
+                with QueryCounter(engine, get_async_engine().sync_engine) as counter:
+                    response = client.get(path, params={size_param: size})
+                response.raise_for_status()
+                counts.append(counter.count)
+            
+            grows = counts[1] > counts[0]
+            print(f"{path:<28} {size_param}={args.small}: {counts[0]:>3} queries  "
+                  f"{size_param}={args.large}: {counts[1]:>3} queries  {'FAIL' if grows else 'ok'}")
+            if grows:
+                failed.append(path)
+    
+    if failed:
+        print(f"query count grows with page size: {', '.join(failed)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+پیکره‌ی مصنوعی فیش برای بنچمارک OCR
+
+فیش‌ها با بذر ثابت ساخته می‌شوند، پس پیکره در هر اجرا یکسان است و نیازی به
+نگهداری تصویرها در مخزن نیست. هر فیش مثل عکس گوشی روی زمینه‌ی تیره، با کجی،
+نور ناهموار، نویز و گاهی چرخش EXIF ذخیره می‌شود. مبلغ کل در manifest.json است.
+
+اجرا:
+    python benchmarks/receipt_corpus.py [--count 40] [--out /tmp/receipts]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+import _common  # noqa: F401  (مسیر backend)
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+VENDORS = ["NOVIN MARKET", "TEHRAN BOOK STORE", "PARS PHARMACY", "ARIA CAFE", "KOUROSH HYPERSTAR"]
+ITEMS = ["Milk", "Bread", "Coffee", "Notebook", "Pen", "Rice 5kg", "Tea", "Cheese", "Water", "Soap"]
+EXIF_ORIENTATION = 0x0112
+
+
+def load_font(size):
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def render_receipt(rng, font):
+    """تصویر تمیز فیش (سفید، ۸۰ میلی‌متر در ۳۰۰ DPI) و مبلغ کل"""
+    items = [(rng.choice(ITEMS), rng.randint(1, 400) * 1000) for _ in range(rng.randint(3, 8))]
+    total = sum(price for _, price in items)
+    lines = [
+        rng.choice(VENDORS),
+        f"Date: 14{rng.randint(0, 3):02d}/{rng.randint(1, 12):02d}/{rng.randint(1, 29):02d}",
+        "-" * 28,
+        *[f"{name:<14}{price:>14,}" for name, price in items],
+        "-" * 28,
+        f"Total: {total:,} Rials",
+    ]
+    
+    line_height = int(font.size * 1.5)
+    image = Image.new("L", (945, 80 + line_height * len(lines)), 250)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + i * line_height), line, fill=20, font=font)
+    return image, float(total)
+
+
+def photograph(rng, receipt, size=(4000, 3000)):
+    """قرار دادن فیش روی زمینه با مقیاس، کجی، نور ناهموار و نویز شبیه عکس گوشی"""
+    scale = size[1] * rng.uniform(0.55, 0.8) / receipt.height
+    receipt = receipt.resize((int(receipt.width * scale), int(receipt.height * scale)), Image.BICUBIC)
+    receipt = receipt.rotate(rng.uniform(-4, 4), resample=Image.BICUBIC, expand=True, fillcolor=0)
+    
+    background = Image.new("L", size, rng.randint(40, 90))
+    mask = receipt.point(lambda v: 255 if v > 0 else 0)
+    x = rng.randint(0, max(0, size[0] - receipt.width))
+    y = rng.randint(0, max(0, size[1] - receipt.height))
+    background.paste(receipt, (x, y), mask)
+    
+    # نور ناهموار: گرادیان افقی
+    gradient = Image.linear_gradient("L").rotate(90).resize(size)
+    photo = Image.blend(background, gradient, rng.uniform(0.05, 0.2))
+    photo = photo.filter(ImageFilter.GaussianBlur(rng.uniform(0.5, 1.5)))
+    noise = Image.effect_noise((size[0] // 2, size[1] // 2), rng.uniform(5, 15)).resize(size)
+    photo = Image.blend(photo, noise, 0.08)
+    return photo.convert("RGB")
+
+
+def build(out_dir, count=40, seed=1403):
+    """ساخت پیکره در out_dir (اگر از قبل ساخته نشده باشد) و برگرداندن manifest"""
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if len(manifest) == count:
+            return manifest
+    
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    font = load_font(34)
+    manifest = []
+    for i in range(count):
+        receipt, total = render_receipt(rng, font)
+        photo = photograph(rng, receipt)
+        name = f"receipt_{i:03d}.jpg"
+        path = os.path.join(out_dir, name)
+        
+        if i % 4 == 0:
+            # عکس عمودی گوشی: پیکسل‌ها چرخیده ذخیره شده‌اند و EXIF جهت را می‌گوید
+            exif = Image.Exif()
+            exif[EXIF_ORIENTATION] = 6
+            photo.rotate(90, expand=True).save(path, quality=85, exif=exif)
+        else:
+            photo.save(path, quality=85)
+        
+        manifest.append({"file": name, "amount": total})
+    
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "accountech-receipts"))
+    args = parser.parse_args()
+    
+    manifest = build(args.out, args.count)
+    print(f"{len(manifest)} receipts in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
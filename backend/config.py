@@ -1,20 +1,77 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./accounting.db"
+    DB_PROFILE: str = "auto"  # auto, basic, sqlite_wal, postgres_pool
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    DB_POOL_SIZE: int = 10  # اتصال‌های ماندگار هر پردازه
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # ثانیه
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Money
+    MONEY_JSON_FORMAT: str = "int"  # int, float (کلاینت‌های قدیمی), str (اعداد بزرگ‌تر از 2^53 در JavaScript)
+    
+    # Bulk import
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    BULK_IMPORT_MAX_SIZE: int = 209715200  # 200MB، بدنه‌ی CSV/JSONL ورود دسته‌ای
+    
+    # Voice
+    VOICE_BATCH_MAX_COMMANDS: int = 1000
+    
+    # Periods
+    FISCAL_CALENDAR: str = "jalali"  # jalali, gregorian
+    ENTRY_NUMBER_PER_FISCAL_YEAR: bool = False  # JE-1403-000001
+    
+    # Analytics
+    ANALYTICS_CHUNK_SIZE: int = 100000  # ردیف‌های هر تکه هنگام بارگذاری آرایه‌های ستونی
+    ANALYTICS_MAX_PERIODS: int = 240  # حداکثر ستون‌های یک گزارش تحلیلی (20 سال ماهانه)
+    
+    # Accounts
+    ACCOUNT_CACHE_SIZE: int = 4096  # نام یکسان‌شده -> شناسه‌ی حساب
+    
     # OCR
     TESSERACT_PATH: Optional[str] = None
     OCR_LANGUAGE: str = "fas+eng"
+    OCR_ENGINE: str = "tesseract"  # tesseract, tesserocr (اختیاری؛ در صورت نبود یا خطا: tesseract), stub
+    TESSDATA_PATH: Optional[str] = None  # پوشه‌ی traineddata برای tesserocr
+    OCR_STUB_DELAY: float = 0.0
+    OCR_WORKERS: int = 2
+    OCR_QUEUE_DEPTH: int = 32  # کارهای در صف و در حال اجرا
+    OCR_MAX_WAIT: float = 60.0
+    OCR_JOB_RETENTION: int = 1000  # تعداد کارهای تمام‌شده‌ی نگه‌داشته‌شده
+    OCR_BATCH_WORKERS: Optional[int] = None  # پیش‌فرض: تعداد هسته‌ها
+    OCR_BATCH_MAX_FILES: int = 500
+    OCR_CACHE_MAX_ENTRIES: int = 10000  # 0 = بدون کش
+    OCR_PERCEPTUAL_HASH: bool = True  # تشخیص فیش تکراری با عکس دوباره‌ی همان فیش
+    OCR_PREPROCESS_PRESET: str = "balanced"
+    OCR_PREPROCESS_PRESETS: Dict[str, Dict[str, Any]] = {
+        "none": {"exif": False},
+        "fast": {"target_dpi": 200, "grayscale": True},
+        "balanced": {"target_dpi": 300, "grayscale": True, "binarize": True},
+        "accurate": {"crop": True, "target_dpi": 300, "deskew": True, "binarize": True},
+    }
     
     # Upload
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
+    STORAGE_BACKEND: str = "local"
+    STORAGE_ROOT: str = "./uploads/blobs"  # receipts/ab/cd/<sha256>
+    STORAGE_GC_MIN_AGE_HOURS: float = 24.0  # فایل‌های بی‌مرجع جوان‌تر از این پاک نمی‌شوند
+    
+    # Export
+    EXPORT_DIR: str = "./exports"  # فایل‌های کارهای خروجی پس‌زمینه
+    EXPORT_ROW_GROUP_SIZE: int = 65536  # ردیف‌های هر row group در Parquet
+    EXPORT_WORKERS: int = 2
+    EXPORT_QUEUE_DEPTH: int = 16
+    EXPORT_JOB_RETENTION: int = 100  # کارهای تمام‌شده (و فایل‌هایشان) که نگه داشته می‌شوند
     
     # Backup
     BACKUP_DIR: str = "./backups"
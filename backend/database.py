@@ -1,12 +1,105 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from typing import Callable, Dict, Optional, Union
 from config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+AnyEngine = Union[Engine, AsyncEngine]
+
+# درایور async هر پایگاه داده (aiosqlite و asyncpg جداگانه نصب می‌شوند)
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+
+def _basic_engine(url: str, create: Callable[..., AnyEngine] = create_engine) -> AnyEngine:
+    """تنظیمات پیش‌فرض درایور (همان رفتار قدیمی)"""
+    connect_args = {"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+    return create(url, connect_args=connect_args)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: خواننده‌ها پشت نویسنده نمی‌مانند و فقط نویسنده‌ها به نوبت می‌نویسند
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # در WAL با NORMAL، commit فقط با قطع برق (نه کرش پردازه) ممکن است از دست برود
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    # مقدار منفی یعنی کیلوبایت، نه تعداد صفحه
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+
+
+def _sqlite_wal_engine(url: str, create: Callable[..., AnyEngine] = create_engine) -> AnyEngine:
+    engine = create(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            # انتظار درایور برای قفل؛ هم‌اندازه‌ی busy_timeout
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    )
+    # رویدادهای اتصال موتور async روی sync_engine آن ثبت می‌شوند
+    event.listen(getattr(engine, "sync_engine", engine), "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def _postgres_pool_engine(url: str, create: Callable[..., AnyEngine] = create_engine) -> AnyEngine:
+    # استخر پیش‌فرض QueuePool است (در موتور async همتای آن AsyncAdaptedQueuePool)
+    return create(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        # اتصال‌هایی که سرور یا فایروال بسته‌اند پیش از استفاده کنار گذاشته می‌شوند
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_use_lifo=True
+    )
+
+
+STORAGE_PROFILES: Dict[str, Callable[..., AnyEngine]] = {
+    'basic': _basic_engine,
+    'sqlite_wal': _sqlite_wal_engine,
+    'postgres_pool': _postgres_pool_engine,
+}
+
+# پروفایل auto بر اساس نوع پایگاه داده در DATABASE_URL
+AUTO_PROFILES = {
+    'sqlite': 'sqlite_wal',
+    'postgresql': 'postgres_pool',
+}
+
+
+def resolve_profile(url: str, profile: Optional[str] = None) -> str:
+    profile = profile or settings.DB_PROFILE
+    if profile == 'auto':
+        return AUTO_PROFILES.get(make_url(url).get_backend_name(), 'basic')
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"پروفایل پایگاه داده‌ی نامعتبر: {profile}")
+    return profile
+
+
+def create_db_engine(url: Optional[str] = None, profile: Optional[str] = None,
+                     create: Callable[..., AnyEngine] = create_engine) -> AnyEngine:
+    url = url or settings.DATABASE_URL
+    return STORAGE_PROFILES[resolve_profile(url, profile)](url, create)
+
+
+def async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"درایور async برای {backend} تعریف نشده است")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -19,3 +112,42 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    موتور async با همان DATABASE_URL و پروفایل
+    
+    در اولین استفاده ساخته می‌شود تا نصب نبودن aiosqlite/asyncpg فقط
+    endpointهای async را از کار بیندازد، نه راه‌اندازی برنامه را.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        _async_engine = create_db_engine(async_url(settings.DATABASE_URL), create=create_async_engine)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    """
+    نشست async برای endpointهای خواندنی
+    
+    کد سرویس‌ها همگام است و با AsyncSession.run_sync اجرا می‌شود: ورودی/خروجی
+    پایگاه داده روی حلقه‌ی رویداد انجام می‌شود و نخی از threadpool نگه داشته
+    نمی‌شود. رابطه‌هایی که در پاسخ خوانده می‌شوند باید از قبل (selectinload)
+    بارگذاری شده باشند.
+    """
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_sessionmaker = None
@@ -0,0 +1,57 @@
+import argparse
+import time
+from database import engine, SessionLocal, Base
+from migrations import run_migrations
+from config import settings
+import models
+from services.blob_storage import get_blob_store, is_blob_key
+
+
+def referenced_keys(db) -> set:
+    """کلیدهای ذخیره‌ساز که هنوز در فیش‌ها، VoiceLog یا اسناد به کار رفته‌اند"""
+    keys = set()
+    for column in (models.Receipt.image_path, models.VoiceLog.audio_path, models.JournalEntry.image_path):
+        for (value,) in db.query(column).filter(column.isnot(None)).distinct():
+            if is_blob_key(value):
+                keys.add(value)
+    return keys
+
+
+def gc_storage(min_age_hours: float = None, dry_run: bool = False):
+    """حذف فایل‌هایی که هیچ ردیفی به آن‌ها اشاره ندارد و از min_age_hours قدیمی‌ترند"""
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    
+    min_age_hours = settings.STORAGE_GC_MIN_AGE_HOURS if min_age_hours is None else min_age_hours
+    # بارگذاری‌های تمام‌شده‌ای که ردیفشان هنوز commit نشده، از این مرز جوان‌ترند
+    cutoff = time.time() - min_age_hours * 3600
+    store = get_blob_store()
+    
+    db = SessionLocal()
+    try:
+        keys = referenced_keys(db)
+    finally:
+        db.close()
+    
+    orphans = [key for key, mtime in store.iter_blobs() if key not in keys and mtime < cutoff]
+    for key in orphans:
+        print(("would delete " if dry_run else "deleted ") + key)
+        if not dry_run:
+            store.delete(key)
+    
+    staged = 0 if dry_run else store.clean_staging(min_age_hours * 3600)
+    
+    print(
+        f"{len(keys)} referenced blob(s), {len(orphans)} orphan(s)"
+        + (" found" if dry_run else f" deleted, {staged} stale staging file(s) removed")
+    )
+    return orphans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete unreferenced upload blobs")
+    parser.add_argument("--min-age-hours", type=float, default=None,
+                        help=f"keep orphans younger than this (default {settings.STORAGE_GC_MIN_AGE_HOURS})")
+    parser.add_argument("--dry-run", action="store_true", help="only list the orphans")
+    args = parser.parse_args()
+    gc_storage(min_age_hours=args.min_age_hours, dry_run=args.dry_run)
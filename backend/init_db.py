@@ -1,10 +1,13 @@
 from database import engine, SessionLocal, Base
+from migrations import run_migrations
 from models import Account, AccountType
+from services.hierarchy_service import HierarchyService
 
 def init_database():
     """Initialize database and create default accounts with hierarchy"""
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     
     db = SessionLocal()
     try:
@@ -76,7 +79,8 @@ def init_database():
             Account(code="72", name="اسناد پرداختنی", account_type=AccountType.CREDITOR, parent_id=main_accounts['creditor'].id),
         ]
         
-        # Set parent_id for sub-sub-accounts
+        # Set parent_id for sub-sub-accounts (parents need ids first)
+        db.add_all(sub_accounts)
         db.flush()
         for acc in sub_accounts:
             if acc.code.startswith('11') and len(acc.code) == 3:
@@ -108,8 +112,8 @@ def init_database():
                 if parent:
                     acc.parent_id = parent.id
         
-        db.add_all(sub_accounts)
         db.commit()
+        HierarchyService.rebuild_paths(db)
         
         total_accounts = len(main_accounts) + len(sub_accounts)
         print(f"Successfully created {total_accounts} accounts with hierarchy")
@@ -1,12 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import os
-from database import engine, Base
+from database import engine, Base, dispose_async_engine
+from migrations import run_migrations
 import models
 from routers import accounts, journal, voice, ocr, reports, auth
+from services.ocr_jobs import shutdown_queue
+from services.export_jobs import shutdown_export_queue
+from services.blob_storage import get_blob_store
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(
     title="سیستم حسابداری هوشمند",
@@ -22,8 +26,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-os.makedirs("uploads/audio", exist_ok=True)
-os.makedirs("uploads/receipts", exist_ok=True)
+# پوشه‌ی ذخیره‌ساز (و staging آن) هنگام ساخت ساخته می‌شود
+get_blob_store()
 
 app.include_router(auth.router)
 app.include_router(accounts.router)
@@ -33,6 +37,21 @@ app.include_router(ocr.router)
 app.include_router(reports.router)
 
 
+@app.on_event("shutdown")
+def stop_ocr_workers():
+    shutdown_queue()
+
+
+@app.on_event("shutdown")
+def stop_export_workers():
+    shutdown_export_queue()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
+
+
 @app.get("/")
 def root():
     return {
@@ -0,0 +1,155 @@
+"""
+مهاجرت‌های سبک برای پایگاه داده‌های موجود
+
+Base.metadata.create_all فقط جدول‌های جدید را می‌سازد. ستون‌ها و ایندکس‌هایی که
+بعداً به جدول‌های موجود اضافه شده‌اند اینجا به پایگاه داده‌ی قدیمی اضافه می‌شوند
+و ستون‌های مبلغ FLOAT قدیمی به BIGINT (ریال صحیح) تبدیل می‌شوند.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql import sqltypes
+from database import Base
+import models
+
+# (جدول، ستون، تعریف SQL)
+COLUMNS = [
+    ("accounts", "debit_total", "BIGINT DEFAULT 0"),
+    ("accounts", "credit_total", "BIGINT DEFAULT 0"),
+    ("accounts", "path", "VARCHAR(500)"),
+    ("accounts", "depth", "INTEGER DEFAULT 0"),
+    ("accounts", "normalized_name", "VARCHAR(200)"),
+    ("receipts", "content_hash", "VARCHAR(64)"),
+    ("receipts", "perceptual_hash", "VARCHAR(16)"),
+    ("receipts", "duplicate_of_id", "INTEGER REFERENCES receipts(id)"),
+]
+
+
+# ستون‌های مبلغ که در پایگاه داده‌های قدیمی FLOAT بودند و BIGINT (ریال) می‌شوند
+MONEY_COLUMNS = {
+    "accounts": ("balance", "debit_total", "credit_total"),
+    "transactions": ("amount",),
+    "receipts": ("amount",),
+    "balance_snapshots": ("debit_total", "credit_total"),
+}
+
+
+def _float_money_columns(conn: Connection):
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+    for table, columns in MONEY_COLUMNS.items():
+        if table not in tables:
+            continue
+        types = {c['name']: c['type'] for c in inspector.get_columns(table)}
+        stale = [column for column in columns if isinstance(types.get(column), sqltypes.Numeric)]
+        if stale:
+            yield table, stale
+
+
+def _money_to_bigint_sqlite(conn: Connection, table: str, columns):
+    """
+    SQLite نوع ستون را عوض نمی‌کند و در ستون REAL عدد صحیح هم اعشاری ذخیره
+    می‌شود؛ جدول با تعریف فعلی مدل از نو ساخته و داده‌ها گرد شده کپی می‌شوند.
+    ایندکس‌ها بعداً در run_migrations دوباره ساخته می‌شوند.
+    """
+    model_table = Base.metadata.tables[table]
+    existing = {c['name'] for c in inspect(conn).get_columns(table)}
+    names = [column.name for column in model_table.columns if column.name in existing]
+    values = [f"CAST(ROUND({name}) AS INTEGER)" if name in columns else name for name in names]
+    
+    ddl = str(CreateTable(model_table).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {table} ", f"CREATE TABLE _new_{table} ", 1))
+    conn.exec_driver_sql(
+        f"INSERT INTO _new_{table} ({', '.join(names)}) SELECT {', '.join(values)} FROM {table}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE _new_{table} RENAME TO {table}")
+
+
+def _money_to_bigint_postgresql(conn: Connection, table: str, columns):
+    conn.exec_driver_sql(f"ALTER TABLE {table} " + ", ".join(
+        f"ALTER COLUMN {column} DROP DEFAULT, ALTER COLUMN {column} TYPE BIGINT USING ROUND({column})::BIGINT"
+        for column in columns
+    ))
+
+
+MONEY_CONVERTERS = {
+    'sqlite': _money_to_bigint_sqlite,
+    'postgresql': _money_to_bigint_postgresql,
+}
+
+
+def _stale_normalized_names(conn: Connection) -> bool:
+    """normalized_name قدیمی نیم‌فاصله را فاصله می‌کرد؛ کلید فعلی هیچ فاصله‌ای ندارد"""
+    return conn.execute(text(
+        "SELECT 1 FROM accounts WHERE normalized_name LIKE '% %' LIMIT 1"
+    )).first() is not None
+
+
+def _backfill_balances(db):
+    from services.ledger_service import LedgerService
+    LedgerService.reconcile(db, fix=True)
+
+
+def _backfill_paths(db):
+    from services.hierarchy_service import HierarchyService
+    HierarchyService.rebuild_paths(db)
+
+
+def _backfill_normalized_names(db):
+    from persian_text import normalize_name
+    rows = db.query(models.Account.id, models.Account.name).all()
+    db.bulk_update_mappings(models.Account, [
+        {'id': account_id, 'normalized_name': normalize_name(name)}
+        for account_id, name in rows
+    ])
+    db.commit()
+
+
+# پرکردن داده‌های قبلی، بعد از اضافه شدن ستون (یا کهنه شدن مقدارهای آن)
+BACKFILLS = {
+    "accounts.debit_total": _backfill_balances,
+    "accounts.path": _backfill_paths,
+    "accounts.normalized_name": _backfill_normalized_names,
+    # مانده‌ها از روی آرتیکل‌های گردشده دوباره جمع زده می‌شوند
+    "money.bigint": _backfill_balances,
+}
+
+
+def run_migrations(engine: Engine):
+    inspector = inspect(engine)
+    added = []
+    
+    with engine.begin() as conn:
+        for table, column, ddl in COLUMNS:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            added.append(f"{table}.{column}")
+        
+        convert = MONEY_CONVERTERS.get(conn.dialect.name)
+        converted = list(_float_money_columns(conn)) if convert else []
+        for table, columns in converted:
+            convert(conn, table, columns)
+        if converted:
+            added.append("money.bigint")
+        
+        if "accounts.normalized_name" not in added and _stale_normalized_names(conn):
+            added.append("accounts.normalized_name")
+        
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    
+    backfills = list(dict.fromkeys(BACKFILLS[name] for name in added if name in BACKFILLS))
+    if backfills:
+        from database import SessionLocal
+        db = SessionLocal(bind=engine)
+        try:
+            for backfill in backfills:
+                backfill(db)
+        finally:
+            db.close()
+    
+    return added
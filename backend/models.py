@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, Boolean, Enum, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from database import Base
+from persian_text import normalize_name
 import enum
 
 
@@ -22,23 +23,36 @@ class TransactionType(str, enum.Enum):
 
 class Account(Base):
     __tablename__ = "accounts"
+    # صفحه‌بندی keyset روی (created_at، id)
+    __table_args__ = (Index("ix_accounts_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String(20), unique=True, index=True)
     name = Column(String(200), nullable=False)
+    normalized_name = Column(String(200), index=True)
     account_type = Column(Enum(AccountType), nullable=False)
     parent_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
-    balance = Column(Float, default=0.0)
+    path = Column(String(500), index=True)  # /1/8/15/
+    depth = Column(Integer, default=0)
+    balance = Column(BigInteger, default=0)
+    debit_total = Column(BigInteger, default=0)
+    credit_total = Column(BigInteger, default=0)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     parent = relationship("Account", remote_side=[id], backref="children")
     transactions = relationship("Transaction", back_populates="account")
+    
+    @validates('name')
+    def _normalize_name(self, key, name):
+        self.normalized_name = normalize_name(name)
+        return name
 
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (Index("ix_journal_entries_date_id", "date", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     entry_number = Column(String(50), unique=True, index=True)
@@ -58,10 +72,10 @@ class Transaction(Base):
     __tablename__ = "transactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False)
-    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
     transaction_type = Column(Enum(TransactionType), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(BigInteger, nullable=False)  # ریال
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -71,16 +85,30 @@ class Transaction(Base):
 
 class Receipt(Base):
     __tablename__ = "receipts"
+    __table_args__ = (Index("ix_receipts_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=True)
     image_path = Column(String(500), nullable=False)
     extracted_text = Column(Text, nullable=True)
-    amount = Column(Float, nullable=True)
+    amount = Column(BigInteger, nullable=True)  # ریال
     date = Column(DateTime, nullable=True)
     vendor = Column(String(200), nullable=True)
     is_processed = Column(Boolean, default=False)
+    content_hash = Column(String(64), index=True)  # sha256 بایت‌های فایل
+    perceptual_hash = Column(String(16), index=True)  # dHash تصویر
+    duplicate_of_id = Column(Integer, ForeignKey("receipts.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OCRCacheEntry(Base):
+    __tablename__ = "ocr_cache"
+    
+    content_hash = Column(String(64), primary_key=True)
+    extracted_text = Column(Text, nullable=False)
+    parsed_data = Column(Text, nullable=False)  # JSON خروجی parse_receipt
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class VoiceLog(Base):
@@ -93,3 +121,37 @@ class VoiceLog(Base):
     parsed_data = Column(Text, nullable=True)
     is_processed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ClosedPeriod(Base):
+    __tablename__ = "closed_periods"
+    __table_args__ = (UniqueConstraint("calendar", "period"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    calendar = Column(String(20), nullable=False)  # gregorian, jalali
+    period = Column(String(7), nullable=False)  # 1403-01
+    start = Column(DateTime, nullable=False)
+    end = Column(DateTime, nullable=False, index=True)  # اسناد با date < end در مانده‌ها آمده‌اند
+    closed_at = Column(DateTime, default=datetime.utcnow)
+    
+    snapshots = relationship("BalanceSnapshot", back_populates="period", cascade="all, delete-orphan")
+
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (UniqueConstraint("period_id", "account_id"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    period_id = Column(Integer, ForeignKey("closed_periods.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    debit_total = Column(BigInteger, default=0)
+    credit_total = Column(BigInteger, default=0)
+    
+    period = relationship("ClosedPeriod", back_populates="snapshots")
+
+
+class NumberSequence(Base):
+    __tablename__ = "number_sequences"
+    
+    name = Column(String(50), primary_key=True)
+    next_value = Column(Integer, nullable=False, default=1)
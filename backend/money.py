@@ -0,0 +1,74 @@
+"""
+مبالغ ریالی به صورت عدد صحیح
+
+همه‌ی مبالغ (آرتیکل‌ها، مانده‌ی حساب‌ها و دوره‌ها، فیش‌ها) در پایگاه داده
+BIGINT ریال هستند؛ جمع آن‌ها در SQL دقیق است و اختلاف بدهکار و بستانکار یک
+سند بدون تلورانس مقایسه می‌شود. حد 64 بیتی حدود 9.2 × 10^18 ریال است.
+
+ورودی API عدد صحیح، عدد اعشاری بدون کسر (1500000.0، قالب قدیمی) یا رشته‌ی
+رقمی با جداکننده‌ی هزارگان است. خروجی JSON بر اساس MONEY_JSON_FORMAT عدد
+صحیح، عدد اعشاری (سازگار با کلاینت‌های قدیمی) یا رشته است؛ رشته برای
+کلاینت‌های JavaScript که اعداد بزرگ‌تر از 2^53 را گرد می‌کنند.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Annotated, Union
+from pydantic import BeforeValidator, PlainSerializer
+from config import settings
+
+# بازه‌ی BIGINT
+MAX_RIALS = 2 ** 63 - 1
+MIN_RIALS = -2 ** 63
+
+DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+
+def _decimal(value) -> Decimal:
+    if isinstance(value, bool):
+        raise ValueError(f"مبلغ نامعتبر: {value}")
+    if isinstance(value, str):
+        value = value.strip().translate(DIGITS).replace(',', '').replace('،', '').replace('٬', '')
+    elif isinstance(value, float):
+        # repr کوتاه‌ترین نمایش است: 0.1 + 0.2 -> 0.30000000000000004، نه 53 رقم دودویی
+        value = repr(value)
+    try:
+        amount = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"مبلغ نامعتبر: {value}")
+    if not amount.is_finite():
+        raise ValueError(f"مبلغ نامعتبر: {value}")
+    return amount
+
+
+def _check_range(amount: int) -> int:
+    if not MIN_RIALS <= amount <= MAX_RIALS:
+        raise ValueError(f"مبلغ خارج از بازه‌ی مجاز است: {amount}")
+    return amount
+
+
+def parse_rials(value) -> int:
+    """مبلغ ورودی کاربر؛ کسر ریال پذیرفته نمی‌شود"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _check_range(value)
+    amount = _decimal(value)
+    if amount != amount.to_integral_value():
+        raise ValueError(f"مبلغ باید عدد صحیح ریال باشد: {value}")
+    return _check_range(int(amount))
+
+
+def to_rials(value) -> int:
+    """مبلغ محاسبه‌شده (مثلاً «یک و نیم میلیون» در دستور صوتی یا داده‌ی قدیمی FLOAT)، گرد به نزدیک‌ترین ریال"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _check_range(value)
+    return _check_range(int(_decimal(value).quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+
+def _serialize_rials(amount: int) -> Union[int, float, str]:
+    if settings.MONEY_JSON_FORMAT == 'float':
+        return float(amount)
+    if settings.MONEY_JSON_FORMAT == 'str':
+        return str(amount)
+    return amount
+
+
+# نوع فیلدهای مبلغ در schemas
+Rial = Annotated[int, BeforeValidator(parse_rials), PlainSerializer(_serialize_rials, when_used='json')]
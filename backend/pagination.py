@@ -0,0 +1,93 @@
+"""
+کرسر مبهم برای صفحه‌بندی keyset
+
+کرسر فهرستی از مقادیر کلید مرتب‌سازی آخرین ردیف صفحه است (مثلاً تاریخ و id)
+که به صورت JSON و base64 کدگذاری می‌شود. صفحه‌ی بعد با شرط «بعد از این
+کلید» روی ایندکس ترکیبی (ستون مرتب‌سازی، id) خوانده می‌شود، پس هزینه‌ی هر
+صفحه به عمق آن بستگی ندارد و درج هم‌زمان ردیف‌ها صفحه‌ها را جابه‌جا نمی‌کند.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("کرسر نامعتبر است")
+    
+    if len(values) != size:
+        raise ValueError("کرسر نامعتبر است")
+    return values
+
+
+def decode_keyset_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, int]]:
+    """کرسر (مقدار ستون مرتب‌سازی، id)؛ کرسر خالی یعنی صفحه‌ی اول"""
+    if not cursor:
+        return None
+    value, row_id = decode_cursor(cursor, 2)
+    if not isinstance(row_id, int):
+        raise ValueError("کرسر نامعتبر است")
+    return value, row_id
+
+
+def parse_keyset_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, int]]:
+    """decode_keyset_cursor برای پارامتر درخواست؛ کرسر نامعتبر 400"""
+    try:
+        return decode_keyset_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def keyset_after(sort_column, id_column, after: Tuple[Any, int], descending: bool = False):
+    """
+    شرط ردیف‌های پس از کلید after به ترتیب (sort_column، id_column)
+    
+    شرط بیرونی روی sort_column یک بازه‌ی ساده است تا ایندکس ترکیبی مستقیم
+    از همان نقطه خوانده شود.
+    """
+    value, row_id = after
+    if descending:
+        return and_(sort_column <= value, or_(sort_column < value, id_column < row_id))
+    return and_(sort_column >= value, or_(sort_column > value, id_column > row_id))
+
+
+def keyset_page(query, sort_column, id_column, after: Optional[Tuple[Any, int]], limit: int,
+                descending: bool = False) -> Tuple[List[Any], Optional[str]]:
+    """
+    یک صفحه از query (Query در ORM) و کرسر صفحه‌ی بعد
+    
+    یک ردیف بیشتر خوانده می‌شود تا معلوم شود صفحه‌ی بعدی هست یا نه.
+    """
+    if after is not None:
+        query = query.filter(keyset_after(sort_column, id_column, after, descending))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
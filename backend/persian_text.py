@@ -0,0 +1,36 @@
+"""
+یکسان‌سازی متن فارسی
+
+نام‌ها از منابع مختلف (صفحه‌کلید عربی، OCR، گفتار به متن) با نویسه‌های متفاوت
+می‌رسند؛ «علي» و «علی» یا «محمدرضا»، «محمد‌رضا» (نیم‌فاصله) و «محمد رضا» باید
+یک نام حساب شوند. کلید یکسان‌شده برای نمایش نیست: نیم‌فاصله و فاصله‌ها از آن
+حذف می‌شوند.
+"""
+import re
+
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی',  # ye عربی
+    'ى': 'ی',  # الف مقصوره
+    'ك': 'ک',  # کاف عربی
+    'ة': 'ه',
+    'ۀ': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    '\u200c': '',  # نیم‌فاصله (ZWNJ)
+    '\u200d': '',  # ZWJ
+    '\u200f': '',  # RLM
+    '\u200e': '',  # LRM
+    'ـ': '',  # کشیده
+})
+
+DIACRITICS = re.compile('[\u064b-\u0652\u0670]')  # اعراب
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(name: str) -> str:
+    """صورت یکسان‌شده‌ی نام برای جستجو و ایندکس (بدون فاصله و نیم‌فاصله)"""
+    if not name:
+        return ''
+    name = DIACRITICS.sub('', name.translate(CHARACTER_MAP))
+    return WHITESPACE.sub('', name).lower()
@@ -0,0 +1,38 @@
+import argparse
+from database import engine, SessionLocal, Base
+from migrations import run_migrations
+from services.ledger_service import LedgerService
+
+
+def reconcile_balances(fix: bool = False):
+    """Recompute account totals from transactions and report drift"""
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    
+    db = SessionLocal()
+    try:
+        drifts = LedgerService.reconcile(db, fix=fix)
+        
+        if not drifts:
+            print("All account balances are consistent")
+            return drifts
+        
+        for drift in drifts:
+            print(
+                f"{drift.account_code}: "
+                f"debit {drift.stored_debit:,} -> {drift.actual_debit:,}, "
+                f"credit {drift.stored_credit:,} -> {drift.actual_credit:,}, "
+                f"balance {drift.stored_balance:,} -> {drift.actual_debit - drift.actual_credit:,}"
+            )
+        
+        print(f"{len(drifts)} account(s) drifted" + (" and were fixed" if fix else ""))
+        return drifts
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile stored account balances")
+    parser.add_argument("--fix", action="store_true", help="overwrite drifted balances")
+    args = parser.parse_args()
+    drifts = reconcile_balances(fix=args.fix)
+    raise SystemExit(1 if drifts and not args.fix else 0)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import models
 import schemas
-from database import get_db
+from database import get_async_db, get_db
+from pagination import keyset_page, parse_keyset_cursor
+from services.hierarchy_service import HierarchyService
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
@@ -38,18 +41,44 @@ def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)
     account_data['code'] = new_code
     db_account = models.Account(**account_data)
     db.add(db_account)
+    db.flush()
+    HierarchyService.assign_path(db, db_account)
     db.commit()
     db.refresh(db_account)
     return db_account
 
 
-@router.get("/", response_model=List[schemas.AccountResponse])
-def get_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    accounts = db.query(models.Account).filter(
+def _accounts_page(db: Session, cursor: Optional[str], limit: int):
+    """صفحه‌ی keyset روی (created_at، id)"""
+    return keyset_page(
+        db.query(models.Account).filter(models.Account.is_active == True),
+        models.Account.created_at, models.Account.id,
+        parse_keyset_cursor(cursor), limit
+    )
+
+
+def _accounts_offset_page(db: Session, skip: int, limit: int):
+    return db.query(models.Account).filter(
         models.Account.is_active == True
     ).offset(skip).limit(limit).all()
+
+
+@router.get("/", response_model=List[schemas.AccountResponse])
+async def get_accounts(skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                       db: AsyncSession = Depends(get_async_db)):
+    """با cursor (از /accounts/page) صفحه‌بندی keyset است و skip نادیده گرفته می‌شود"""
+    if cursor:
+        accounts, _ = await db.run_sync(_accounts_page, cursor, limit)
+        return accounts
     
-    return accounts
+    return await db.run_sync(_accounts_offset_page, skip, limit)
+
+
+@router.get("/page", response_model=schemas.AccountPage)
+async def get_accounts_page(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+                            db: AsyncSession = Depends(get_async_db)):
+    accounts, next_cursor = await db.run_sync(_accounts_page, cursor, limit)
+    return schemas.AccountPage(items=accounts, next_cursor=next_cursor)
 
 
 @router.get("/{account_id}", response_model=schemas.AccountResponse)
@@ -70,7 +99,16 @@ def update_account(account_id: int, account: schemas.AccountUpdate,
     if not db_account:
         raise HTTPException(status_code=404, detail="حساب یافت نشد")
     
-    for key, value in account.dict(exclude_unset=True).items():
+    changes = account.dict(exclude_unset=True)
+    if 'parent_id' in changes:
+        parent_id = changes.pop('parent_id')
+        if parent_id != db_account.parent_id:
+            try:
+                HierarchyService.move(db, db_account, parent_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    
+    for key, value in changes.items():
         setattr(db_account, key, value)
     
     db.commit()
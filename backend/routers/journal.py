@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import tempfile
 import models
 import schemas
-from database import get_db
+from config import settings
+from database import get_async_db, get_db
+from services.bulk_import_service import JournalBulkImporter, parse_csv, parse_jsonl, open_text
 from services.accounting_service import AccountingService
+from services.ledger_service import LedgerService
+from pagination import keyset_page, parse_keyset_cursor
+from uploads import UploadTooLargeError
 
 router = APIRouter(prefix="/journal", tags=["journal"])
 
 
 @router.post("/", response_model=schemas.JournalEntryResponse)
 def create_journal_entry(entry: schemas.JournalEntryCreate, db: Session = Depends(get_db)):
-    entry_number = AccountingService._generate_entry_number(db)
+    entry_number = AccountingService._generate_entry_number(db, entry.date)
     
     journal_entry = models.JournalEntry(
         entry_number=entry_number,
@@ -25,8 +33,8 @@ def create_journal_entry(entry: schemas.JournalEntryCreate, db: Session = Depend
     db.add(journal_entry)
     db.flush()
     
-    total_debit = 0.0
-    total_credit = 0.0
+    total_debit = 0
+    total_credit = 0
     
     for trans in entry.transactions:
         transaction = models.Transaction(
@@ -43,41 +51,125 @@ def create_journal_entry(entry: schemas.JournalEntryCreate, db: Session = Depend
         else:
             total_credit += trans.amount
     
-    if abs(total_debit - total_credit) > 0.01:
+    if total_debit != total_credit:
         raise HTTPException(
             status_code=400, 
             detail=f"سند متوازن نیست. بدهکار: {total_debit}, بستانکار: {total_credit}"
         )
     
+    LedgerService.apply(db, entry.date, entry.transactions)
+    
     db.commit()
-    db.refresh(journal_entry)
     
-    return journal_entry
+    return AccountingService.get_journal_entry(db, journal_entry.id)
 
 
-@router.get("/", response_model=List[schemas.JournalEntryResponse])
-def get_journal_entries(
-    skip: int = 0, 
-    limit: int = 100,
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
+@router.post("/bulk", response_model=schemas.BulkImportResult)
+async def bulk_import_journal_entries(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.JournalEntry)
+    """
+    ورود دسته‌ای اسناد از بدنه‌ی CSV یا JSONL
+    
+    بدنه به صورت جریانی در یک فایل موقت نوشته می‌شود و سپس خط به خط پردازش
+    می‌شود، پس حافظه به اندازه‌ی فایل بستگی ندارد. بدنه‌ی بزرگ‌تر از
+    BULK_IMPORT_MAX_SIZE با 413 رد می‌شود.
+    """
+    if format is None:
+        content_type = request.headers.get('content-type', '')
+        format = 'csv' if 'csv' in content_type else 'jsonl'
+    
+    max_size = settings.BULK_IMPORT_MAX_SIZE
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(max_size)))
+    
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail=str(UploadTooLargeError(max_size)))
+            spool.write(chunk)
+        spool.seek(0)
+        
+        def run_import():
+            stream = open_text(spool)
+            try:
+                parsed = parse_csv(stream) if format == 'csv' else parse_jsonl(stream)
+                return JournalBulkImporter(db, chunk_size).run(parsed)
+            finally:
+                stream.detach()
+        
+        try:
+            return await run_in_threadpool(run_import)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def _journal_query(db: Session, start_date: Optional[datetime], end_date: Optional[datetime]):
+    query = AccountingService.journal_entries(db)
     
     if start_date:
         query = query.filter(models.JournalEntry.date >= start_date)
     if end_date:
         query = query.filter(models.JournalEntry.date <= end_date)
     
-    entries = query.order_by(models.JournalEntry.date.desc()).offset(skip).limit(limit).all()
+    return query
+
+
+def _journal_page(db: Session, start_date: Optional[datetime], end_date: Optional[datetime],
+                  cursor: Optional[str], limit: int):
+    """صفحه‌ی keyset روی (date، id)، جدیدترین اول"""
+    return keyset_page(
+        _journal_query(db, start_date, end_date),
+        models.JournalEntry.date, models.JournalEntry.id,
+        parse_keyset_cursor(cursor), limit, descending=True
+    )
+
+
+def _journal_offset_page(db: Session, start_date: Optional[datetime], end_date: Optional[datetime],
+                         skip: int, limit: int):
+    query = _journal_query(db, start_date, end_date)
+    return query.order_by(models.JournalEntry.date.desc()).offset(skip).limit(limit).all()
+
+
+@router.get("/", response_model=List[schemas.JournalEntryResponse])
+async def get_journal_entries(
+    skip: int = 0, 
+    limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """با cursor (از /journal/page) صفحه‌بندی keyset است و skip نادیده گرفته می‌شود"""
+    if cursor:
+        entries, _ = await db.run_sync(_journal_page, start_date, end_date, cursor, limit)
+        return entries
     
-    return entries
+    return await db.run_sync(_journal_offset_page, start_date, end_date, skip, limit)
+
+
+@router.get("/page", response_model=schemas.JournalEntryPage)
+async def get_journal_page(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """صفحه‌ای از اسناد با next_cursor؛ هزینه‌ی هر صفحه مستقل از عمق آن است"""
+    entries, next_cursor = await db.run_sync(_journal_page, start_date, end_date, cursor, limit)
+    return schemas.JournalEntryPage(items=entries, next_cursor=next_cursor)
 
 
 @router.get("/{entry_id}", response_model=schemas.JournalEntryResponse)
 def get_journal_entry(entry_id: int, db: Session = Depends(get_db)):
-    entry = db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+    entry = AccountingService.get_journal_entry(db, entry_id)
     
     if not entry:
         raise HTTPException(status_code=404, detail="سند یافت نشد")
@@ -88,11 +180,13 @@ def get_journal_entry(entry_id: int, db: Session = Depends(get_db)):
 @router.put("/{entry_id}", response_model=schemas.JournalEntryResponse)
 def update_journal_entry(entry_id: int, entry: schemas.JournalEntryCreate, 
                         db: Session = Depends(get_db)):
-    db_entry = db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+    db_entry = AccountingService.get_journal_entry(db, entry_id)
     
     if not db_entry:
         raise HTTPException(status_code=404, detail="سند یافت نشد")
     
+    LedgerService.apply(db, db_entry.date, db_entry.transactions, sign=-1)
+    
     db.query(models.Transaction).filter(
         models.Transaction.journal_entry_id == entry_id
     ).delete()
@@ -101,8 +195,8 @@ def update_journal_entry(entry_id: int, entry: schemas.JournalEntryCreate,
     db_entry.description = entry.description
     db_entry.reference = entry.reference
     
-    total_debit = 0.0
-    total_credit = 0.0
+    total_debit = 0
+    total_credit = 0
     
     for trans in entry.transactions:
         transaction = models.Transaction(
@@ -119,25 +213,28 @@ def update_journal_entry(entry_id: int, entry: schemas.JournalEntryCreate,
         else:
             total_credit += trans.amount
     
-    if abs(total_debit - total_credit) > 0.01:
+    if total_debit != total_credit:
         raise HTTPException(
             status_code=400, 
             detail=f"سند متوازن نیست. بدهکار: {total_debit}, بستانکار: {total_credit}"
         )
     
+    LedgerService.apply(db, entry.date, entry.transactions)
+    
     db.commit()
-    db.refresh(db_entry)
     
-    return db_entry
+    return AccountingService.get_journal_entry(db, db_entry.id)
 
 
 @router.delete("/{entry_id}")
 def delete_journal_entry(entry_id: int, db: Session = Depends(get_db)):
-    db_entry = db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+    db_entry = AccountingService.get_journal_entry(db, entry_id)
     
     if not db_entry:
         raise HTTPException(status_code=404, detail="سند یافت نشد")
     
+    LedgerService.apply(db, db_entry.date, db_entry.transactions, sign=-1)
+    
     db.delete(db_entry)
     db.commit()
     
@@ -1,60 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import FileResponse
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import schemas
 import models
-from database import get_db
-from services.ocr_service import OCRService
-import aiofiles
+from config import settings
+from database import get_db, SessionLocal
+from services.ocr_jobs import OCRJob, QueueFullError, get_queue, submit_batch
+from services.ocr_cache import OCRCache, perceptual_hash
+from services.receipt_batch_service import BatchFileError, ReceiptBatchService
+from services.blob_storage import get_blob_store
+from uploads import save_upload
+from pagination import keyset_page, parse_keyset_cursor
+import asyncio
 import os
+import time
 from datetime import datetime
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
-ocr_service = OCRService()
 
+# کلیدهای ذخیره‌ساز پسوند ندارند؛ نوع تصویر از چند بایت اول تشخیص داده می‌شود
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG': 'image/png',
+    b'GIF8': 'image/gif',
+    b'RIFF': 'image/webp',
+    b'BM': 'image/bmp',
+    b'II*\x00': 'image/tiff',
+    b'MM\x00*': 'image/tiff',
+}
 
-@router.post("/process-receipt", response_model=schemas.OCRResponse)
-async def process_receipt(file: UploadFile = File(...), db: Session = Depends(get_db)):
+
+def _parse_date(value):
     try:
-        upload_dir = "uploads/receipts"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = os.path.join(upload_dir, f"{timestamp}_{file.filename}")
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        extracted_text = ocr_service.extract_text_from_image(file_path)
-        
-        parsed_data = ocr_service.parse_receipt(extracted_text)
+        return datetime.strptime(value, "%Y/%m/%d") if value else None
+    except ValueError:
+        return None
+
+
+def save_receipt(job: OCRJob) -> int:
+    """ثبت نتیجه‌ی OCR در جدول receipts (در پردازه‌ی اصلی، پس از پایان کار)"""
+    content_hash = job.context.get('content_hash')
+    perceptual = job.context.get('perceptual_hash')
+    
+    db = SessionLocal()
+    try:
+        if content_hash:
+            job.context['duplicate_of'] = OCRCache.find_duplicate(db, content_hash, perceptual)
         
         receipt = models.Receipt(
-            image_path=file_path,
-            extracted_text=extracted_text,
-            amount=parsed_data.get('amount'),
-            date=datetime.strptime(parsed_data.get('date'), "%Y/%m/%d") if parsed_data.get('date') else None,
-            vendor=parsed_data.get('vendor'),
-            is_processed=False
+            image_path=job.context.get('storage_key', job.image_path),
+            extracted_text=job.extracted_text,
+            amount=job.parsed.get('amount'),
+            date=_parse_date(job.parsed.get('date')),
+            vendor=job.parsed.get('vendor'),
+            is_processed=False,
+            content_hash=content_hash,
+            perceptual_hash=perceptual,
+            duplicate_of_id=job.context.get('duplicate_of')
         )
         db.add(receipt)
         db.commit()
         
-        return schemas.OCRResponse(
-            success=parsed_data['success'],
-            message="فیش با موفقیت پردازش شد" if parsed_data['success'] else "اطلاعات کامل استخراج نشد",
-            extracted_text=extracted_text,
-            amount=parsed_data.get('amount'),
-            date=parsed_data.get('date'),
-            vendor=parsed_data.get('vendor')
-        )
+        if content_hash and not job.context.get('cached'):
+            try:
+                OCRCache.put(db, content_hash, job.extracted_text, job.parsed)
+                db.commit()
+            except Exception:
+                # کش اختیاری است؛ مثلاً ثبت هم‌زمان همان فایل در درخواستی دیگر
+                db.rollback()
+        
+        return receipt.id
+    finally:
+        db.close()
+
+
+def _cached_result(content_hash: str):
+    db = SessionLocal()
+    try:
+        return OCRCache.get(db, content_hash)
+    finally:
+        db.close()
+
+
+def job_response(job: OCRJob) -> schemas.OCRJobResponse:
+    parsed = job.parsed or {}
+    if job.status == "done":
+        message = "فیش با موفقیت پردازش شد" if parsed.get('success') else "اطلاعات کامل استخراج نشد"
+        if job.context.get('duplicate_of'):
+            message += " (احتمالاً تکراری است)"
+    elif job.status == "failed":
+        message = f"خطا در پردازش فیش: {job.error}"
+    else:
+        message = "فیش در صف پردازش است"
+    
+    return schemas.OCRJobResponse(
+        job_id=job.id,
+        status=job.status,
+        success=bool(parsed.get('success')),
+        message=message,
+        extracted_text=job.extracted_text,
+        amount=parsed.get('amount'),
+        date=parsed.get('date'),
+        vendor=parsed.get('vendor'),
+        receipt_id=job.receipt_id,
+        cached=bool(job.context.get('cached')),
+        duplicate_of=job.context.get('duplicate_of'),
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
+
+
+async def _wait_for(job: OCRJob, wait: float):
+    if wait > 0 and not job.done.done():
+        await asyncio.wait({asyncio.wrap_future(job.done)}, timeout=wait)
+
+
+@router.post("/process-receipt", response_model=schemas.OCRJobResponse)
+async def process_receipt(file: UploadFile = File(...),
+                          wait: float = Query(0, ge=0, le=settings.OCR_MAX_WAIT,
+                                              description="حداکثر ثانیه‌های انتظار برای نتیجه")):
+    """
+    ارسال فیش به صف OCR
+    
+    شناسه‌ی کار بلافاصله برگردانده می‌شود؛ وضعیت و نتیجه از /ocr/jobs/{job_id}
+    خوانده می‌شود. با wait تا همان مقدار ثانیه برای نتیجه صبر می‌شود.
+    فایلی که قبلاً پردازش شده از کش جواب می‌گیرد و به صف نمی‌رود.
+    """
+    stored = await save_upload(file, "receipts")
+    file_path = stored.path
+    
+    context = {'content_hash': stored.content_hash, 'storage_key': stored.key, 'cached': False}
+    if settings.OCR_PERCEPTUAL_HASH:
+        context['perceptual_hash'] = await run_in_threadpool(perceptual_hash, file_path)
+    
+    queue = get_queue(on_result=save_receipt)
+    cached = await run_in_threadpool(_cached_result, context['content_hash'])
+    if cached is not None:
+        context['cached'] = True
+        extracted_text, parsed = cached
+        job = await run_in_threadpool(queue.complete, file_path, extracted_text, parsed, context)
+        return job_response(job)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"خطا در پردازش فیش: {str(e)}")
+    try:
+        job = queue.submit(file_path, context)
+    except QueueFullError as e:
+        # فایل ممکن است با فیش دیگری مشترک باشد؛ اگر ارجاعی نداشته باشد GC پاکش می‌کند
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    
+    await _wait_for(job, wait)
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.OCRJobResponse)
+async def get_job(job_id: str,
+                  wait: float = Query(0, ge=0, le=settings.OCR_MAX_WAIT,
+                                      description="حداکثر ثانیه‌های انتظار برای نتیجه")):
+    job = get_queue(on_result=save_receipt).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="کار پردازش یافت نشد")
+    
+    await _wait_for(job, wait)
+    return job_response(job)
+
+
+def _with_session(fn):
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+@router.post("/batch", response_model=schemas.OCRBatchResponse)
+async def process_batch(files: List[UploadFile] = File(...)):
+    """
+    پردازش دسته‌ای چند فیش یا یک فایل ZIP
+    
+    هر فایل جداگانه روی دیسک نوشته می‌شود، OCR بین هسته‌ها پخش می‌شود و نتیجه‌ی
+    هر فایل در فهرست items برمی‌گردد. خطای یک فایل بقیه را متوقف نمی‌کند.
+    """
+    started = time.perf_counter()
+    batch = ReceiptBatchService()
+    
+    try:
+        for upload in files:
+            await run_in_threadpool(batch.add_upload, upload.filename or "receipt", upload.file)
+    except BatchFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    await run_in_threadpool(_with_session, batch.apply_cache)
+    
+    work = batch.work()
+    futures = submit_batch([(item.path, recognize) for item, recognize in work])
+    results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+    
+    for (item, recognize), result in zip(work, results):
+        if isinstance(result, Exception):
+            item.error = f"خطا در پردازش فیش: {result}"
+            continue
+        text, parsed, item.perceptual_hash = result
+        if recognize:
+            item.extracted_text, item.parsed = text, parsed
+    batch.share_results()
+    
+    await run_in_threadpool(_with_session, batch.save)
+    return batch.manifest(time.perf_counter() - started)
+
+
+def _receipts_page(db: Session, cursor: Optional[str], limit: int):
+    """صفحه‌ی keyset روی (created_at، id)، جدیدترین اول"""
+    return keyset_page(
+        db.query(models.Receipt), models.Receipt.created_at, models.Receipt.id,
+        parse_keyset_cursor(cursor), limit, descending=True
+    )
 
 
 @router.get("/receipts")
-def get_receipts(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
+def get_receipts(skip: int = 0, limit: int = 50, cursor: Optional[str] = None,
+                 db: Session = Depends(get_db)):
+    """با cursor (از /ocr/receipts/page) صفحه‌بندی keyset است و skip نادیده گرفته می‌شود"""
+    if cursor:
+        return _receipts_page(db, cursor, limit)[0]
+    
     receipts = db.query(models.Receipt).order_by(
         models.Receipt.created_at.desc()
     ).offset(skip).limit(limit).all()
@@ -62,6 +231,32 @@ def get_receipts(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
     return receipts
 
 
+@router.get("/receipts/page", response_model=schemas.ReceiptPage)
+def get_receipts_page(cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=1000),
+                      db: Session = Depends(get_db)):
+    receipts, next_cursor = _receipts_page(db, cursor, limit)
+    return schemas.ReceiptPage(items=receipts, next_cursor=next_cursor)
+
+
+@router.get("/receipts/{receipt_id}/image")
+def get_receipt_image(receipt_id: int, db: Session = Depends(get_db)):
+    receipt = db.get(models.Receipt, receipt_id)
+    if not receipt or not receipt.image_path:
+        raise HTTPException(status_code=404, detail="فیش یافت نشد")
+    
+    path = get_blob_store().local_path(receipt.image_path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="فایل تصویر فیش یافت نشد")
+    
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    media_type = next(
+        (media for signature, media in IMAGE_SIGNATURES.items() if head.startswith(signature)),
+        'application/octet-stream'
+    )
+    return FileResponse(path, media_type=media_type)
+
+
 @router.post("/receipts/{receipt_id}/create-entry")
 def create_entry_from_receipt(receipt_id: int, entry_data: schemas.JournalEntryCreate, 
                               db: Session = Depends(get_db)):
@@ -71,7 +266,8 @@ def create_entry_from_receipt(receipt_id: int, entry_data: schemas.JournalEntryC
         raise HTTPException(status_code=404, detail="فیش یافت نشد")
     
     from services.accounting_service import AccountingService
-    entry_number = AccountingService._generate_entry_number(db)
+    from services.ledger_service import LedgerService
+    entry_number = AccountingService._generate_entry_number(db, entry_data.date)
     
     journal_entry = models.JournalEntry(
         entry_number=entry_number,
@@ -94,10 +290,11 @@ def create_entry_from_receipt(receipt_id: int, entry_data: schemas.JournalEntryC
         )
         db.add(transaction)
     
+    LedgerService.apply(db, entry_data.date, entry_data.transactions)
+    
     receipt.is_processed = True
     receipt.journal_entry_id = journal_entry.id
     
     db.commit()
-    db.refresh(journal_entry)
     
-    return journal_entry
+    return AccountingService.get_journal_entry(db, journal_entry.id)
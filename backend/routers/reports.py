@@ -1,29 +1,296 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 from typing import List, Optional
 from datetime import datetime
+import os
+import tempfile
+import models
 import schemas
-from database import get_db
+from config import settings
+from database import get_async_db, get_db, SessionLocal
+from pagination import parse_keyset_cursor
+from streaming import stream_models
 from services.accounting_service import AccountingService
+from services.analytics_service import AnalyticsService
+from services.export_jobs import ExportJob, get_export_queue
+from services.export_service import (
+    FORMATS, ExportParams, ExportReport, ExportWriter, export_filename, prepare_export
+)
+from services.ocr_jobs import QueueFullError
+from services.period_service import PeriodService
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+# گزارش‌های خواندنی async هستند (get_async_db)؛ بستن و بازکردن دوره‌ها همگام می‌ماند
+
 
 @router.get("/trial-balance", response_model=List[schemas.TrialBalanceItem])
-def get_trial_balance(db: Session = Depends(get_db)):
-    return AccountingService.get_trial_balance(db)
+async def get_trial_balance(as_of: Optional[schemas.AsOf] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(AccountingService.get_trial_balance, as_of)
+
+
+BALANCE_SHEET_TYPES = [
+    models.AccountType.ASSET,
+    models.AccountType.LIABILITY,
+    models.AccountType.EQUITY,
+    models.AccountType.DEBTOR,
+    models.AccountType.CREDITOR,
+]
+
+
+@router.get("/trial-balance/tree", response_model=List[schemas.TrialBalanceTreeItem])
+async def get_trial_balance_tree(
+    depth: Optional[int] = Query(None, ge=0),
+    as_of: Optional[schemas.AsOf] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """تراز آزمایشی با جمع زیرمجموعه‌ها در هر سطح از درخت حساب‌ها"""
+    return await db.run_sync(AccountingService.get_trial_balance_tree, depth, as_of)
+
+
+@router.get("/balance-sheet", response_model=List[schemas.TrialBalanceTreeItem])
+async def get_balance_sheet(
+    depth: Optional[int] = Query(None, ge=0),
+    as_of: Optional[schemas.AsOf] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(AccountingService.get_trial_balance_tree, depth, as_of, BALANCE_SHEET_TYPES)
 
 
 @router.get("/ledger/{account_id}", response_model=List[schemas.LedgerItem])
-def get_ledger(
+async def get_ledger(
+    account_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """دفتر حساب به صورت جریانی (آرایه‌ی JSON یا NDJSON)"""
+    after = parse_keyset_cursor(cursor)
+    opening_balance = await db.run_sync(
+        AccountingService.get_ledger_opening_balance, account_id, start_date, after
+    )
+    
+    def rows():
+        # نشست درخواست پیش از شروع ارسال پاسخ بسته می‌شود؛ جریان نشست همگام خودش را دارد
+        # و StreamingResponse آن را در threadpool می‌خواند
+        stream_db = SessionLocal()
+        try:
+            for item, _ in AccountingService.iter_ledger(
+                stream_db, account_id, start_date, end_date, after, opening_balance
+            ):
+                yield item
+        finally:
+            stream_db.close()
+    
+    return stream_models(rows(), format)
+
+
+@router.get("/ledger/{account_id}/page", response_model=schemas.LedgerPage)
+async def get_ledger_page(
     account_id: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after = parse_keyset_cursor(cursor)
+    return await db.run_sync(AccountingService.get_ledger_page, account_id, start_date, end_date, after, limit)
+
+
+@router.get("/ledger/{account_id}/opening-balance", response_model=schemas.OpeningBalance)
+async def get_opening_balance(account_id: int, start_date: datetime, db: AsyncSession = Depends(get_async_db)):
+    debit, credit = await db.run_sync(PeriodService.opening_balance, account_id, start_date)
+    return schemas.OpeningBalance(
+        account_id=account_id,
+        date=start_date,
+        debit=debit,
+        credit=credit,
+        balance=debit - credit
+    )
+
+
+@router.get("/analytics", response_model=schemas.AnalyticsReport)
+def get_analytics(
+    period: str = Query("month", pattern="^(month|quarter|year)$"),
+    group_by: str = Query("account", pattern="^(account|account_type)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    calendar: str = settings.FISCAL_CALENDAR,
     db: Session = Depends(get_db)
 ):
-    return AccountingService.get_ledger(db, account_id, start_date, end_date)
+    """
+    مقایسه‌ی دوره‌ای گردش، مانده و رشد به تفکیک حساب یا نوع حساب
+    
+    محاسبه‌ی NumPy پردازنده را درگیر می‌کند، پس endpoint همگام است و در
+    threadpool اجرا می‌شود، نه روی حلقه‌ی رویداد.
+    """
+    try:
+        return AnalyticsService.period_report(db, period, group_by, start_date, end_date, calendar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _closed_periods(db: Session, calendar: Optional[str]) -> List[models.ClosedPeriod]:
+    query = db.query(models.ClosedPeriod)
+    if calendar:
+        query = query.filter(models.ClosedPeriod.calendar == calendar)
+    return query.order_by(models.ClosedPeriod.end.asc()).all()
+
+
+@router.get("/periods", response_model=List[schemas.ClosedPeriodResponse])
+async def get_closed_periods(calendar: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_closed_periods, calendar)
+
+
+@router.post("/periods/close", response_model=schemas.ClosedPeriodResponse)
+def close_period(year: int, month: int = Query(..., ge=1, le=12),
+                 calendar: str = settings.FISCAL_CALENDAR, db: Session = Depends(get_db)):
+    try:
+        return PeriodService.close_period(db, calendar, year, month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/periods/close-through", response_model=List[schemas.ClosedPeriodResponse])
+def close_periods_through(until: Optional[datetime] = None, calendar: str = settings.FISCAL_CALENDAR,
+                          db: Session = Depends(get_db)):
+    try:
+        return PeriodService.close_through(db, calendar, until or datetime.now())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/periods/{period_id}")
+def reopen_period(period_id: int, db: Session = Depends(get_db)):
+    period = db.query(models.ClosedPeriod).filter(models.ClosedPeriod.id == period_id).first()
+    
+    if not period:
+        raise HTTPException(status_code=404, detail="دوره یافت نشد")
+    
+    db.delete(period)
+    db.commit()
+    
+    return {"message": "دوره با موفقیت باز شد"}
 
 
 @router.get("/dashboard", response_model=schemas.DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    return AccountingService.get_dashboard_stats(db)
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(AccountingService.get_dashboard_stats)
+
+
+EXPORT_REPORT = Path(..., pattern="^(ledger|journal|trial-balance)$")
+EXPORT_FORMAT = Query("csv", pattern="^(csv|xlsx|parquet)$")
+
+
+def export_params(account_id: Optional[int] = None, start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None, as_of: Optional[schemas.AsOf] = None) -> ExportParams:
+    """پارامترهای مشترک خروجی‌ها؛ دفتر حساب account_id لازم دارد و تراز آزمایشی as_of"""
+    return ExportParams(account_id=account_id, start_date=start_date, end_date=end_date, as_of=as_of)
+
+
+def _prepare_export(report: str, format: str, params: ExportParams):
+    try:
+        return prepare_export(report, format, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _write_temp_export(export: ExportReport, writer: ExportWriter, params: ExportParams) -> str:
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=settings.EXPORT_DIR, prefix=".export-", suffix=f".{writer.extension}")
+    db = SessionLocal()
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            writer.write(export.columns, export.rows(db, params), sink)
+    except BaseException:
+        os.remove(path)
+        raise
+    finally:
+        db.close()
+    return path
+
+
+@router.get("/export/{report}")
+async def export_report(report: str = EXPORT_REPORT, format: str = EXPORT_FORMAT,
+                        params: ExportParams = Depends(export_params)):
+    """
+    خروجی گزارش (ledger، journal، trial-balance) برای دانلود
+    
+    CSV ردیف به ردیف ارسال می‌شود. XLSX و Parquet تا پایان فایل کامل نیستند
+    (جدول مرکزی zip و footer)، پس در یک فایل موقت با حافظه‌ی ثابت نوشته و
+    سپس ارسال می‌شوند؛ برای خروجی‌های خیلی بزرگ از /export/{report}/jobs استفاده کنید.
+    """
+    export, writer = _prepare_export(report, format, params)
+    filename = export_filename(report, format, params)
+    
+    if format == "csv":
+        def chunks():
+            # مانند دفتر حساب جریانی، نشست خودش را دارد و در threadpool خوانده می‌شود
+            stream_db = SessionLocal()
+            try:
+                yield from writer.iter_chunks(export.columns, export.rows(stream_db, params))
+            finally:
+                stream_db.close()
+        
+        return StreamingResponse(chunks(), media_type=writer.media_type, headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        })
+    
+    path = await run_in_threadpool(_write_temp_export, export, writer, params)
+    return FileResponse(path, media_type=writer.media_type, filename=filename,
+                        background=BackgroundTask(os.remove, path))
+
+
+def export_job_response(job: ExportJob) -> schemas.ExportJobResponse:
+    return schemas.ExportJobResponse(
+        job_id=job.id,
+        report=job.report,
+        format=job.format,
+        status=job.status,
+        filename=job.filename,
+        rows=job.rows,
+        size=job.size,
+        error=job.error,
+        download_url=f"{router.prefix}/export/jobs/{job.id}/download" if job.status == "done" else None,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
+
+
+@router.post("/export/{report}/jobs", response_model=schemas.ExportJobResponse, status_code=202)
+def create_export_job(report: str = EXPORT_REPORT, format: str = EXPORT_FORMAT,
+                      params: ExportParams = Depends(export_params)):
+    """ساخت فایل خروجی در پس‌زمینه؛ وضعیت از /export/jobs/{job_id} خوانده می‌شود"""
+    _prepare_export(report, format, params)
+    try:
+        job = get_export_queue().submit(report, format, params, export_filename(report, format, params))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return export_job_response(job)
+
+
+def _get_export_job(job_id: str) -> ExportJob:
+    job = get_export_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="کار خروجی یافت نشد")
+    return job
+
+
+@router.get("/export/jobs/{job_id}", response_model=schemas.ExportJobResponse)
+def get_export_job(job_id: str):
+    return export_job_response(_get_export_job(job_id))
+
+
+@router.get("/export/jobs/{job_id}/download")
+def download_export(job_id: str):
+    job = _get_export_job(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="فایل خروجی هنوز آماده نیست")
+    return FileResponse(job.path, media_type=FORMATS[job.format].media_type, filename=job.filename)
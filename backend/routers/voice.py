@@ -4,9 +4,10 @@ import schemas
 from database import get_db
 from services.voice_service import VoiceService
 from services.accounting_service import AccountingService
-import aiofiles
-import os
-from datetime import datetime
+from services.voice_batch_service import VoiceBatchService
+from config import settings
+from services.blob_storage import get_blob_store
+from uploads import save_upload
 
 router = APIRouter(prefix="/voice", tags=["voice"])
 voice_service = VoiceService()
@@ -15,6 +16,9 @@ voice_service = VoiceService()
 @router.post("/process", response_model=schemas.VoiceResponse)
 def process_voice_command(voice_input: schemas.VoiceInput, db: Session = Depends(get_db)):
     """پردازش دستور صوتی و ثبت سند حسابداری"""
+    if voice_input.audio_key and not get_blob_store().exists(voice_input.audio_key):
+        raise HTTPException(status_code=400, detail="فایل صوتی یافت نشد")
+    
     try:
         # پردازش متن و استخراج اطلاعات
         parsed_data = voice_service.parse_voice_command(voice_input.text)
@@ -30,7 +34,7 @@ def process_voice_command(voice_input: schemas.VoiceInput, db: Session = Depends
         
         # ثبت سند حسابداری
         journal_entry = AccountingService.create_journal_entry_from_voice(
-            db, parsed_data, voice_input.text
+            db, parsed_data, voice_input.text, voice_input.audio_key
         )
         
         # پیام موفقیت با جزئیات
@@ -63,24 +67,31 @@ def process_voice_command(voice_input: schemas.VoiceInput, db: Session = Depends
         )
 
 
+@router.post("/process-batch", response_model=schemas.VoiceBatchResponse)
+def process_voice_batch(batch: schemas.VoiceBatchInput, db: Session = Depends(get_db)):
+    """
+    پردازش و ثبت دسته‌ای دستورهای صوتی
+    
+    برای همگام‌سازی دستورهایی که آفلاین ضبط شده‌اند؛ به جای یک درخواست و چند
+    commit برای هر دستور، همه در یک تراکنش (یا تراکنش‌های chunk_size تایی)
+    ثبت می‌شوند و نتیجه‌ی هر دستور جداگانه برمی‌گردد.
+    """
+    if len(batch.texts) > settings.VOICE_BATCH_MAX_COMMANDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"حداکثر {settings.VOICE_BATCH_MAX_COMMANDS} دستور در هر دسته مجاز است"
+        )
+    return VoiceBatchService(db, voice_service, batch.chunk_size, batch.on_error).run(batch.texts)
+
+
 @router.post("/upload-audio")
 async def upload_audio(file: UploadFile = File(...)):
-    try:
-        upload_dir = "uploads/audio"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = os.path.join(upload_dir, f"{timestamp}_{file.filename}")
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        return {
-            "success": True,
-            "message": "فایل صوتی با موفقیت آپلود شد",
-            "file_path": file_path
-        }
+    stored = await save_upload(file, "audio")
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"خطا در آپلود فایل: {str(e)}")
+    # audio_key در /voice/process همراه متن فرستاده می‌شود تا در voice_logs ثبت شود
+    return {
+        "success": True,
+        "message": "فایل صوتی با موفقیت آپلود شد",
+        "audio_key": stored.key,
+        "file_path": stored.path
+    }
@@ -1,7 +1,19 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Annotated, Optional, List
+from datetime import date, datetime, time
 from models import AccountType, TransactionType
+from money import Rial
+
+
+def _as_of_moment(value):
+    """as_of فقط با تاریخ (2024-01-01) یعنی پایان همان روز، نه نیمه‌شب ابتدای آن"""
+    if isinstance(value, str) and len(value.strip()) == 10:
+        return datetime.combine(date.fromisoformat(value.strip()), time.max)
+    return value
+
+
+# پارامتر as_of گزارش‌ها: یک لحظه که اسناد تا آن (شامل) شمرده می‌شوند؛ تاریخ تنها تا پایان روز
+AsOf = Annotated[datetime, BeforeValidator(_as_of_moment)]
 
 
 class AccountBase(BaseModel):
@@ -19,12 +31,13 @@ class AccountCreate(BaseModel):
 
 class AccountUpdate(BaseModel):
     name: Optional[str] = None
+    parent_id: Optional[int] = None
     is_active: Optional[bool] = None
 
 
 class AccountResponse(AccountBase):
     id: int
-    balance: float
+    balance: Rial
     is_active: bool
     created_at: datetime
     
@@ -32,10 +45,15 @@ class AccountResponse(AccountBase):
         from_attributes = True
 
 
+class AccountPage(BaseModel):
+    items: List[AccountResponse]
+    next_cursor: Optional[str] = None
+
+
 class TransactionBase(BaseModel):
     account_id: int
     transaction_type: TransactionType
-    amount: float
+    amount: Rial
     description: Optional[str] = None
 
 
@@ -75,8 +93,31 @@ class JournalEntryResponse(JournalEntryBase):
         from_attributes = True
 
 
+class JournalEntryPage(BaseModel):
+    items: List[JournalEntryResponse]
+    next_cursor: Optional[str] = None
+
+
+class BulkImportError(BaseModel):
+    line: int
+    entry: str
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    entry_numbers_from: Optional[str] = None
+    entry_numbers_to: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    errors: List[BulkImportError] = []
+    errors_truncated: bool = False
+
+
 class VoiceInput(BaseModel):
     text: str
+    audio_key: Optional[str] = Field(None, pattern=r'^audio/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}$')
 
 
 class VoiceResponse(BaseModel):
@@ -86,36 +127,194 @@ class VoiceResponse(BaseModel):
     journal_entry_id: Optional[int] = None
 
 
+class VoiceBatchInput(BaseModel):
+    texts: List[str] = Field(..., min_length=1)
+    # None: همه در یک تراکنش
+    chunk_size: Optional[int] = Field(None, ge=1)
+    # skip: خطای یک دستور یا دسته بقیه را متوقف نمی‌کند؛ abort: اولین خطا ثبت را متوقف می‌کند
+    on_error: str = Field("skip", pattern="^(skip|abort)$")
+
+
+class VoiceBatchItem(BaseModel):
+    index: int
+    text: str
+    status: str = "pending"  # posted, failed, skipped
+    journal_entry_id: Optional[int] = None
+    entry_number: Optional[str] = None
+    parsed_data: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class VoiceBatchResponse(BaseModel):
+    total: int
+    posted: int
+    failed: int
+    skipped: int
+    elapsed_seconds: float
+    items: List[VoiceBatchItem]
+
+
 class OCRResponse(BaseModel):
     success: bool
     message: str
     extracted_text: Optional[str] = None
-    amount: Optional[float] = None
+    amount: Optional[Rial] = None
     date: Optional[str] = None
     vendor: Optional[str] = None
 
 
+class OCRJobResponse(OCRResponse):
+    job_id: str
+    status: str  # queued, running, done, failed
+    receipt_id: Optional[int] = None
+    cached: bool = False
+    duplicate_of: Optional[int] = None  # شناسه‌ی فیش قبلی با همان تصویر
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class OCRBatchItem(BaseModel):
+    file: str
+    status: str  # done, failed
+    success: bool = False
+    receipt_id: Optional[int] = None
+    amount: Optional[Rial] = None
+    date: Optional[str] = None
+    vendor: Optional[str] = None
+    cached: bool = False  # نتیجه از کش OCR (نه از نمونه‌ی یکسان داخل همین دسته)
+    duplicate_of: Optional[int] = None
+    error: Optional[str] = None
+
+
+class OCRBatchResponse(BaseModel):
+    total: int
+    processed: int
+    failed: int
+    elapsed_seconds: float
+    items: List[OCRBatchItem]
+
+
+class ReceiptResponse(BaseModel):
+    id: int
+    journal_entry_id: Optional[int] = None
+    image_path: str
+    extracted_text: Optional[str] = None
+    amount: Optional[Rial] = None
+    date: Optional[datetime] = None
+    vendor: Optional[str] = None
+    is_processed: bool
+    content_hash: Optional[str] = None
+    perceptual_hash: Optional[str] = None
+    duplicate_of_id: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ReceiptPage(BaseModel):
+    items: List[ReceiptResponse]
+    next_cursor: Optional[str] = None
+
+
 class TrialBalanceItem(BaseModel):
     account_code: str
     account_name: str
-    debit: float
-    credit: float
-    balance: float
+    debit: Rial
+    credit: Rial
+    balance: Rial
+
+
+class TrialBalanceTreeItem(BaseModel):
+    account_id: int
+    account_code: str
+    account_name: str
+    account_type: AccountType
+    parent_id: Optional[int] = None
+    depth: int
+    debit: Rial
+    credit: Rial
+    balance: Rial
 
 
 class LedgerItem(BaseModel):
     date: datetime
     entry_number: str
     description: str
-    debit: float
-    credit: float
-    balance: float
+    debit: Rial
+    credit: Rial
+    balance: Rial
+
+
+class LedgerPage(BaseModel):
+    opening_balance: Rial
+    items: List[LedgerItem]
+    next_cursor: Optional[str] = None
+
+
+class OpeningBalance(BaseModel):
+    account_id: int
+    date: datetime
+    debit: Rial
+    credit: Rial
+    balance: Rial
+
+
+class ClosedPeriodResponse(BaseModel):
+    id: int
+    calendar: str
+    period: str
+    start: datetime
+    end: datetime
+    closed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class AnalyticsPeriod(BaseModel):
+    label: str  # 1403-01، 1403-Q1 یا 1403
+    start: datetime
+    end: datetime  # ابتدای دوره‌ی بعد
+
+
+class AnalyticsRow(BaseModel):
+    key: str  # کد حساب یا نام نوع حساب
+    name: str
+    account_type: AccountType
+    opening_balance: Rial
+    changes: List[Rial]  # خالص گردش هر دوره (بدهکار - بستانکار)
+    balances: List[Rial]  # مانده‌ی پایان هر دوره
+    growth: List[Optional[float]]  # تغییر نسبی گردش نسبت به دوره‌ی قبل
+
+
+class AnalyticsReport(BaseModel):
+    calendar: str
+    period: str  # month, quarter, year
+    group_by: str  # account, account_type
+    transactions: int = 0
+    periods: List[AnalyticsPeriod] = []
+    rows: List[AnalyticsRow] = []
+
+
+class ExportJobResponse(BaseModel):
+    job_id: str
+    report: str
+    format: str
+    status: str  # queued, running, done, failed
+    filename: str
+    rows: Optional[int] = None
+    size: Optional[int] = None  # بایت
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
 
 
 class DashboardStats(BaseModel):
     total_entries: int
     total_accounts: int
-    total_debit: float
-    total_credit: float
-    balance_difference: float
+    total_debit: Rial
+    total_credit: Rial
+    balance_difference: Rial
     recent_entries: List[JournalEntryResponse]
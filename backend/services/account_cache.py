@@ -0,0 +1,88 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import Optional
+import threading
+import models
+from config import settings
+
+PENDING_KEY = 'account_cache_pending'
+DIRTY_KEY = 'account_cache_dirty'
+
+
+class AccountNameCache:
+    """
+    کش LRU درون‌پردازه‌ای از نام یکسان‌شده به شناسه‌ی حساب
+    
+    حساب‌هایی که در یک تراکنش ساخته می‌شوند فقط بعد از commit همان تراکنش
+    وارد کش می‌شوند و هر تغییر یا حذف حساب کل کش را باطل می‌کند.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            account_id = self._items.get(key)
+            if account_id is not None:
+                self._items.move_to_end(key)
+            return account_id
+    
+    def put(self, key: str, account_id: int):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = account_id
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def discard(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def put_after_commit(self, db: Session, key: str, account_id: int):
+        """ثبت نگاشت حسابی که در تراکنش جاری ساخته شده، پس از commit"""
+        db.info.setdefault(PENDING_KEY, {})[key] = account_id
+    
+    def pending(self, db: Session, key: str) -> Optional[int]:
+        return db.info.get(PENDING_KEY, {}).get(key)
+
+
+account_cache = AccountNameCache(settings.ACCOUNT_CACHE_SIZE)
+
+
+@event.listens_for(models.Account, 'after_update')
+@event.listens_for(models.Account, 'after_delete')
+def _account_changed(mapper, connection, target):
+    state = inspect(target)
+    if not state.deleted and not state.attrs.name.history.has_changes():
+        return
+    account_cache.clear()
+    session = Session.object_session(target)
+    if session is not None:
+        # خواننده‌های هم‌زمان ممکن است تا commit نام قدیمی را دوباره در کش بگذارند
+        session.info[DIRTY_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop(DIRTY_KEY, False):
+        account_cache.clear()
+    for key, account_id in session.info.pop(PENDING_KEY, {}).items():
+        account_cache.put(key, account_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(DIRTY_KEY, None)
@@ -1,108 +1,250 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import List, Optional
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, and_, or_, select, insert
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
+import json
 import models
 import schemas
+from money import to_rials
+from pagination import encode_cursor
+from services import trial_balance
+from services.ledger_service import LedgerService, Posting
+from services.period_service import PeriodService
+from services.hierarchy_service import HierarchyService
+from services.sequence_service import EntryNumberAllocator, SequenceService
+from services.account_cache import account_cache
+from services.data_version import DataVersion, VersionedCache
+from persian_text import normalize_name
+
+LEDGER_BATCH_SIZE = 1000
+ACCOUNT_CODE_SEQUENCE = "account_code"
+CASH_ACCOUNT = 'صندوق'
+RECENT_ENTRIES = 10
+# آرتیکل‌های هر سند در یک کوئری برای همه‌ی اسناد (نه یک کوئری برای هر سند هنگام ساخت JournalEntryResponse)
+WITH_TRANSACTIONS = selectinload(models.JournalEntry.transactions)
+
+dashboard_cache = VersionedCache()
 
 
 class AccountingService:
     
     @staticmethod
-    def get_trial_balance(db: Session) -> List[schemas.TrialBalanceItem]:
-        accounts = db.query(models.Account).filter(models.Account.is_active == True).all()
-        
-        trial_balance = []
-        for account in accounts:
-            debit_sum = db.query(func.sum(models.Transaction.amount)).filter(
-                and_(
-                    models.Transaction.account_id == account.id,
-                    models.Transaction.transaction_type == models.TransactionType.DEBIT
-                )
-            ).scalar() or 0.0
-            
-            credit_sum = db.query(func.sum(models.Transaction.amount)).filter(
-                and_(
-                    models.Transaction.account_id == account.id,
-                    models.Transaction.transaction_type == models.TransactionType.CREDIT
-                )
-            ).scalar() or 0.0
-            
-            balance = debit_sum - credit_sum
-            
-            trial_balance.append(schemas.TrialBalanceItem(
-                account_code=account.code,
-                account_name=account.name,
-                debit=debit_sum,
-                credit=credit_sum,
-                balance=balance
-            ))
+    def journal_entries(db: Session):
+        """پرس‌وجوی اسناد برای پاسخ‌های JournalEntryResponse، با آرتیکل‌ها"""
+        return db.query(models.JournalEntry).options(WITH_TRANSACTIONS)
+    
+    @staticmethod
+    def get_journal_entry(db: Session, entry_id: int) -> Optional[models.JournalEntry]:
+        return AccountingService.journal_entries(db).filter(models.JournalEntry.id == entry_id).first()
+    
+    @staticmethod
+    def get_trial_balance(db: Session, as_of: Optional[datetime] = None) -> List[schemas.TrialBalanceItem]:
+        """تراز آزمایشی؛ as_of یک لحظه است و اسناد تا همان لحظه (شامل) جمع زده می‌شوند"""
+        if as_of is None:
+            query = trial_balance.get_backend(db).stored_totals_query()
+        else:
+            query = PeriodService.balances_as_of(db, as_of)
+        rows = db.execute(query).all()
         
-        return trial_balance
+        return [
+            schemas.TrialBalanceItem(
+                account_code=row.code,
+                account_name=row.name,
+                debit=row.debit,
+                credit=row.credit,
+                balance=row.debit - row.credit
+            )
+            for row in rows
+        ]
     
     @staticmethod
-    def get_ledger(db: Session, account_id: int, start_date: Optional[datetime] = None, 
-                   end_date: Optional[datetime] = None) -> List[schemas.LedgerItem]:
-        query = db.query(
-            models.Transaction,
-            models.JournalEntry
+    def get_trial_balance_tree(db: Session, depth: Optional[int] = None, as_of: Optional[datetime] = None,
+                               account_types: Optional[List[models.AccountType]] = None
+                               ) -> List[schemas.TrialBalanceTreeItem]:
+        snapshot = PeriodService.nearest_snapshot(db, as_of) if as_of else None
+        query = trial_balance.get_backend(db).rollup_query(depth, as_of, snapshot, account_types)
+        
+        return [
+            schemas.TrialBalanceTreeItem(
+                account_id=row.id,
+                account_code=row.code,
+                account_name=row.name,
+                account_type=row.account_type,
+                parent_id=row.parent_id,
+                depth=row.depth,
+                debit=row.debit,
+                credit=row.credit,
+                balance=row.debit - row.credit
+            )
+            for row in db.execute(query).all()
+        ]
+    
+    @staticmethod
+    def get_ledger_opening_balance(db: Session, account_id: int, start_date: Optional[datetime] = None,
+                                   after: Optional[Tuple[datetime, int]] = None) -> int:
+        """
+        مانده‌ی حساب پیش از اولین ردیف دفتر
+
+        بدون کرسر، مانده‌ی اسناد پیش از start_date است. با کرسر (تاریخ، شناسه‌ی
+        تراکنش)، مانده‌ی همه‌ی ردیف‌ها تا همان ردیف است.
+        """
+        if after is None:
+            if start_date is None:
+                return 0
+            debit, credit = PeriodService.opening_balance(db, account_id, start_date)
+            return debit - credit
+        
+        after_date, after_id = after
+        debit, credit = PeriodService.opening_balance(db, account_id, after_date)
+        backend = trial_balance.get_backend(db)
+        same_day = db.execute(
+            select(
+                backend.conditional_sum(models.TransactionType.DEBIT),
+                backend.conditional_sum(models.TransactionType.CREDIT),
+            ).join(
+                models.JournalEntry,
+                models.JournalEntry.id == models.Transaction.journal_entry_id
+            ).where(
+                models.Transaction.account_id == account_id,
+                models.JournalEntry.date == after_date,
+                models.Transaction.id <= after_id
+            )
+        ).one()
+        
+        return debit - credit + (same_day[0] or 0) - (same_day[1] or 0)
+    
+    @staticmethod
+    def iter_ledger(db: Session, account_id: int, start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None, after: Optional[Tuple[datetime, int]] = None,
+                    opening_balance: Optional[int] = None,
+                    limit: Optional[int] = None) -> Iterator[Tuple[schemas.LedgerItem, Tuple[datetime, int]]]:
+        """
+        ردیف‌های دفتر حساب به ترتیب (تاریخ، شناسه‌ی تراکنش) به همراه کلید هر ردیف
+
+        ردیف‌ها با yield_per از پایگاه داده خوانده می‌شوند، پس حافظه مستقل از
+        تعداد گردش‌های حساب است.
+        """
+        if opening_balance is None:
+            opening_balance = AccountingService.get_ledger_opening_balance(db, account_id, start_date, after)
+        
+        query = select(
+            models.Transaction.id,
+            models.Transaction.transaction_type,
+            models.Transaction.amount,
+            models.JournalEntry.date,
+            models.JournalEntry.entry_number,
+            models.JournalEntry.description,
         ).join(
-            models.JournalEntry
-        ).filter(
+            models.JournalEntry,
+            models.JournalEntry.id == models.Transaction.journal_entry_id
+        ).where(
             models.Transaction.account_id == account_id
         )
         
         if start_date:
-            query = query.filter(models.JournalEntry.date >= start_date)
+            query = query.where(models.JournalEntry.date >= start_date)
         if end_date:
-            query = query.filter(models.JournalEntry.date <= end_date)
-        
-        query = query.order_by(models.JournalEntry.date.asc())
+            query = query.where(models.JournalEntry.date <= end_date)
+        if after:
+            after_date, after_id = after
+            query = query.where(or_(
+                models.JournalEntry.date > after_date,
+                and_(models.JournalEntry.date == after_date, models.Transaction.id > after_id)
+            ))
         
-        results = query.all()
+        query = query.order_by(models.JournalEntry.date.asc(), models.Transaction.id.asc())
+        if limit:
+            query = query.limit(limit)
         
-        ledger = []
-        running_balance = 0.0
+        running_balance = opening_balance
         
-        for transaction, journal_entry in results:
-            if transaction.transaction_type == models.TransactionType.DEBIT:
-                debit = transaction.amount
-                credit = 0.0
-                running_balance += transaction.amount
+        for row in db.execute(query.execution_options(yield_per=LEDGER_BATCH_SIZE)):
+            if row.transaction_type == models.TransactionType.DEBIT:
+                debit = row.amount
+                credit = 0
+                running_balance += row.amount
             else:
-                debit = 0.0
-                credit = transaction.amount
-                running_balance -= transaction.amount
+                debit = 0
+                credit = row.amount
+                running_balance -= row.amount
             
-            ledger.append(schemas.LedgerItem(
-                date=journal_entry.date,
-                entry_number=journal_entry.entry_number,
-                description=journal_entry.description,
+            yield schemas.LedgerItem(
+                date=row.date,
+                entry_number=row.entry_number,
+                description=row.description,
                 debit=debit,
                 credit=credit,
                 balance=running_balance
-            ))
+            ), (row.date, row.id)
+    
+    @staticmethod
+    def get_ledger(db: Session, account_id: int, start_date: Optional[datetime] = None, 
+                   end_date: Optional[datetime] = None) -> List[schemas.LedgerItem]:
+        return [
+            item for item, _ in AccountingService.iter_ledger(db, account_id, start_date, end_date)
+        ]
+    
+    @staticmethod
+    def get_ledger_page(db: Session, account_id: int, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None, after: Optional[Tuple[datetime, int]] = None,
+                        limit: int = 100) -> schemas.LedgerPage:
+        opening_balance = AccountingService.get_ledger_opening_balance(db, account_id, start_date, after)
+        rows = list(AccountingService.iter_ledger(
+            db, account_id, start_date, end_date, after, opening_balance, limit=limit + 1
+        ))
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(*rows[-1][1])
         
-        return ledger
+        return schemas.LedgerPage(
+            opening_balance=opening_balance,
+            items=[item for item, _ in rows],
+            next_cursor=next_cursor
+        )
     
     @staticmethod
     def get_dashboard_stats(db: Session) -> schemas.DashboardStats:
-        total_entries = db.query(func.count(models.JournalEntry.id)).scalar()
-        total_accounts = db.query(func.count(models.Account.id)).filter(
-            models.Account.is_active == True
-        ).scalar()
+        """
+        آمار داشبورد؛ تا وقتی نسخه‌ی داده‌ها (DataVersion) عوض نشده از کش
         
-        total_debit = db.query(func.sum(models.Transaction.amount)).filter(
-            models.Transaction.transaction_type == models.TransactionType.DEBIT
-        ).scalar() or 0.0
+        نسخه پیش از محاسبه خوانده می‌شود، پس نتیجه هرگز قدیمی‌تر از نسخه‌ای که
+        با آن در کش می‌رود نیست. هر پردازه‌ی uvicorn کش خودش را دارد ولی نسخه
+        از پایگاه داده خوانده می‌شود، پس نوشتن در یک پردازه کش بقیه را هم باطل می‌کند.
+        """
+        version = DataVersion.current(db)
+        stats = dashboard_cache.get(version)
+        if stats is None:
+            stats = AccountingService._compute_dashboard_stats(db)
+            dashboard_cache.put(version, stats)
+        return stats
+    
+    @staticmethod
+    def _compute_dashboard_stats(db: Session) -> schemas.DashboardStats:
+        """جمع‌ها و شمارش‌ها با یک کوئری و اسناد اخیر با آرتیکل‌هایشان (selectinload)"""
+        total_entries = select(func.count(models.JournalEntry.id)).scalar_subquery()
+        total_accounts = select(func.count(models.Account.id)).where(
+            models.Account.is_active == True
+        ).scalar_subquery()
+        backend = trial_balance.get_backend(db)
         
-        total_credit = db.query(func.sum(models.Transaction.amount)).filter(
-            models.Transaction.transaction_type == models.TransactionType.CREDIT
-        ).scalar() or 0.0
+        totals = db.execute(
+            select(
+                total_entries,
+                total_accounts,
+                func.coalesce(backend.conditional_sum(models.TransactionType.DEBIT), 0),
+                func.coalesce(backend.conditional_sum(models.TransactionType.CREDIT), 0),
+            ).select_from(models.Transaction)
+        ).one()
+        total_entries, total_accounts, total_debit, total_credit = totals
         
-        recent_entries = db.query(models.JournalEntry).order_by(
-            models.JournalEntry.created_at.desc()
-        ).limit(10).all()
+        recent_entries = db.scalars(
+            select(models.JournalEntry)
+            .options(WITH_TRANSACTIONS)
+            .order_by(models.JournalEntry.created_at.desc())
+            .limit(RECENT_ENTRIES)
+        ).all()
         
         return schemas.DashboardStats(
             total_entries=total_entries,
@@ -115,145 +257,278 @@ class AccountingService:
     
     @staticmethod
     def create_journal_entry_from_voice(db: Session, voice_data: dict, 
-                                       voice_text: str) -> models.JournalEntry:
+                                       voice_text: str, audio_key: Optional[str] = None) -> models.JournalEntry:
         """
         ثبت سند حسابداری دوبل از دستور صوتی
         
         منطق حسابداری دوبل:
         - دریافت پول: صندوق (بدهکار) / طرف حساب (بستانکار)
         - پرداخت پول: طرف حساب (بدهکار) / صندوق (بستانکار)
+        
+        با audio_key، VoiceLog فایل صوتی در همان تراکنش سند ثبت می‌شود.
         """
-        entry_number = AccountingService._generate_entry_number(db)
+        entry_id, _ = AccountingService.post_voice_entries(db, [(voice_data, voice_text)])[0]
+        if audio_key:
+            db.add(models.VoiceLog(
+                journal_entry_id=entry_id,
+                audio_path=audio_key,
+                transcribed_text=voice_text,
+                parsed_data=json.dumps(voice_data, ensure_ascii=False),
+                is_processed=True
+            ))
+        db.commit()
         
-        counterparty_name = voice_data.get('counterparty', 'نامشخص')
-        amount = voice_data.get('amount', 0)
-        transaction_type = voice_data.get('transaction_type')
+        return db.get(models.JournalEntry, entry_id)
+    
+    @staticmethod
+    def post_voice_entries(db: Session, commands: List[Tuple[dict, str]]) -> List[Tuple[int, str]]:
+        """
+        ثبت اسناد چند دستور صوتی در تراکنش جاری (بدون commit)
         
-        # ساخت توضیحات استاندارد حسابداری
-        if transaction_type == 'payment':
-            # پرداخت: ما به کسی پول دادیم
-            standard_description = f"پرداخت {amount:,.0f} ریال به {counterparty_name}"
-        else:
-            # دریافت: کسی به ما پول داد
-            standard_description = f"دریافت {amount:,.0f} ریال از {counterparty_name}"
+        commands فهرست (خروجی parse_voice_command، متن دستور) و خروجی (شناسه،
+        شماره‌ی سند) هر دستور است. شماره‌ها یک‌جا رزرو می‌شوند، طرف حساب‌ها با
+        یک جستجو یافته یا ساخته می‌شوند و اسناد و آرتیکل‌ها با درج چندتایی
+        (executemany) نوشته می‌شوند.
+        """
+        moment = datetime.now()
+        entry_numbers = AccountingService._reserve_entry_numbers(db, [moment] * len(commands))
         
-        journal_entry = models.JournalEntry(
-            entry_number=entry_number,
-            date=datetime.now(),
-            description=standard_description,
-            source='voice',
-            voice_text=voice_text
-        )
-        db.add(journal_entry)
-        db.flush()
+        accounts = AccountingService._get_or_create_accounts(db, [(CASH_ACCOUNT, models.AccountType.ASSET)] + [
+            (AccountingService._voice_counterparty(voice_data), AccountingService._voice_account_type(voice_data))
+            for voice_data, _ in commands
+        ])
+        cash_account = accounts[normalize_name(CASH_ACCOUNT)]
         
-        # حساب صندوق
-        cash_account = AccountingService._get_or_create_account(
-            db, 'صندوق', models.AccountType.ASSET
-        )
+        rows = [
+            AccountingService._voice_entry(
+                voice_data, voice_text, entry_number, moment, cash_account,
+                accounts[normalize_name(AccountingService._voice_counterparty(voice_data))]
+            )
+            for (voice_data, voice_text), entry_number in zip(commands, entry_numbers)
+        ]
+        
+        db.execute(insert(models.JournalEntry.__table__), [entry for entry, _ in rows])
+        # شماره‌ی سند یکتاست؛ یک SELECT همه‌ی شناسه‌ها را برمی‌گرداند
+        ids_by_number = dict(db.query(models.JournalEntry.entry_number, models.JournalEntry.id).filter(
+            models.JournalEntry.entry_number.in_(entry_numbers)
+        ).all())
+        entry_ids = [ids_by_number[number] for number in entry_numbers]
+        
+        db.execute(insert(models.Transaction.__table__), [
+            {**trans, 'journal_entry_id': entry_id}
+            for entry_id, (_, transactions) in zip(entry_ids, rows)
+            for trans in transactions
+        ])
+        LedgerService.apply_many(db, [
+            (moment, [
+                Posting(trans['account_id'], trans['transaction_type'], trans['amount'])
+                for trans in transactions
+            ])
+            for _, transactions in rows
+        ])
+        
+        return list(zip(entry_ids, entry_numbers))
+    
+    @staticmethod
+    def _voice_counterparty(voice_data: dict) -> str:
+        return voice_data.get('counterparty') or 'نامشخص'
+    
+    @staticmethod
+    def _voice_account_type(voice_data: dict) -> models.AccountType:
+        # پرداخت: ما به طرف حساب بدهکاریم؛ دریافت: او به ما
+        if voice_data.get('transaction_type') == 'payment':
+            return models.AccountType.CREDITOR
+        return models.AccountType.DEBTOR
+    
+    @staticmethod
+    def _voice_entry(voice_data: dict, voice_text: str, entry_number: str, moment: datetime,
+                     cash_account: models.Account, counterparty_account: models.Account
+                     ) -> Tuple[dict, List[dict]]:
+        """ردیف سند و آرتیکل‌های یک دستور صوتی برای درج چندتایی"""
+        counterparty_name = AccountingService._voice_counterparty(voice_data)
+        amount = to_rials(voice_data.get('amount') or 0)
         
         if voice_data.get('transaction_type') == 'payment':
             # پرداخت: ما به کسی پول دادیم
             # مثال: "به آذین 500 هزار تومان دادم"
-            # بدهکار: آذین (بستانکار)
-            # بستانکار: صندوق
-            
-            # ایجاد/دریافت حساب بستانکار
-            creditor_account = AccountingService._get_or_create_account(
-                db, counterparty_name, models.AccountType.CREDITOR
-            )
-            
-            # بدهکار: بستانکار (ما به او بدهکاریم)
-            db.add(models.Transaction(
-                journal_entry_id=journal_entry.id,
-                account_id=creditor_account.id,
-                transaction_type=models.TransactionType.DEBIT,
-                amount=amount,
-                description=f'{counterparty_name} - بدهکار'
-            ))
-            
-            # بستانکار: صندوق (پول از صندوق کم شد)
-            db.add(models.Transaction(
-                journal_entry_id=journal_entry.id,
-                account_id=cash_account.id,
-                transaction_type=models.TransactionType.CREDIT,
-                amount=amount,
-                description=f'صندوق - بستانکار'
-            ))
-            
+            # بدهکار: آذین (بستانکار) / بستانکار: صندوق
+            standard_description = f"پرداخت {amount:,.0f} ریال به {counterparty_name}"
+            debit_account, credit_account = counterparty_account, cash_account
+            debit_description = f'{counterparty_name} - بدهکار'
+            credit_description = 'صندوق - بستانکار'
         else:
             # دریافت: کسی به ما پول داد
             # مثال: "آذین به من 500 هزار تومان داد"
-            # بدهکار: صندوق
-            # بستانکار: آذین (بدهکار)
-            
-            # ایجاد/دریافت حساب بدهکار
-            debtor_account = AccountingService._get_or_create_account(
-                db, counterparty_name, models.AccountType.DEBTOR
-            )
-            
-            # بدهکار: صندوق (پول به صندوق اضافه شد)
-            db.add(models.Transaction(
-                journal_entry_id=journal_entry.id,
-                account_id=cash_account.id,
-                transaction_type=models.TransactionType.DEBIT,
-                amount=amount,
-                description=f'صندوق - بدهکار'
-            ))
-            
-            # بستانکار: بدهکار (او به ما بدهکار است)
-            db.add(models.Transaction(
-                journal_entry_id=journal_entry.id,
-                account_id=debtor_account.id,
-                transaction_type=models.TransactionType.CREDIT,
-                amount=amount,
-                description=f'{counterparty_name} - بستانکار'
-            ))
-        
-        db.commit()
-        db.refresh(journal_entry)
+            # بدهکار: صندوق / بستانکار: آذین (بدهکار)
+            standard_description = f"دریافت {amount:,.0f} ریال از {counterparty_name}"
+            debit_account, credit_account = cash_account, counterparty_account
+            debit_description = 'صندوق - بدهکار'
+            credit_description = f'{counterparty_name} - بستانکار'
         
-        return journal_entry
+        entry = {
+            'entry_number': entry_number,
+            'date': moment,
+            'description': standard_description,
+            'source': 'voice',
+            'voice_text': voice_text,
+        }
+        transactions = [
+            {
+                'account_id': debit_account.id,
+                'transaction_type': models.TransactionType.DEBIT,
+                'amount': amount,
+                'description': debit_description,
+            },
+            {
+                'account_id': credit_account.id,
+                'transaction_type': models.TransactionType.CREDIT,
+                'amount': amount,
+                'description': credit_description,
+            },
+        ]
+        return entry, transactions
     
     @staticmethod
-    def _generate_entry_number(db: Session) -> str:
-        last_entry = db.query(models.JournalEntry).order_by(
-            models.JournalEntry.id.desc()
-        ).first()
+    def _generate_entry_number(db: Session, date: Optional[datetime] = None) -> str:
+        return EntryNumberAllocator.reserve(db, date or datetime.now())[0]
+    
+    @staticmethod
+    def _reserve_entry_numbers(db: Session, dates: List[datetime]) -> List[str]:
+        """رزرو شماره برای ورود دسته‌ای؛ برای هر سال مالی یک بلوک"""
+        return EntryNumberAllocator.assign(db, dates)
+    
+    @staticmethod
+    def _find_account(db: Session, key: str) -> Optional[models.Account]:
+        account_id = account_cache.pending(db, key) or account_cache.get(key)
+        if account_id is not None:
+            account = db.get(models.Account, account_id)
+            if account is not None and account.normalized_name == key:
+                return account
+            account_cache.discard(key)
         
-        if last_entry:
-            last_number = int(last_entry.entry_number.split('-')[1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        account = db.query(models.Account).filter(
+            models.Account.normalized_name == key
+        ).order_by(models.Account.id).first()
+        
+        if account is not None and account_cache.pending(db, key) is None:
+            account_cache.put(key, account.id)
+        return account
+    
+    @staticmethod
+    def _find_accounts(db: Session, keys: Iterable[str]) -> Dict[str, models.Account]:
+        """نسخه‌ی چندتایی _find_account با یک جستجو؛ از چند حساب هم‌نام قدیمی‌ترین"""
+        accounts: Dict[str, models.Account] = {}
+        for account in db.query(models.Account).filter(
+            models.Account.normalized_name.in_(list(keys))
+        ).order_by(models.Account.id):
+            accounts.setdefault(account.normalized_name, account)
         
-        return f"JE-{new_number:06d}"
+        for key, account in accounts.items():
+            if account_cache.pending(db, key) is None:
+                account_cache.put(key, account.id)
+        return accounts
+    
+    @staticmethod
+    def _account_code_seed(db: Session) -> int:
+        last_account = db.query(models.Account).order_by(
+            models.Account.id.desc()
+        ).first()
+        if last_account and last_account.code.isdigit():
+            return int(last_account.code) + 1
+        return 1001
+    
+    @staticmethod
+    def _next_account_code(db: Session) -> str:
+        while True:
+            code = str(SequenceService.reserve(
+                db, ACCOUNT_CODE_SEQUENCE, seed=AccountingService._account_code_seed
+            )).zfill(4)
+            exists = db.query(models.Account.id).filter(models.Account.code == code).first()
+            if not exists:
+                return code
+    
+    @staticmethod
+    def _next_account_codes(db: Session, count: int) -> List[str]:
+        """رزرو یک بلوک کد حساب؛ کدهایی که از قبل دستی گرفته شده‌اند جایگزین می‌شوند"""
+        first = SequenceService.reserve(
+            db, ACCOUNT_CODE_SEQUENCE, count, seed=AccountingService._account_code_seed
+        )
+        codes = [str(value).zfill(4) for value in range(first, first + count)]
+        taken = {
+            row.code for row in db.query(models.Account.code).filter(models.Account.code.in_(codes))
+        }
+        return [AccountingService._next_account_code(db) if code in taken else code for code in codes]
     
     @staticmethod
     def _get_or_create_account(db: Session, name: str, 
                                account_type: models.AccountType) -> models.Account:
+        """
+        یافتن حساب با نام یکسان‌شده یا ساختن آن در تراکنش جاری (بدون commit)
+        
+        رزرو کد حساب ردیف شمارنده را تا پایان تراکنش قفل می‌کند؛ جستجوی دوباره
+        بعد از آن تضمین می‌کند دو درخواست هم‌زمان یک حساب را دو بار نسازند.
+        """
+        key = normalize_name(name)
+        account = AccountingService._find_account(db, key)
+        if account:
+            return account
+        
+        code = AccountingService._next_account_code(db)
         account = db.query(models.Account).filter(
-            models.Account.name == name
-        ).first()
+            models.Account.normalized_name == key
+        ).order_by(models.Account.id).first()
+        if account:
+            return account
         
-        if not account:
-            last_account = db.query(models.Account).order_by(
-                models.Account.id.desc()
-            ).first()
-            
-            if last_account:
-                last_code = int(last_account.code)
-                new_code = str(last_code + 1).zfill(4)
-            else:
-                new_code = "1001"
-            
+        account = models.Account(
+            code=code,
+            name=name.strip(),
+            account_type=account_type
+        )
+        db.add(account)
+        db.flush()
+        HierarchyService.assign_path(db, account)
+        account_cache.put_after_commit(db, key, account.id)
+        
+        return account
+    
+    @staticmethod
+    def _get_or_create_accounts(db: Session, wanted: List[Tuple[str, models.AccountType]]
+                                ) -> Dict[str, models.Account]:
+        """
+        نسخه‌ی چندتایی _get_or_create_account با خروجی بر اساس نام یکسان‌شده
+        
+        همه‌ی نام‌ها با یک جستجو یافته می‌شوند و برای حساب‌های تازه یک بلوک کد
+        رزرو می‌شود؛ نوع حساب تازه از اولین درخواست همان نام گرفته می‌شود.
+        """
+        names: Dict[str, Tuple[str, models.AccountType]] = {}
+        for name, account_type in wanted:
+            names.setdefault(normalize_name(name), (name, account_type))
+        
+        accounts = AccountingService._find_accounts(db, names)
+        missing = [key for key in names if key not in accounts]
+        if not missing:
+            return accounts
+        
+        codes = AccountingService._next_account_codes(db, len(missing))
+        # شمارنده‌ی کد حساب تا پایان تراکنش قفل است؛ جستجوی دوباره مثل _get_or_create_account
+        accounts.update(AccountingService._find_accounts(db, missing))
+        
+        created = []
+        for key, code in zip([key for key in missing if key not in accounts], codes):
+            name, account_type = names[key]
             account = models.Account(
-                code=new_code,
-                name=name,
+                code=code,
+                name=name.strip(),
                 account_type=account_type
             )
-            db.add(account)
-            db.commit()
-            db.refresh(account)
+            accounts[key] = account
+            created.append((key, account))
         
-        return account
+        db.add_all([account for _, account in created])
+        db.flush()
+        for key, account in created:
+            HierarchyService.assign_path(db, account)
+            account_cache.put_after_commit(db, key, account.id)
+        
+        return accounts
@@ -0,0 +1,154 @@
+"""
+ذخیره‌سازی محتوامحور فایل‌های بارگذاری‌شده (تصویر فیش و صوت)
+
+هر فایل با sha256 محتوایش کلید می‌گیرد: receipts/ab/cd/abcd...، پس فایل
+تکراری فقط یک بار ذخیره می‌شود و دو پوشه‌ی دوحرفی تعداد فایل هر پوشه را
+کوچک نگه می‌دارد. Receipt.image_path و VoiceLog.audio_path همین کلید را
+نگه می‌دارند؛ رکوردهای قدیمی که مسیر فایل دارند همچنان خوانده می‌شوند.
+"""
+from abc import ABC, abstractmethod
+import os
+import re
+import time
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Type
+from config import settings
+
+NAMESPACES = ('receipts', 'audio')
+KEY_PATTERN = re.compile(r'^[a-z]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}$')
+
+
+def blob_key(namespace: str, content_hash: str) -> str:
+    if namespace not in NAMESPACES:
+        raise ValueError(f"فضای نام ذخیره‌ساز نامعتبر: {namespace}")
+    return f"{namespace}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+def is_blob_key(value: Optional[str]) -> bool:
+    return bool(value) and KEY_PATTERN.match(value) is not None
+
+
+class BlobStore(ABC):
+    """
+    رابط ذخیره‌ساز
+    
+    بارگذاری‌ها ابتدا در staging_dir (دیسک محلی) نوشته و hash می‌شوند و put
+    آن‌ها را به ذخیره‌ساز می‌سپارد. پیاده‌سازی سازگار با S3 می‌تواند put را با
+    آپلود، local_path را با دانلود در یک کش محلی (برای OCR) و iter_blobs را با
+    ListObjects پیاده کند.
+    """
+    
+    name = "base"
+    
+    @property
+    @abstractmethod
+    def staging_dir(self) -> str:
+        ...
+    
+    @abstractmethod
+    def put(self, temp_path: str, namespace: str, content_hash: str) -> str:
+        """انتقال فایل موقت به ذخیره‌ساز و برگرداندن کلید؛ اگر همان محتوا موجود باشد فایل موقت حذف می‌شود"""
+    
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        """مسیر فایل روی دیسک محلی برای خواندن (OCR، پاسخ فایل)"""
+    
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), 'rb')
+    
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+    
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """همه‌ی کلیدها همراه با زمان آخرین نوشتن (epoch)"""
+    
+    def clean_staging(self, older_than: float) -> int:
+        """حذف فایل‌های موقت رهاشده (مثلاً پس از قطع شدن پردازه وسط بارگذاری)"""
+        removed = 0
+        cutoff = time.time() - older_than
+        for entry in os.scandir(self.staging_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+class LocalBlobStore(BlobStore):
+    name = "local"
+    
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.STORAGE_ROOT
+        os.makedirs(self.staging_dir, exist_ok=True)
+    
+    @property
+    def staging_dir(self) -> str:
+        # روی همان دیسک ریشه تا os.replace اتمی باشد
+        return os.path.join(self.root, "tmp")
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+    
+    def put(self, temp_path: str, namespace: str, content_hash: str) -> str:
+        key = blob_key(namespace, content_hash)
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            # زمان نوشتن تازه می‌شود تا GC نسخه‌ای را که دوباره بارگذاری شده پاک نکند
+            os.utime(path)
+            return key
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return key
+    
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+    
+    def local_path(self, key: str) -> str:
+        # رکوردهای پیش از ذخیره‌ساز مسیر فایل (uploads/receipts/...) دارند
+        return self._path(key) if is_blob_key(key) else key
+    
+    def delete(self, key: str):
+        if not is_blob_key(key):
+            raise ValueError(f"کلید نامعتبر: {key}")
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+    
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        for namespace in NAMESPACES:
+            base = os.path.join(self.root, namespace)
+            if not os.path.isdir(base):
+                continue
+            for shard1 in os.scandir(base):
+                if not shard1.is_dir():
+                    continue
+                for shard2 in os.scandir(shard1.path):
+                    if not shard2.is_dir():
+                        continue
+                    for entry in os.scandir(shard2.path):
+                        key = f"{namespace}/{shard1.name}/{shard2.name}/{entry.name}"
+                        if entry.is_file() and is_blob_key(key):
+                            yield key, entry.stat().st_mtime
+
+
+BACKENDS: Dict[str, Type[BlobStore]] = {
+    'local': LocalBlobStore,
+}
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        if settings.STORAGE_BACKEND not in BACKENDS:
+            raise ValueError(f"ذخیره‌ساز نامعتبر: {settings.STORAGE_BACKEND}")
+        _store = BACKENDS[settings.STORAGE_BACKEND]()
+    return _store
@@ -0,0 +1,375 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+import csv
+import io
+import json
+import logging
+import time
+import models
+import schemas
+from config import settings
+from money import parse_rials
+from services.ledger_service import LedgerService, Posting
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 1000
+# جزئیات خطای پایگاه داده فقط در لاگ است
+POST_ERROR = "ثبت سند با خطا مواجه شد"
+
+TRANSACTION_TYPES = {
+    models.TransactionType.DEBIT.value: models.TransactionType.DEBIT,
+    models.TransactionType.CREDIT.value: models.TransactionType.CREDIT,
+    'debit': models.TransactionType.DEBIT,
+    'credit': models.TransactionType.CREDIT,
+}
+
+CSV_REQUIRED_COLUMNS = {'entry', 'date', 'description', 'transaction_type', 'amount'}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ParsedLine:
+    account_id: Optional[int]
+    account_code: Optional[str]
+    transaction_type: models.TransactionType
+    amount: int
+    description: Optional[str] = None
+
+
+@dataclass
+class ParsedEntry:
+    line: int
+    key: str
+    date: datetime
+    description: str
+    reference: Optional[str] = None
+    lines: List[ParsedLine] = field(default_factory=list)
+
+
+def _parse_transaction_type(value) -> models.TransactionType:
+    transaction_type = TRANSACTION_TYPES.get(str(value).strip().lower())
+    if transaction_type is None:
+        raise ImportRowError(f"نوع تراکنش نامعتبر: {value}")
+    return transaction_type
+
+
+def _parse_amount(value) -> int:
+    try:
+        amount = parse_rials(value)
+    except ValueError as e:
+        raise ImportRowError(str(e))
+    if amount <= 0:
+        raise ImportRowError(f"مبلغ باید مثبت باشد: {value}")
+    return amount
+
+
+def _parse_date(value) -> datetime:
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ImportRowError(f"تاریخ نامعتبر: {value}")
+
+
+def _parse_line(account_id, account_code, transaction_type, amount, description) -> ParsedLine:
+    if account_id in (None, ''):
+        account_id = None
+    else:
+        try:
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            raise ImportRowError(f"شناسه‌ی حساب نامعتبر: {account_id}")
+    
+    account_code = str(account_code).strip() if account_code not in (None, '') else None
+    if account_id is None and account_code is None:
+        raise ImportRowError("حساب مشخص نشده است (account_id یا account_code)")
+    
+    return ParsedLine(
+        account_id=account_id,
+        account_code=account_code,
+        transaction_type=_parse_transaction_type(transaction_type),
+        amount=_parse_amount(amount),
+        description=description or None
+    )
+
+
+def parse_jsonl(stream: IO[str]) -> Iterator[Tuple[int, str, object]]:
+    """
+    هر خط یک سند: {"date", "description", "reference", "transactions": [...]}
+    
+    خروجی (شماره‌ی خط، کلید سند، ParsedEntry یا ImportRowError) است.
+    """
+    for number, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        key = str(number)
+        try:
+            data = json.loads(raw)
+            key = str(data.get('reference') or number)
+            entry = ParsedEntry(
+                line=number,
+                key=key,
+                date=_parse_date(data['date']),
+                description=data['description'],
+                reference=data.get('reference'),
+                lines=[
+                    _parse_line(
+                        trans.get('account_id'),
+                        trans.get('account_code'),
+                        trans['transaction_type'],
+                        trans['amount'],
+                        trans.get('description')
+                    )
+                    for trans in data['transactions']
+                ]
+            )
+            yield number, key, entry
+        except ImportRowError as e:
+            yield number, key, e
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            yield number, key, ImportRowError(f"ساختار خط نامعتبر: {e}")
+
+
+def parse_csv(stream: IO[str]) -> Iterator[Tuple[int, str, object]]:
+    """
+    هر ردیف یک آرتیکل؛ ردیف‌های پشت‌سرهم با مقدار یکسان ستون entry یک سند هستند
+    
+    ستون‌ها: entry, date, description, reference, account_id, account_code,
+    transaction_type, amount, line_description
+    """
+    reader = csv.DictReader(stream)
+    missing = CSV_REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"ستون‌های ضروری در فایل CSV نیست: {', '.join(sorted(missing))}")
+    if not {'account_id', 'account_code'} & set(reader.fieldnames):
+        raise ValueError("ستون account_id یا account_code در فایل CSV نیست")
+    
+    current: Optional[ParsedEntry] = None
+    failed: Optional[Tuple[int, str, ImportRowError]] = None
+    
+    for row in reader:
+        number = reader.line_num
+        key = (row.get('entry') or '').strip()
+        
+        if not key:
+            # ردیف بدون entry به هیچ سندی تعلق ندارد؛ هر کدام یک خطای جداست
+            if current is not None:
+                yield current.line, current.key, current
+                current = None
+            if failed is not None:
+                yield failed
+                failed = None
+            yield number, key, ImportRowError("ستون entry خالی است")
+            continue
+        
+        if current is not None and key != current.key:
+            yield current.line, current.key, current
+            current = None
+        if failed is not None and key != failed[1]:
+            yield failed
+            failed = None
+        if failed is not None:
+            # بقیه‌ی ردیف‌های سندی که خطا دارد نادیده گرفته می‌شوند
+            continue
+        
+        try:
+            if current is None:
+                current = ParsedEntry(
+                    line=number,
+                    key=key,
+                    date=_parse_date(row['date']),
+                    description=row['description'],
+                    reference=row.get('reference') or None
+                )
+            current.lines.append(_parse_line(
+                row.get('account_id'),
+                row.get('account_code'),
+                row['transaction_type'],
+                row['amount'],
+                row.get('line_description')
+            ))
+        except ImportRowError as e:
+            failed = (number, key, e)
+            current = None
+    
+    if current is not None:
+        yield current.line, current.key, current
+    if failed is not None:
+        yield failed
+
+
+class JournalBulkImporter:
+    """
+    ورود دسته‌ای اسناد
+    
+    اسناد در دسته‌های chunk_size تایی اعتبارسنجی و با درج چندتایی (executemany)
+    نوشته می‌شوند و هر دسته در یک تراکنش جداگانه commit می‌شود. خطای یک سند
+    فقط همان سند را رد می‌کند؛ اگر ثبت دسته در پایگاه داده خطا بدهد، اسناد آن
+    یکی‌یکی دوباره ثبت می‌شوند.
+    """
+    
+    def __init__(self, db: Session, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+        self.result = schemas.BulkImportResult()
+    
+    def run(self, parsed: Iterable[Tuple[int, str, object]]) -> schemas.BulkImportResult:
+        started = time.perf_counter()
+        chunk: List[ParsedEntry] = []
+        
+        total = 0
+        for number, key, item in parsed:
+            total += 1
+            if isinstance(item, ImportRowError):
+                self._error(number, key, str(item))
+                continue
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        
+        if chunk:
+            self._flush(chunk)
+        
+        self.result.total = total
+        self.result.elapsed_seconds = round(time.perf_counter() - started, 3)
+        return self.result
+    
+    def _error(self, line: int, key: str, message: str):
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(schemas.BulkImportError(line=line, entry=key, error=message))
+        else:
+            self.result.errors_truncated = True
+    
+    def _resolve_accounts(self, chunk: List[ParsedEntry]) -> Tuple[Dict[int, int], Dict[str, int]]:
+        ids = {line.account_id for entry in chunk for line in entry.lines if line.account_id is not None}
+        codes = {line.account_code for entry in chunk for line in entry.lines if line.account_id is None}
+        
+        conditions = []
+        if ids:
+            conditions.append(models.Account.id.in_(ids))
+        if codes:
+            conditions.append(models.Account.code.in_(codes))
+        
+        rows = self.db.query(models.Account.id, models.Account.code).filter(
+            or_(*conditions), models.Account.is_active == True
+        ).all()
+        
+        return {row.id: row.id for row in rows}, {row.code: row.id for row in rows}
+    
+    def _validate(self, entry: ParsedEntry, by_id: Dict[int, int], by_code: Dict[str, int]) -> List[dict]:
+        if len(entry.lines) < 2:
+            raise ImportRowError("سند باید حداقل دو آرتیکل داشته باشد")
+        
+        total_debit = 0
+        total_credit = 0
+        transactions = []
+        for line in entry.lines:
+            if line.account_id is not None:
+                account_id = by_id.get(line.account_id)
+            else:
+                account_id = by_code.get(line.account_code)
+            if account_id is None:
+                raise ImportRowError(f"حساب یافت نشد: {line.account_id or line.account_code}")
+            
+            if line.transaction_type == models.TransactionType.DEBIT:
+                total_debit += line.amount
+            else:
+                total_credit += line.amount
+            
+            transactions.append({
+                'account_id': account_id,
+                'transaction_type': line.transaction_type,
+                'amount': line.amount,
+                'description': line.description,
+            })
+        
+        if total_debit != total_credit:
+            raise ImportRowError(f"سند متوازن نیست. بدهکار: {total_debit}, بستانکار: {total_credit}")
+        
+        return transactions
+    
+    def _flush(self, chunk: List[ParsedEntry]):
+        by_id, by_code = self._resolve_accounts(chunk)
+        
+        valid = []
+        for entry in chunk:
+            try:
+                valid.append((entry, self._validate(entry, by_id, by_code)))
+            except ImportRowError as e:
+                self._error(entry.line, entry.key, str(e))
+        
+        if not valid:
+            return
+        
+        if self._post(valid):
+            return
+        # یک سند معیوب کل دسته را برگرداند؛ سندها یکی‌یکی ثبت می‌شوند تا فقط همان خطا بخورد
+        if len(valid) == 1:
+            entry, _ = valid[0]
+            self._error(entry.line, entry.key, POST_ERROR)
+            return
+        for item in valid:
+            if not self._post([item]):
+                entry, _ = item
+                self._error(entry.line, entry.key, POST_ERROR)
+    
+    def _post(self, valid: List[Tuple[ParsedEntry, List[dict]]]) -> bool:
+        """ثبت اسناد معتبر در یک تراکنش؛ در صورت خطا rollback و False"""
+        from services.accounting_service import AccountingService
+        
+        try:
+            numbers = AccountingService._reserve_entry_numbers(self.db, [entry.date for entry, _ in valid])
+            self.db.execute(insert(models.JournalEntry.__table__), [
+                {
+                    'entry_number': number,
+                    'date': entry.date,
+                    'description': entry.description,
+                    'reference': entry.reference,
+                    'source': 'import',
+                }
+                for number, (entry, _) in zip(numbers, valid)
+            ])
+            # شماره‌ی سند یکتاست؛ یک SELECT همه‌ی شناسه‌ها را برمی‌گرداند
+            ids_by_number = dict(self.db.query(models.JournalEntry.entry_number, models.JournalEntry.id).filter(
+                models.JournalEntry.entry_number.in_(numbers)
+            ).all())
+            entry_ids = [ids_by_number[number] for number in numbers]
+            
+            rows = []
+            for entry_id, (_, transactions) in zip(entry_ids, valid):
+                for trans in transactions:
+                    trans['journal_entry_id'] = entry_id
+                    rows.append(trans)
+            self.db.execute(insert(models.Transaction.__table__), rows)
+            
+            LedgerService.apply_many(self.db, [
+                (entry.date, [
+                    Posting(trans['account_id'], trans['transaction_type'], trans['amount'])
+                    for trans in transactions
+                ])
+                for entry, transactions in valid
+            ])
+            
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            logger.exception("importing a chunk of %d journal entries failed", len(valid))
+            return False
+        
+        self.result.imported += len(valid)
+        self.result.entry_numbers_from = self.result.entry_numbers_from or min(numbers)
+        self.result.entry_numbers_to = max(numbers)
+        return True
+
+
+def open_text(raw: IO[bytes]) -> IO[str]:
+    return io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
@@ -0,0 +1,100 @@
+"""
+شمارنده‌ی نسخه‌ی داده‌های دفتر
+
+هر تراکنشی که اسناد، آرتیکل‌ها یا حساب‌ها را تغییر دهد، پیش از commit ردیف
+ledger_version در number_sequences را یکی زیاد می‌کند؛ پس نسخه همراه همان
+تراکنش ثبت یا برگردانده می‌شود. کش‌های درون‌پردازه‌ای (مثل داشبورد) نتیجه را
+با نسخه نگه می‌دارند و با خواندن یک ردیف می‌فهمند داده‌ای (حتی از پردازه‌ی
+دیگر) عوض شده است یا نه.
+
+تغییرهایی که بیرون از Session انجام شوند (SQL دستی) نسخه را عوض نمی‌کنند.
+"""
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from typing import Any, Optional
+import threading
+import models
+from services.sequence_service import SequenceService
+
+LEDGER_VERSION = 'ledger_version'
+CHANGED_KEY = 'ledger_version_changed'
+WATCHED_TABLES = frozenset({
+    models.JournalEntry.__tablename__,
+    models.Transaction.__tablename__,
+    models.Account.__tablename__,
+})
+
+
+class DataVersion:
+    @staticmethod
+    def current(db: Session) -> int:
+        table = models.NumberSequence.__table__
+        return db.execute(
+            select(table.c.next_value).where(table.c.name == LEDGER_VERSION)
+        ).scalar() or 0
+    
+    @staticmethod
+    def bump(db: Session):
+        SequenceService.reserve(db, LEDGER_VERSION)
+    
+    @staticmethod
+    def mark_changed(db: Session):
+        db.info[CHANGED_KEY] = True
+
+
+class VersionedCache:
+    """آخرین نتیجه‌ی یک محاسبه همراه با نسخه‌ی داده‌ای که از آن ساخته شده"""
+    
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+    
+    def get(self, version: int) -> Optional[Any]:
+        with self._lock:
+            return self._value if self._version == version else None
+    
+    def put(self, version: int, value: Any):
+        with self._lock:
+            # نتیجه‌ی درخواستی که نسخه‌ی قدیمی‌تر را خوانده جای نتیجه‌ی تازه‌تر را نمی‌گیرد
+            if self._version is None or version >= self._version:
+                self._version, self._value = version, value
+    
+    def clear(self):
+        with self._lock:
+            self._version = self._value = None
+
+
+def _watched(instances) -> bool:
+    return any(getattr(instance, '__tablename__', None) in WATCHED_TABLES for instance in instances)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    if not session.info.get(CHANGED_KEY) and (
+        _watched(session.new) or _watched(session.dirty) or _watched(session.deleted)
+    ):
+        session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(orm_execute_state):
+    # درج و به‌روزرسانی چندتایی (executemany) از flush عبور نمی‌کنند
+    if orm_execute_state.is_select or orm_execute_state.session.info.get(CHANGED_KEY):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in WATCHED_TABLES:
+        orm_execute_state.session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'before_commit')
+def _before_commit(session):
+    # commit پس از این رویداد flush می‌کند؛ تغییرهای flush‌نشده باید اینجا دیده شوند
+    session.flush()
+    if session.info.pop(CHANGED_KEY, False):
+        DataVersion.bump(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop(CHANGED_KEY, None)
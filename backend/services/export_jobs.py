@@ -0,0 +1,174 @@
+"""
+کارهای خروجی پس‌زمینه
+
+خروجی‌های بزرگ (مثلاً دفتر یک سال کامل) در پردازه‌های کارگر نوشته می‌شوند تا
+درخواست HTTP منتظر نماند و نوشتن XLSX/Parquet حلقه‌ی رویداد را کند نکند. فایل
+ابتدا با پسوند .part نوشته و پس از پایان کامل جابه‌جا می‌شود؛ با بیرون رفتن
+کار از فهرست نگه‌داری (retention) فایلش هم پاک می‌شود.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+import multiprocessing
+import os
+import threading
+import uuid
+from config import settings
+from services.export_service import ExportParams
+from services.ocr_jobs import QueueFullError
+
+
+def _run_export(report: str, format: str, params: ExportParams, path: str) -> int:
+    from database import SessionLocal
+    from services.export_service import write_export
+    
+    part_path = path + ".part"
+    db = SessionLocal()
+    try:
+        with open(part_path, "wb") as sink:
+            rows = write_export(db, report, format, params, sink)
+        os.replace(part_path, path)
+        return rows
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        db.close()
+
+
+@dataclass
+class ExportJob:
+    id: str
+    report: str
+    format: str
+    params: ExportParams
+    filename: str
+    path: str
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    status: str = "queued"  # queued, running, done, failed
+    rows: Optional[int] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+
+class ExportJobQueue:
+    """صف کارهای خروجی روی یک ProcessPoolExecutor محدود (مانند OCRJobQueue)"""
+    
+    def __init__(self, workers: int, queue_depth: int, directory: str, retention: int = 100):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.directory = directory
+        self.retention = retention
+        self.jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self.active = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        os.makedirs(directory, exist_ok=True)
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def submit(self, report: str, format: str, params: ExportParams, filename: str) -> ExportJob:
+        with self._lock:
+            if self.active >= self.queue_depth:
+                raise QueueFullError("صف خروجی گزارش‌ها پر است؛ کمی بعد دوباره تلاش کنید")
+            
+            job_id = uuid.uuid4().hex
+            path = os.path.abspath(os.path.join(self.directory, f"{job_id}.{format}"))
+            job = ExportJob(id=job_id, report=report, format=format, params=params,
+                            filename=filename, path=path)
+            try:
+                job.future = self._get_executor().submit(_run_export, report, format, params, path)
+            except BrokenProcessPool:
+                self._executor = None
+                job.future = self._get_executor().submit(_run_export, report, format, params, path)
+            
+            self.active += 1
+            self.jobs[job.id] = job
+            self._evict()
+        
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+    
+    def _finish(self, job: ExportJob, future: Future):
+        status = "failed"
+        try:
+            job.rows = future.result()
+            job.size = os.path.getsize(job.path)
+            status = "done"
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            with self._lock:
+                job.status = status
+                job.finished_at = datetime.utcnow()
+                self.active -= 1
+    
+    def _evict(self):
+        finished = len(self.jobs) - self.active
+        for job_id in list(self.jobs):
+            if finished <= self.retention:
+                break
+            job = self.jobs[job_id]
+            if job.future.done():
+                del self.jobs[job_id]
+                _remove(job.path)
+                finished -= 1
+    
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == "queued" and job.future.running():
+                job.status = "running"
+            return job
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        # فهرست کارها در حافظه است؛ پس از خاموشی فایل‌ها قابل دانلود نیستند
+        with self._lock:
+            for job in self.jobs.values():
+                if job.future.done():
+                    _remove(job.path)
+            self.jobs.clear()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_queue: Optional[ExportJobQueue] = None
+
+
+def get_export_queue() -> ExportJobQueue:
+    global _queue
+    if _queue is None:
+        _queue = ExportJobQueue(
+            workers=settings.EXPORT_WORKERS,
+            queue_depth=settings.EXPORT_QUEUE_DEPTH,
+            directory=settings.EXPORT_DIR,
+            retention=settings.EXPORT_JOB_RETENTION
+        )
+    return _queue
+
+
+def shutdown_export_queue():
+    global _queue
+    if _queue is not None:
+        _queue.shutdown()
+        _queue = None
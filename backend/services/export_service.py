@@ -0,0 +1,325 @@
+"""
+خروجی گزارش‌ها برای حسابرسی: CSV، XLSX و Parquet
+
+ردیف‌ها با yield_per (کرسر سمت سرور) خوانده و همان‌جا نوشته می‌شوند، پس
+حافظه به طول گزارش بستگی ندارد:
+- CSV تکه‌تکه در پاسخ HTTP نوشته می‌شود.
+- XLSX با حالت constant_memory در xlsxwriter هر ردیف را بلافاصله روی دیسک می‌نویسد.
+- Parquet هر EXPORT_BATCH_SIZE ردیف را بلافاصله به آرایه‌های ستونی Arrow تبدیل
+  و هر EXPORT_ROW_GROUP_SIZE ردیف را یک row group می‌نویسد.
+
+xlsxwriter و pyarrow اختیاری‌اند و فقط برای همان قالب لازم‌اند.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Generator, Iterator, List, Optional, Tuple, Type
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import csv
+import io
+import models
+from config import settings
+from services.accounting_service import AccountingService
+
+EXPORT_BATCH_SIZE = 1000
+CSV_CHUNK_ROWS = 500
+XLSX_MAX_ROWS = 1048576  # حد هر کاربرگ Excel، با سطر عنوان
+
+
+@dataclass
+class ExportParams:
+    account_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    as_of: Optional[datetime] = None
+
+
+@dataclass
+class ExportColumn:
+    name: str
+    kind: str = "text"  # text, int, money, datetime
+
+
+@dataclass
+class ExportReport:
+    name: str
+    columns: List[ExportColumn]
+    rows: Callable[[Session, ExportParams], Iterator[tuple]]
+    validate: Optional[Callable[[ExportParams], None]] = None
+
+
+def _ledger_rows(db: Session, params: ExportParams) -> Iterator[tuple]:
+    for item, _ in AccountingService.iter_ledger(db, params.account_id, params.start_date, params.end_date):
+        yield item.date, item.entry_number, item.description, item.debit, item.credit, item.balance
+
+
+def _require_account(params: ExportParams):
+    if params.account_id is None:
+        raise ValueError("برای خروجی دفتر حساب account_id لازم است")
+
+
+def _journal_rows(db: Session, params: ExportParams) -> Iterator[tuple]:
+    """هر آرتیکل یک ردیف، به ترتیب تاریخ سند"""
+    query = select(
+        models.JournalEntry.entry_number,
+        models.JournalEntry.date,
+        models.JournalEntry.description,
+        models.JournalEntry.reference,
+        models.JournalEntry.source,
+        models.Account.code,
+        models.Account.name,
+        models.Transaction.transaction_type,
+        models.Transaction.amount,
+        models.Transaction.description,
+    ).join(
+        models.Transaction, models.Transaction.journal_entry_id == models.JournalEntry.id
+    ).join(
+        models.Account, models.Account.id == models.Transaction.account_id
+    )
+    
+    if params.start_date:
+        query = query.where(models.JournalEntry.date >= params.start_date)
+    if params.end_date:
+        query = query.where(models.JournalEntry.date <= params.end_date)
+    
+    query = query.order_by(models.JournalEntry.date, models.JournalEntry.id, models.Transaction.id)
+    for row in db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE)):
+        yield (*row[:7], row[7].value, *row[8:])
+
+
+def _trial_balance_rows(db: Session, params: ExportParams) -> Iterator[tuple]:
+    for item in AccountingService.get_trial_balance(db, params.as_of):
+        yield item.account_code, item.account_name, item.debit, item.credit, item.balance
+
+
+REPORTS: Dict[str, ExportReport] = {
+    'ledger': ExportReport(
+        name='ledger',
+        columns=[
+            ExportColumn('date', 'datetime'),
+            ExportColumn('entry_number'),
+            ExportColumn('description'),
+            ExportColumn('debit', 'money'),
+            ExportColumn('credit', 'money'),
+            ExportColumn('balance', 'money'),
+        ],
+        rows=_ledger_rows,
+        validate=_require_account,
+    ),
+    'journal': ExportReport(
+        name='journal',
+        columns=[
+            ExportColumn('entry_number'),
+            ExportColumn('date', 'datetime'),
+            ExportColumn('description'),
+            ExportColumn('reference'),
+            ExportColumn('source'),
+            ExportColumn('account_code'),
+            ExportColumn('account_name'),
+            ExportColumn('transaction_type'),
+            ExportColumn('amount', 'money'),
+            ExportColumn('line_description'),
+        ],
+        rows=_journal_rows,
+    ),
+    'trial-balance': ExportReport(
+        name='trial-balance',
+        columns=[
+            ExportColumn('account_code'),
+            ExportColumn('account_name'),
+            ExportColumn('debit', 'money'),
+            ExportColumn('credit', 'money'),
+            ExportColumn('balance', 'money'),
+        ],
+        rows=_trial_balance_rows,
+    ),
+}
+
+
+class ExportWriter(ABC):
+    name = "base"
+    extension = ""
+    media_type = "application/octet-stream"
+    
+    def check(self):
+        """خطای ValueError اگر وابستگی این قالب نصب نباشد"""
+    
+    @abstractmethod
+    def write(self, columns: List[ExportColumn], rows: Iterator[tuple], sink: BinaryIO) -> int:
+        """نوشتن همه‌ی ردیف‌ها در sink؛ خروجی تعداد ردیف‌هاست"""
+
+
+class CSVWriter(ExportWriter):
+    """CSV با BOM تا Excel متن فارسی را UTF-8 بخواند"""
+    
+    name = "csv"
+    extension = "csv"
+    media_type = "text/csv"
+    
+    def iter_chunks(self, columns: List[ExportColumn], rows: Iterator[tuple]) -> Generator[bytes, None, int]:
+        """تکه‌های بایتی فایل؛ مقدار بازگشتی مولد (StopIteration.value) تعداد ردیف‌هاست"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow([column.name for column in columns])
+        count = 0
+        for row in rows:
+            writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ])
+            count += 1
+            if count % CSV_CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+        return count
+    
+    def write(self, columns: List[ExportColumn], rows: Iterator[tuple], sink: BinaryIO) -> int:
+        chunks = self.iter_chunks(columns, rows)
+        while True:
+            try:
+                sink.write(next(chunks))
+            except StopIteration as done:
+                return done.value
+
+
+class XLSXWriter(ExportWriter):
+    name = "xlsx"
+    extension = "xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    
+    def check(self):
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            raise ValueError("برای خروجی xlsx بسته‌ی xlsxwriter باید نصب باشد")
+    
+    def write(self, columns: List[ExportColumn], rows: Iterator[tuple], sink: BinaryIO) -> int:
+        import xlsxwriter
+        
+        # constant_memory: هر سطر پس از رفتن به سطر بعد روی دیسک نوشته می‌شود
+        workbook = xlsxwriter.Workbook(sink, {'constant_memory': True})
+        formats = {
+            'money': workbook.add_format({'num_format': '#,##0'}),
+            'datetime': workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'}),
+        }
+        cell_formats = [formats.get(column.kind) for column in columns]
+        
+        def new_sheet():
+            sheet = workbook.add_worksheet()
+            sheet.right_to_left()
+            sheet.write_row(0, 0, [column.name for column in columns])
+            return sheet
+        
+        sheet = new_sheet()
+        row_index = 1
+        count = 0
+        for row in rows:
+            # هر کاربرگ حداکثر 1048576 سطر دارد؛ ادامه در کاربرگ بعدی
+            if row_index == XLSX_MAX_ROWS:
+                sheet = new_sheet()
+                row_index = 1
+            for col_index, value in enumerate(row):
+                if value is None:
+                    continue
+                if isinstance(value, datetime):
+                    sheet.write_datetime(row_index, col_index, value, cell_formats[col_index])
+                else:
+                    sheet.write(row_index, col_index, value, cell_formats[col_index])
+            row_index += 1
+            count += 1
+        
+        workbook.close()
+        return count
+
+
+class ParquetWriter(ExportWriter):
+    name = "parquet"
+    extension = "parquet"
+    media_type = "application/vnd.apache.parquet"
+    
+    def check(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("برای خروجی parquet بسته‌ی pyarrow باید نصب باشد")
+    
+    def write(self, columns: List[ExportColumn], rows: Iterator[tuple], sink: BinaryIO) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        types = {
+            'text': pa.string(),
+            'int': pa.int64(),
+            'money': pa.int64(),
+            'datetime': pa.timestamp('us'),
+        }
+        schema = pa.schema([(column.name, types[column.kind]) for column in columns])
+        row_group_size = settings.EXPORT_ROW_GROUP_SIZE
+        
+        rows = iter(rows)
+        count = 0
+        with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+            # فقط EXPORT_BATCH_SIZE ردیف به شکل tuple پایتونی در حافظه است؛ بقیه‌ی
+            # row group به شکل آرایه‌های ستونی فشرده‌ی Arrow منتظر نوشتن می‌ماند
+            pending: List = []
+            pending_rows = 0
+            while True:
+                batch = list(islice(rows, EXPORT_BATCH_SIZE))
+                if batch:
+                    pending.append(_record_batch(schema, batch))
+                    pending_rows += len(batch)
+                    count += len(batch)
+                if pending and (pending_rows >= row_group_size or not batch):
+                    writer.write_table(pa.Table.from_batches(pending, schema), row_group_size=row_group_size)
+                    pending, pending_rows = [], 0
+                if not batch:
+                    break
+        return count
+
+
+def _record_batch(schema, rows: List[tuple]):
+    import pyarrow as pa
+    return pa.RecordBatch.from_arrays(
+        [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)],
+        schema=schema
+    )
+
+
+FORMATS: Dict[str, Type[ExportWriter]] = {
+    'csv': CSVWriter,
+    'xlsx': XLSXWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def prepare_export(report: str, format: str, params: ExportParams) -> Tuple[ExportReport, ExportWriter]:
+    """گزارش و نویسنده‌ی قالب؛ ValueError برای گزارش، قالب یا پارامتر نامعتبر"""
+    if report not in REPORTS:
+        raise ValueError(f"گزارش نامعتبر: {report}")
+    if format not in FORMATS:
+        raise ValueError(f"قالب خروجی نامعتبر: {format}")
+    
+    export = REPORTS[report]
+    if export.validate:
+        export.validate(params)
+    writer = FORMATS[format]()
+    writer.check()
+    return export, writer
+
+
+def export_filename(report: str, format: str, params: ExportParams) -> str:
+    parts = [report]
+    if params.account_id is not None:
+        parts.append(str(params.account_id))
+    parts.append(datetime.now().strftime('%Y%m%d-%H%M%S'))
+    return f"{'-'.join(parts)}.{FORMATS[format].extension}"
+
+
+def write_export(db: Session, report: str, format: str, params: ExportParams, sink: BinaryIO) -> int:
+    export, writer = prepare_export(report, format, params)
+    return writer.write(export.columns, export.rows(db, params), sink)
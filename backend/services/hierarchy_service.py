@@ -0,0 +1,76 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal
+from typing import Dict, List, Optional, Tuple
+import models
+
+SEPARATOR = "/"
+
+
+class HierarchyService:
+    """
+    مسیر مادی (materialized path) درخت حساب‌ها
+    
+    هر حساب مسیر شناسه‌های اجدادش را به شکل /1/8/15/ نگه می‌دارد، پس همه‌ی
+    زیرمجموعه‌های یک حساب با یک شرط LIKE روی پیشوند مسیر پیدا می‌شوند.
+    """
+    
+    @staticmethod
+    def path_for(parent: Optional[models.Account], account_id: int) -> Tuple[str, int]:
+        if parent is None:
+            return f"{SEPARATOR}{account_id}{SEPARATOR}", 0
+        return f"{parent.path}{account_id}{SEPARATOR}", parent.depth + 1
+    
+    @staticmethod
+    def assign_path(db: Session, account: models.Account):
+        """تعیین مسیر حساب تازه؛ حساب باید flush شده باشد تا id داشته باشد"""
+        parent = None
+        if account.parent_id:
+            parent = db.query(models.Account).filter(models.Account.id == account.parent_id).first()
+        account.path, account.depth = HierarchyService.path_for(parent, account.id)
+    
+    @staticmethod
+    def move(db: Session, account: models.Account, parent_id: Optional[int]):
+        """انتقال حساب و کل زیرشاخه‌اش زیر والد جدید با یک UPDATE"""
+        parent = None
+        if parent_id:
+            parent = db.query(models.Account).filter(models.Account.id == parent_id).first()
+            if not parent:
+                raise ValueError("حساب والد یافت نشد")
+            if parent.path.startswith(account.path):
+                raise ValueError("حساب را نمی‌توان زیر زیرمجموعه‌ی خودش قرار داد")
+        
+        old_path, old_depth = account.path, account.depth
+        new_path, new_depth = HierarchyService.path_for(parent, account.id)
+        
+        db.query(models.Account).filter(
+            models.Account.path.like(f"{old_path}%")
+        ).update({
+            models.Account.path: literal(new_path) + func.substr(models.Account.path, len(old_path) + 1),
+            models.Account.depth: models.Account.depth + (new_depth - old_depth),
+        }, synchronize_session=False)
+        
+        account.parent_id = parent_id
+        account.path, account.depth = new_path, new_depth
+    
+    @staticmethod
+    def rebuild_paths(db: Session):
+        """ساخت دوباره‌ی مسیر همه‌ی حساب‌ها از روی parent_id"""
+        rows = db.query(models.Account.id, models.Account.parent_id).all()
+        children: Dict[Optional[int], List[int]] = {}
+        for account_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(account_id)
+        
+        ids = {account_id for account_id, _ in rows}
+        # حساب‌هایی که والدشان وجود ندارد ریشه حساب می‌شوند
+        roots = [account_id for account_id, parent_id in rows if parent_id is None or parent_id not in ids]
+        
+        mappings = []
+        stack = [(account_id, SEPARATOR, 0) for account_id in roots]
+        while stack:
+            account_id, prefix, depth = stack.pop()
+            path = f"{prefix}{account_id}{SEPARATOR}"
+            mappings.append({'id': account_id, 'path': path, 'depth': depth})
+            stack.extend((child, path, depth + 1) for child in children.get(account_id, []))
+        
+        db.bulk_update_mappings(models.Account, mappings)
+        db.commit()
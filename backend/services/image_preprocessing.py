@@ -0,0 +1,152 @@
+from PIL import Image, ImageChops, ImageFilter, ImageOps, ImageStat
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+from config import settings
+
+# عرض استاندارد کاغذ فیش (میلی‌متر) برای تبدیل DPI هدف به عرض پیکسلی
+RECEIPT_WIDTH_MM = 80
+MM_PER_INCH = 25.4
+EXIF_ORIENTATION = 0x0112
+
+
+@dataclass
+class PreprocessPreset:
+    """
+    مراحل پیش‌پردازش تصویر پیش از OCR
+    
+    هر مرحله جداگانه روشن یا خاموش می‌شود؛ پیش‌تنظیم‌های نام‌دار در
+    settings.OCR_PREPROCESS_PRESETS تعریف می‌شوند.
+    """
+    exif: bool = True
+    crop: bool = False
+    target_dpi: Optional[int] = None  # فقط کوچک‌سازی؛ عرض فیش ۸۰ میلی‌متر فرض می‌شود
+    grayscale: bool = False
+    deskew: bool = False
+    max_skew: float = 5.0  # درجه
+    binarize: bool = False
+    binarize_window: int = 15  # شعاع پنجره‌ی آستانه‌ی محلی (پیکسل)
+    binarize_offset: int = 10  # اختلاف لازم با میانگین محلی برای سیاه شدن
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PreprocessPreset":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"گزینه‌ی پیش‌پردازش نامعتبر: {', '.join(sorted(unknown))}")
+        return cls(**data)
+    
+    @classmethod
+    def named(cls, name: Optional[str] = None) -> "PreprocessPreset":
+        name = name or settings.OCR_PREPROCESS_PRESET
+        presets = settings.OCR_PREPROCESS_PRESETS
+        if name not in presets:
+            raise ValueError(f"پیش‌تنظیم پیش‌پردازش نامعتبر: {name}")
+        return cls.from_dict(presets[name])
+
+
+def crop_to_receipt(image: Image.Image) -> Image.Image:
+    """برش ناحیه‌ی روشن (کاغذ فیش) از زمینه‌ی تیره‌تر"""
+    gray = image.convert('L')
+    small = gray.copy()
+    small.thumbnail((400, 400))
+    scale = gray.width / small.width
+    
+    # کاغذ روشن‌تر از میانگین کل تصویر است؛ لکه‌های کوچک با فیلتر کمینه حذف می‌شوند
+    threshold = ImageStat.Stat(small).mean[0]
+    mask = small.point(lambda v: 255 if v > threshold else 0).filter(ImageFilter.MinFilter(5))
+    box = mask.getbbox()
+    if not box:
+        return image
+    
+    left, top, right, bottom = box
+    if (right - left) * (bottom - top) < 0.1 * small.width * small.height:
+        return image
+    
+    margin = 4
+    return image.crop((
+        max(0, int((left - margin) * scale)),
+        max(0, int((top - margin) * scale)),
+        min(image.width, int((right + margin) * scale)),
+        min(image.height, int((bottom + margin) * scale)),
+    ))
+
+
+def target_width(target_dpi: int) -> int:
+    return int(target_dpi * RECEIPT_WIDTH_MM / MM_PER_INCH)
+
+
+def draft(image: Image.Image, preset: "PreprocessPreset"):
+    """
+    رمزگشایی JPEG در مقیاس کوچک‌تر (۱/۲ تا ۱/۸) وقتی خروجی به هر حال کوچک می‌شود
+    
+    باید پیش از خواندن پیکسل‌ها صدا زده شود. با برش، کاغذ فقط بخشی از عکس است
+    و حاشیه‌ی بیشتری نگه داشته می‌شود.
+    """
+    if not preset.target_dpi or image.format != 'JPEG':
+        return
+    
+    width = target_width(preset.target_dpi) * (2 if preset.crop else 1)
+    rotated = preset.exif and image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+    image.draft(image.mode, (1, width) if rotated else (width, 1))
+
+
+def downscale(image: Image.Image, target_dpi: int) -> Image.Image:
+    max_width = target_width(target_dpi)
+    if image.width <= max_width:
+        return image
+    height = round(image.height * max_width / image.width)
+    return image.resize((max_width, height), Image.LANCZOS)
+
+
+def skew_angle(gray: Image.Image, max_skew: float, step: float = 0.5) -> float:
+    """
+    زاویه‌ی کجی متن به روش پروفایل افقی
+    
+    نسخه‌ی کوچک و دودویی تصویر در زاویه‌های مختلف چرخانده می‌شود؛ وقتی خطوط
+    متن افقی باشند، میانگین روشنایی سطرها بیشترین پراکندگی را دارد.
+    """
+    small = gray.copy()
+    small.thumbnail((600, 600))
+    # فقط جوهر متن؛ لبه‌ی کاغذ و زمینه در پروفایل اثر نگذارند
+    small = ImageOps.invert(binarize(small, 8, 10))
+    
+    best_angle, best_score = 0.0, -1.0
+    steps = int(max_skew / step)
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rotated = small.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+        rows = rotated.resize((1, rotated.height), Image.BOX)
+        score = ImageStat.Stat(rows).var[0]
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def binarize(gray: Image.Image, window: int, offset: int) -> Image.Image:
+    """آستانه‌ی محلی: پیکسلی که به اندازه‌ی offset از میانگین همسایه‌هایش تیره‌تر باشد سیاه می‌شود"""
+    local_mean = gray.filter(ImageFilter.BoxBlur(window))
+    darker = ImageChops.subtract(local_mean, gray)
+    return darker.point(lambda v: 0 if v > offset else 255, mode='1').convert('L')
+
+
+def preprocess(image: Image.Image, preset: PreprocessPreset) -> Image.Image:
+    draft(image, preset)
+    if preset.exif:
+        image = ImageOps.exif_transpose(image)
+    if preset.crop:
+        image = crop_to_receipt(image)
+    if preset.target_dpi:
+        image = downscale(image, preset.target_dpi)
+    
+    if preset.grayscale or preset.deskew or preset.binarize:
+        image = image.convert('L')
+    
+    if preset.deskew:
+        angle = skew_angle(image, preset.max_skew)
+        if angle:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    
+    if preset.binarize:
+        image = binarize(image, preset.binarize_window, preset.binarize_offset)
+    
+    return image
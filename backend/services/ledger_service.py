@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update, bindparam
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import models
+from services import trial_balance
+from services.period_service import PeriodService
+from services.data_version import DataVersion
+
+
+class Posting(NamedTuple):
+    account_id: int
+    transaction_type: models.TransactionType
+    amount: int
+
+
+@dataclass
+class BalanceDrift:
+    account_id: int
+    account_code: str
+    stored_debit: int
+    stored_credit: int
+    stored_balance: int
+    actual_debit: int
+    actual_credit: int
+
+
+class LedgerService:
+    """
+    نگهداری مانده‌های تجمعی حساب‌ها
+    
+    هر بار که سندی ثبت، ویرایش یا حذف می‌شود، جمع بدهکار و بستانکار حساب‌های
+    درگیر در همان تراکنش پایگاه داده به‌روز می‌شود تا خواندن مانده‌ها و تراز
+    آزمایشی نیازی به پیمایش جدول transactions نداشته باشد.
+    """
+    
+    @staticmethod
+    def totals(transactions: Iterable) -> Dict[int, Tuple[int, int]]:
+        """جمع بدهکار و بستانکار به تفکیک حساب"""
+        totals: Dict[int, Tuple[int, int]] = {}
+        for trans in transactions:
+            debit, credit = totals.get(trans.account_id, (0, 0))
+            if trans.transaction_type == models.TransactionType.DEBIT:
+                debit += trans.amount
+            else:
+                credit += trans.amount
+            totals[trans.account_id] = (debit, credit)
+        return totals
+    
+    @staticmethod
+    def apply(db: Session, entry_date: datetime, transactions: Iterable, sign: int = 1):
+        """
+        اعمال اثر تراکنش‌های یک سند روی مانده‌ی حساب‌ها و دوره‌های بسته‌شده
+        
+        transactions هر شیئی با account_id، transaction_type و amount است
+        (مدل Transaction، schemas.TransactionCreate یا Posting). sign=-1 اثر را برمی‌گرداند.
+        """
+        LedgerService.apply_many(db, [(entry_date, transactions)], sign)
+    
+    @staticmethod
+    def apply_many(db: Session, entries: List[Tuple[datetime, Iterable]], sign: int = 1):
+        """اعمال اثر چند سند با یک UPDATE چندتایی (executemany) برای هر جدول"""
+        DataVersion.mark_changed(db)
+        per_entry = [(entry_date, LedgerService.totals(transactions)) for entry_date, transactions in entries]
+        
+        account_totals: Dict[int, Tuple[int, int]] = {}
+        for _, totals in per_entry:
+            for account_id, (debit, credit) in totals.items():
+                total_debit, total_credit = account_totals.get(account_id, (0, 0))
+                account_totals[account_id] = (total_debit + debit, total_credit + credit)
+        
+        if not account_totals:
+            return
+        
+        accounts = models.Account.__table__
+        # ترتیب ثابت قفل‌ها از بن‌بست بین درخواست‌های هم‌زمان جلوگیری می‌کند
+        db.execute(
+            update(accounts).where(accounts.c.id == bindparam('account_id')).values(
+                debit_total=accounts.c.debit_total + bindparam('debit'),
+                credit_total=accounts.c.credit_total + bindparam('credit'),
+                balance=accounts.c.balance + bindparam('debit') - bindparam('credit'),
+            ),
+            [
+                {
+                    'account_id': account_id,
+                    'debit': sign * account_totals[account_id][0],
+                    'credit': sign * account_totals[account_id][1],
+                }
+                for account_id in sorted(account_totals)
+            ]
+        )
+        
+        PeriodService.apply_deltas(db, per_entry, sign)
+    
+    @staticmethod
+    def reconcile(db: Session, fix: bool = False) -> List[BalanceDrift]:
+        """محاسبه‌ی دوباره‌ی مانده‌ها از روی تراکنش‌ها و گزارش اختلاف با مقادیر ذخیره‌شده"""
+        totals = trial_balance.get_backend(db).totals_subquery()
+        rows = db.execute(
+            select(
+                models.Account.id,
+                models.Account.code,
+                func.coalesce(models.Account.debit_total, 0).label('stored_debit'),
+                func.coalesce(models.Account.credit_total, 0).label('stored_credit'),
+                func.coalesce(models.Account.balance, 0).label('stored_balance'),
+                func.coalesce(totals.c.debit, 0).label('actual_debit'),
+                func.coalesce(totals.c.credit, 0).label('actual_credit'),
+            ).outerjoin(
+                totals, totals.c.account_id == models.Account.id
+            ).order_by(models.Account.id)
+        ).all()
+        
+        drifts = [
+            BalanceDrift(
+                account_id=row.id,
+                account_code=row.code,
+                stored_debit=row.stored_debit,
+                stored_credit=row.stored_credit,
+                stored_balance=row.stored_balance,
+                actual_debit=row.actual_debit,
+                actual_credit=row.actual_credit,
+            )
+            for row in rows
+            if row.stored_debit != row.actual_debit
+            or row.stored_credit != row.actual_credit
+            or row.stored_balance != row.actual_debit - row.actual_credit
+        ]
+        
+        if fix and drifts:
+            db.bulk_update_mappings(models.Account, [
+                {
+                    'id': drift.account_id,
+                    'debit_total': drift.actual_debit,
+                    'credit_total': drift.actual_credit,
+                    'balance': drift.actual_debit - drift.actual_credit,
+                }
+                for drift in drifts
+            ])
+            db.commit()
+        
+        return drifts
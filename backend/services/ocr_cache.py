@@ -0,0 +1,145 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, delete, select, update
+from PIL import Image, ImageOps
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import models
+from config import settings
+
+DHASH_SIZE = 8
+
+
+def perceptual_hash(image_path: str) -> Optional[str]:
+    """
+    dHash ۶۴ بیتی تصویر به شکل ۱۶ رقم hex
+    
+    تصویر خاکستری و ۹×۸ می‌شود و هر بیت نشان می‌دهد پیکسل از همسایه‌ی راستش
+    روشن‌تر است یا نه؛ همان عکس با فشرده‌سازی یا اندازه‌ی دیگر همان hash را می‌دهد.
+    """
+    try:
+        with Image.open(image_path) as image:
+            image.draft('L', (DHASH_SIZE * 16, DHASH_SIZE * 16))
+            image = ImageOps.exif_transpose(image).convert('L').resize(
+                (DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS
+            )
+            pixels = list(image.getdata())
+    except Exception:
+        return None
+    
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            left = pixels[row * (DHASH_SIZE + 1) + col]
+            right = pixels[row * (DHASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    
+    # تصویر یکنواخت (سفید یا خالی) hash صفر می‌دهد و برای مقایسه بی‌معناست
+    return f"{bits:016x}" if bits else None
+
+
+class OCRCache:
+    """
+    کش نتیجه‌ی OCR بر اساس hash محتوای فایل در جدول ocr_cache
+    
+    با هر برخورد زمان آخرین استفاده به‌روز می‌شود و وقتی تعداد ردیف‌ها از
+    OCR_CACHE_MAX_ENTRIES بیشتر شود، کم‌استفاده‌ترین‌ها حذف می‌شوند.
+    """
+    
+    @staticmethod
+    def get(db: Session, content_hash: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if settings.OCR_CACHE_MAX_ENTRIES <= 0:
+            return None
+        
+        entry = db.get(models.OCRCacheEntry, content_hash)
+        if entry is None:
+            return None
+        
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+        return entry.extracted_text, json.loads(entry.parsed_data)
+    
+    @staticmethod
+    def get_many(db: Session, content_hashes: Iterable[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """برخوردهای کش برای چند hash با یک کوئری؛ commit با فراخواننده است"""
+        content_hashes = set(content_hashes)
+        if settings.OCR_CACHE_MAX_ENTRIES <= 0 or not content_hashes:
+            return {}
+        
+        entries = db.query(models.OCRCacheEntry).filter(
+            models.OCRCacheEntry.content_hash.in_(content_hashes)
+        ).all()
+        if entries:
+            db.execute(
+                update(models.OCRCacheEntry).where(
+                    models.OCRCacheEntry.content_hash.in_([entry.content_hash for entry in entries])
+                ).values(last_used_at=datetime.utcnow()),
+                execution_options={'synchronize_session': False}
+            )
+        
+        return {
+            entry.content_hash: (entry.extracted_text, json.loads(entry.parsed_data))
+            for entry in entries
+        }
+    
+    @staticmethod
+    def put(db: Session, content_hash: str, extracted_text: str, parsed: Dict[str, Any]):
+        """ذخیره در تراکنش جاری؛ commit با فراخواننده است"""
+        OCRCache.put_many(db, [(content_hash, extracted_text, parsed)])
+    
+    @staticmethod
+    def put_many(db: Session, results: List[Tuple[str, str, Dict[str, Any]]]):
+        if settings.OCR_CACHE_MAX_ENTRIES <= 0 or not results:
+            return
+        
+        now = datetime.utcnow()
+        for content_hash, extracted_text, parsed in results:
+            db.merge(models.OCRCacheEntry(
+                content_hash=content_hash,
+                extracted_text=extracted_text,
+                parsed_data=json.dumps(parsed, ensure_ascii=False),
+                last_used_at=now
+            ))
+        db.flush()
+        
+        overflow = db.query(func.count(models.OCRCacheEntry.content_hash)).scalar() - settings.OCR_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            oldest = select(models.OCRCacheEntry.content_hash).order_by(
+                models.OCRCacheEntry.last_used_at
+            ).limit(overflow)
+            db.execute(
+                delete(models.OCRCacheEntry).where(models.OCRCacheEntry.content_hash.in_(oldest)),
+                execution_options={'synchronize_session': False}
+            )
+    
+    @staticmethod
+    def find_duplicates(db: Session, content_hashes: Iterable[str],
+                        perceptual_hashes: Iterable[str] = ()) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """قدیمی‌ترین فیش برای هر hash محتوا و هر hash ادراکی، با دو کوئری"""
+        by_content = dict(db.query(models.Receipt.content_hash, func.min(models.Receipt.id)).filter(
+            models.Receipt.content_hash.in_(set(content_hashes))
+        ).group_by(models.Receipt.content_hash).all())
+        
+        perceptual_hashes = {h for h in perceptual_hashes if h}
+        by_perceptual = {}
+        if perceptual_hashes:
+            by_perceptual = dict(db.query(models.Receipt.perceptual_hash, func.min(models.Receipt.id)).filter(
+                models.Receipt.perceptual_hash.in_(perceptual_hashes)
+            ).group_by(models.Receipt.perceptual_hash).all())
+        
+        return by_content, by_perceptual
+    
+    @staticmethod
+    def find_duplicate(db: Session, content_hash: str,
+                       perceptual: Optional[str] = None) -> Optional[int]:
+        """قدیمی‌ترین فیش با همان فایل یا همان تصویر"""
+        receipt_id = db.query(func.min(models.Receipt.id)).filter(
+            models.Receipt.content_hash == content_hash
+        ).scalar()
+        
+        if receipt_id is None and perceptual:
+            receipt_id = db.query(func.min(models.Receipt.id)).filter(
+                models.Receipt.perceptual_hash == perceptual
+            ).scalar()
+        
+        return receipt_id
@@ -0,0 +1,225 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import multiprocessing
+import os
+import threading
+import uuid
+from config import settings
+
+_worker_service = None
+
+
+def _init_worker(engine: str):
+    """ساخت OCRService یک بار برای هر پردازه‌ی کارگر"""
+    global _worker_service
+    from services.ocr_service import OCRService
+    _worker_service = OCRService(engine)
+
+
+def _run_ocr(image_path: str) -> Tuple[str, Dict[str, Any]]:
+    text = _worker_service.extract_text_from_image(image_path)
+    return text, _worker_service.parse_receipt(text)
+
+
+def _run_batch_item(image_path: str, recognize: bool) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str]]:
+    """OCR (در صورت نیاز) و hash ادراکی یک فایل دسته؛ هر دو در پردازه‌ی کارگر"""
+    from services.ocr_cache import perceptual_hash
+    
+    phash = perceptual_hash(image_path) if settings.OCR_PERCEPTUAL_HASH else None
+    if not recognize:
+        return None, None, phash
+    text, parsed = _run_ocr(image_path)
+    return text, parsed, phash
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class OCRJob:
+    id: str
+    image_path: str
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    status: str = "queued"  # queued, running, done, failed
+    extracted_text: Optional[str] = None
+    parsed: Optional[Dict[str, Any]] = None
+    receipt_id: Optional[int] = None
+    error: Optional[str] = None
+    # داده‌های فراخواننده که به on_result می‌رسد (مثلاً hash فایل)
+    context: Dict[str, Any] = field(default_factory=dict)
+    # پس از ذخیره‌ی نتیجه (نه فقط پایان OCR) کامل می‌شود
+    done: Future = field(default_factory=Future, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+
+class OCRJobQueue:
+    """
+    صف کارهای OCR روی یک ProcessPoolExecutor محدود
+    
+    Tesseract در پردازه‌های کارگر اجرا می‌شود تا حلقه‌ی رویداد API آزاد بماند.
+    تعداد کارهای در صف و در حال اجرا به queue_depth محدود است و بیش از آن
+    QueueFullError داده می‌شود. on_result پس از پایان OCR در پردازه‌ی اصلی
+    اجرا می‌شود (برای ثبت Receipt) و خروجی آن receipt_id کار است.
+    """
+    
+    def __init__(self, workers: int, queue_depth: int, engine: str,
+                 on_result: Optional[Callable[[OCRJob], Optional[int]]] = None,
+                 retention: int = 1000):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.engine = engine
+        self.on_result = on_result
+        self.retention = retention
+        self.jobs: "OrderedDict[str, OCRJob]" = OrderedDict()
+        self.active = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork کردن پردازه‌ی چندنخی سرور امن نیست
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.engine,)
+            )
+        return self._executor
+    
+    def submit(self, image_path: str, context: Optional[Dict[str, Any]] = None) -> OCRJob:
+        with self._lock:
+            if self.active >= self.queue_depth:
+                raise QueueFullError("صف پردازش فیش پر است؛ کمی بعد دوباره تلاش کنید")
+            
+            job = OCRJob(id=uuid.uuid4().hex, image_path=image_path, context=context or {})
+            path = os.path.abspath(image_path)
+            try:
+                job.future = self._get_executor().submit(_run_ocr, path)
+            except BrokenProcessPool:
+                # پردازه‌ای از بین رفته؛ استخر از نو ساخته می‌شود
+                self._executor = None
+                job.future = self._get_executor().submit(_run_ocr, path)
+            
+            self.active += 1
+            self.jobs[job.id] = job
+            self._evict()
+        
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+    
+    def complete(self, image_path: str, extracted_text: str, parsed: Dict[str, Any],
+                 context: Optional[Dict[str, Any]] = None) -> OCRJob:
+        """ثبت کاری که نتیجه‌اش از قبل معلوم است (مثلاً از کش) بدون ارسال به استخر"""
+        job = OCRJob(id=uuid.uuid4().hex, image_path=image_path, context=context or {})
+        future: Future = Future()
+        future.set_result((extracted_text, parsed))
+        job.future = future
+        
+        with self._lock:
+            self.active += 1
+            self.jobs[job.id] = job
+            self._evict()
+        
+        self._finish(job, future)
+        return job
+    
+    def _finish(self, job: OCRJob, future: Future):
+        status = "failed"
+        try:
+            job.extracted_text, job.parsed = future.result()
+            if self.on_result:
+                job.receipt_id = self.on_result(job)
+            status = "done"
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            with self._lock:
+                job.status = status
+                job.finished_at = datetime.utcnow()
+                self.active -= 1
+            job.done.set_result(job)
+    
+    def _evict(self):
+        finished = len(self.jobs) - self.active
+        for job_id in list(self.jobs):
+            if finished <= self.retention:
+                break
+            if self.jobs[job_id].done.done():
+                del self.jobs[job_id]
+                finished -= 1
+    
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == "queued" and job.future.running():
+                job.status = "running"
+            return job
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_queue: Optional[OCRJobQueue] = None
+_batch_executor: Optional[ProcessPoolExecutor] = None
+_batch_lock = threading.Lock()
+
+
+def get_queue(on_result: Optional[Callable[[OCRJob], Optional[int]]] = None) -> OCRJobQueue:
+    global _queue
+    if _queue is None:
+        _queue = OCRJobQueue(
+            workers=settings.OCR_WORKERS,
+            queue_depth=settings.OCR_QUEUE_DEPTH,
+            engine=settings.OCR_ENGINE,
+            on_result=on_result,
+            retention=settings.OCR_JOB_RETENTION
+        )
+    return _queue
+
+
+def _get_batch_executor() -> ProcessPoolExecutor:
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ProcessPoolExecutor(
+            max_workers=settings.OCR_BATCH_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.OCR_ENGINE,)
+        )
+    return _batch_executor
+
+
+def submit_batch(items: List[Tuple[str, bool]]) -> List[Future]:
+    """
+    ارسال فایل‌های یک دسته به استخر جداگانه‌ی دسته‌ها (یک کارگر برای هر هسته)
+    
+    items فهرست (مسیر، نیاز به OCR) است؛ فیش‌های تکی در صف خودشان پشت دسته‌های
+    بزرگ منتظر نمی‌مانند.
+    """
+    global _batch_executor
+    with _batch_lock:
+        try:
+            return [_get_batch_executor().submit(_run_batch_item, os.path.abspath(path), recognize)
+                    for path, recognize in items]
+        except BrokenProcessPool:
+            _batch_executor = None
+            return [_get_batch_executor().submit(_run_batch_item, os.path.abspath(path), recognize)
+                    for path, recognize in items]
+
+
+def shutdown_queue():
+    global _queue, _batch_executor
+    if _queue is not None:
+        _queue.shutdown()
+        _queue = None
+    if _batch_executor is not None:
+        _batch_executor.shutdown(wait=False, cancel_futures=True)
+        _batch_executor = None
@@ -1,25 +1,151 @@
 import pytesseract
 from PIL import Image
+import logging
+import os
 import re
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, Type
 from config import settings
+from services.image_preprocessing import PreprocessPreset, preprocess
 import jdatetime
 
+logger = logging.getLogger(__name__)
 
-class OCRService:
+
+class TesseractEngine:
+    """اجرای Tesseract از طریق pytesseract"""
+    
+    name = "tesseract"
+    
     def __init__(self):
         if settings.TESSERACT_PATH:
             pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_PATH
     
+    def recognize(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(
+            image,
+            lang=settings.OCR_LANGUAGE,
+            config='--psm 6'
+        )
+
+
+class TesserocrEngine:
+    """
+    یک handle ماندگار libtesseract از طریق tesserocr
+    
+    pytesseract برای هر تصویر یک پردازه‌ی tesseract می‌سازد و traineddata را
+    دوباره بارگذاری می‌کند؛ این موتور یک بار بارگذاری می‌کند و handle را برای
+    همه‌ی تصویرهای همان پردازه (هر کارگر OCR) نگه می‌دارد.
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self):
+        import tesserocr
+        
+        options = {'lang': settings.OCR_LANGUAGE, 'psm': tesserocr.PSM.SINGLE_BLOCK}
+        if settings.TESSDATA_PATH:
+            options['path'] = settings.TESSDATA_PATH
+        self._api = tesserocr.PyTessBaseAPI(**options)
+        # handle هم‌زمان از چند نخ قابل استفاده نیست
+        self._lock = threading.Lock()
+    
+    def recognize(self, image: Image.Image) -> str:
+        with self._lock:
+            self._api.SetImage(image)
+            return self._api.GetUTF8Text()
+    
+    def close(self):
+        self._api.End()
+
+
+class StubEngine:
+    """
+    موتور ساختگی برای آزمون‌ها و محیط‌های بدون Tesseract
+    
+    متن را از فایل کناری <تصویر>.txt یا از فیلد متنی ocr_text تصویر PNG
+    می‌خواند و در صورت تنظیم OCR_STUB_DELAY به همان اندازه صبر می‌کند.
+    """
+    
+    name = "stub"
+    
+    def recognize(self, image: Image.Image) -> str:
+        if settings.OCR_STUB_DELAY:
+            time.sleep(settings.OCR_STUB_DELAY)
+        
+        sidecar = f"{image.info.get('source_path', '')}.txt"
+        if os.path.exists(sidecar):
+            with open(sidecar, encoding='utf-8') as f:
+                return f.read()
+        return image.info.get('ocr_text', '')
+
+
+ENGINES: Dict[str, Type] = {
+    'tesseract': TesseractEngine,
+    'tesserocr': TesserocrEngine,
+    'stub': StubEngine,
+}
+
+# اگر ساخت موتور ممکن نبود (کتابخانه نصب نیست یا traineddata پیدا نشد) یا
+# تشخیص یک تصویر با خطا تمام شد
+FALLBACKS = {
+    'tesserocr': 'tesseract',
+}
+
+
+class FallbackEngine:
+    """موتور اصلی؛ اگر تشخیص یک تصویر خطا داد، همان تصویر با موتور جایگزین خوانده می‌شود"""
+    
+    def __init__(self, primary, fallback_name: str):
+        self.primary = primary
+        self.fallback_name = fallback_name
+        self.name = primary.name
+        self._fallback = None
+    
+    def recognize(self, image: Image.Image) -> str:
+        try:
+            return self.primary.recognize(image)
+        except RuntimeError as e:
+            logger.warning("OCR engine %s failed (%s); retrying with %s", self.name, e, self.fallback_name)
+            if self._fallback is None:
+                self._fallback = create_engine(self.fallback_name)
+            return self._fallback.recognize(image)
+    
+    def close(self):
+        self.primary.close()
+
+
+def create_engine(name: str):
+    if name not in ENGINES:
+        raise ValueError(f"موتور OCR نامعتبر: {name}")
+    try:
+        engine = ENGINES[name]()
+    except (ImportError, RuntimeError) as e:
+        if name not in FALLBACKS:
+            raise
+        logger.warning("OCR engine %s unavailable (%s); falling back to %s", name, e, FALLBACKS[name])
+        return create_engine(FALLBACKS[name])
+    
+    if name in FALLBACKS:
+        return FallbackEngine(engine, FALLBACKS[name])
+    return engine
+
+
+class OCRService:
+    def __init__(self, engine: Optional[str] = None, preset: Optional[str] = None):
+        self.engine = create_engine(engine or settings.OCR_ENGINE)
+        self.preset = PreprocessPreset.named(preset)
+    
+    def prepare_image(self, image: Image.Image, image_path: str) -> Image.Image:
+        prepared = preprocess(image, self.preset)
+        prepared.info = {**image.info, 'source_path': image_path}
+        return prepared
+    
     def extract_text_from_image(self, image_path: str) -> str:
         try:
-            image = Image.open(image_path)
-            
-            text = pytesseract.image_to_string(
-                image,
-                lang=settings.OCR_LANGUAGE,
-                config='--psm 6'
-            )
+            with Image.open(image_path) as image:
+                text = self.engine.recognize(self.prepare_image(image, image_path))
             
             return text.strip()
         except Exception as e:
@@ -49,7 +175,7 @@ class OCRService:
         
         return result
     
-    def _extract_amount(self, text: str) -> Optional[float]:
+    def _extract_amount(self, text: str) -> Optional[int]:
         patterns = [
             r'(?:مبلغ|جمع|کل|total|amount)[:\s]*(\d+[\d,]*)',
             r'(\d+[\d,]*)\s*(?:ریال|تومان|rials?)',
@@ -62,7 +188,7 @@ class OCRService:
             for match in matches:
                 amount_str = match.group(1).replace(',', '').replace('،', '')
                 try:
-                    amount = float(amount_str)
+                    amount = int(amount_str)
                     amounts.append(amount)
                 except ValueError:
                     continue
@@ -0,0 +1,204 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update, bindparam
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date
+import jdatetime
+import models
+from services import trial_balance
+
+CALENDARS = ('gregorian', 'jalali')
+
+
+def month_bounds(calendar: str, year: int, month: int) -> Tuple[datetime, datetime]:
+    """ابتدای ماه و ابتدای ماه بعد (مرز انحصاری) به میلادی"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    if calendar == 'jalali':
+        start = jdatetime.date(year, month, 1).togregorian()
+        end = jdatetime.date(next_year, next_month, 1).togregorian()
+    else:
+        start = date(year, month, 1)
+        end = date(next_year, next_month, 1)
+    
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+
+def month_of(calendar: str, moment: datetime) -> Tuple[int, int]:
+    if calendar == 'jalali':
+        jdate = jdatetime.date.fromgregorian(date=moment.date())
+        return jdate.year, jdate.month
+    return moment.year, moment.month
+
+
+def period_label(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+class PeriodService:
+    """
+    بستن دوره‌های ماهانه و نگهداری مانده‌ی پایانی هر حساب
+    
+    گزارش‌های تاریخ‌دار از نزدیک‌ترین دوره‌ی بسته‌شده شروع می‌کنند و فقط
+    تراکنش‌های بعد از آن را جمع می‌زنند.
+    """
+    
+    @staticmethod
+    def nearest_snapshot(db: Session, moment: datetime) -> Optional[models.ClosedPeriod]:
+        """آخرین دوره‌ی بسته‌شده که تمام آن پیش از moment است (از هر تقویمی)"""
+        return db.query(models.ClosedPeriod).filter(
+            models.ClosedPeriod.end <= moment
+        ).order_by(models.ClosedPeriod.end.desc()).first()
+    
+    @staticmethod
+    def close_period(db: Session, calendar: str, year: int, month: int) -> models.ClosedPeriod:
+        if calendar not in CALENDARS:
+            raise ValueError(f"تقویم نامعتبر: {calendar}")
+        
+        start, end = month_bounds(calendar, year, month)
+        if end > datetime.now():
+            raise ValueError("فقط دوره‌های تمام‌شده را می‌توان بست")
+        
+        label = period_label(year, month)
+        period = db.query(models.ClosedPeriod).filter(
+            models.ClosedPeriod.calendar == calendar,
+            models.ClosedPeriod.period == label
+        ).first()
+        
+        if period:
+            # بستن دوباره: مانده‌ها از نو ساخته می‌شوند
+            db.delete(period)
+            db.flush()
+        
+        base = PeriodService.nearest_snapshot(db, end)
+        backend = trial_balance.get_backend(db)
+        rows = db.execute(backend.balances_query(before=end, snapshot=base)).all()
+        
+        period = models.ClosedPeriod(calendar=calendar, period=label, start=start, end=end)
+        db.add(period)
+        db.flush()
+        
+        db.bulk_insert_mappings(models.BalanceSnapshot, [
+            {
+                'period_id': period.id,
+                'account_id': row.account_id,
+                'debit_total': row.debit,
+                'credit_total': row.credit,
+            }
+            for row in rows
+            if row.debit or row.credit
+        ])
+        db.commit()
+        db.refresh(period)
+        
+        return period
+    
+    @staticmethod
+    def close_through(db: Session, calendar: str, until: datetime) -> List[models.ClosedPeriod]:
+        """بستن همه‌ی ماه‌های تمام‌شده از اولین سند تا until که هنوز بسته نشده‌اند"""
+        first_date = db.query(func.min(models.JournalEntry.date)).scalar()
+        if first_date is None:
+            return []
+        
+        closed = {
+            label for (label,) in db.query(models.ClosedPeriod.period).filter(
+                models.ClosedPeriod.calendar == calendar
+            )
+        }
+        
+        year, month = month_of(calendar, first_date)
+        periods = []
+        while True:
+            _, end = month_bounds(calendar, year, month)
+            if end > until or end > datetime.now():
+                break
+            if period_label(year, month) not in closed:
+                periods.append(PeriodService.close_period(db, calendar, year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        
+        return periods
+    
+    @staticmethod
+    def apply_deltas(db: Session, entries: List[Tuple[datetime, Dict[int, Tuple[int, int]]]], sign: int = 1):
+        """
+        به‌روزرسانی تدریجی مانده‌ی دوره‌هایی که اسناد با تاریخ گذشته در آن‌ها می‌افتند
+        
+        به‌جای ساختن دوباره‌ی کل دوره، فقط اثر همین اسناد روی حساب‌های درگیر
+        به دوره‌های بسته‌شده‌ی بعد از تاریخ هر سند اضافه می‌شود.
+        """
+        if not entries:
+            return
+        
+        earliest = min(entry_date for entry_date, _ in entries)
+        stale = db.query(models.ClosedPeriod.id, models.ClosedPeriod.end).filter(
+            models.ClosedPeriod.end > earliest
+        ).all()
+        
+        snapshots = models.BalanceSnapshot.__table__
+        for period_id, period_end in stale:
+            totals: Dict[int, Tuple[int, int]] = {}
+            for entry_date, entry_totals in entries:
+                if entry_date >= period_end:
+                    continue
+                for account_id, (debit, credit) in entry_totals.items():
+                    total_debit, total_credit = totals.get(account_id, (0, 0))
+                    totals[account_id] = (total_debit + debit, total_credit + credit)
+            
+            if not totals:
+                continue
+            
+            existing = {
+                account_id for (account_id,) in db.query(models.BalanceSnapshot.account_id).filter(
+                    models.BalanceSnapshot.period_id == period_id,
+                    models.BalanceSnapshot.account_id.in_(totals.keys())
+                )
+            }
+            
+            if existing:
+                db.execute(
+                    update(snapshots).where(
+                        snapshots.c.period_id == period_id,
+                        snapshots.c.account_id == bindparam('snapshot_account_id')
+                    ).values(
+                        debit_total=snapshots.c.debit_total + bindparam('debit'),
+                        credit_total=snapshots.c.credit_total + bindparam('credit'),
+                    ),
+                    [
+                        {
+                            'snapshot_account_id': account_id,
+                            'debit': sign * totals[account_id][0],
+                            'credit': sign * totals[account_id][1],
+                        }
+                        for account_id in sorted(existing)
+                    ]
+                )
+            
+            missing = [account_id for account_id in sorted(totals) if account_id not in existing]
+            if missing:
+                db.execute(insert(snapshots), [
+                    {
+                        'period_id': period_id,
+                        'account_id': account_id,
+                        'debit_total': sign * totals[account_id][0],
+                        'credit_total': sign * totals[account_id][1],
+                    }
+                    for account_id in missing
+                ])
+    
+    @staticmethod
+    def balances_as_of(db: Session, as_of: datetime):
+        """کوئری تراز تا as_of (شامل) با شروع از نزدیک‌ترین مانده‌ی دوره"""
+        snapshot = PeriodService.nearest_snapshot(db, as_of)
+        return trial_balance.get_backend(db).build_query(as_of=as_of, snapshot=snapshot)
+    
+    @staticmethod
+    def opening_balance(db: Session, account_id: int, before: datetime) -> Tuple[int, int]:
+        """جمع بدهکار و بستانکار حساب برای اسناد پیش از before"""
+        snapshot = PeriodService.nearest_snapshot(db, before)
+        query = trial_balance.get_backend(db).balances_query(
+            before=before, snapshot=snapshot, account_id=account_id
+        )
+        row = db.execute(query).first()
+        
+        if row is None:
+            return 0, 0
+        return row.debit, row.credit
@@ -0,0 +1,218 @@
+from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import os
+import zipfile
+import models
+import schemas
+from config import settings
+from services.ocr_cache import OCRCache
+from uploads import UploadTooLargeError, store_stream
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff', '.bmp', '.gif'}
+
+
+class BatchFileError(ValueError):
+    pass
+
+
+@dataclass
+class BatchItem:
+    file: str
+    key: Optional[str] = None  # کلید ذخیره‌ساز
+    path: Optional[str] = None  # مسیر محلی برای OCR
+    content_hash: Optional[str] = None
+    perceptual_hash: Optional[str] = None
+    extracted_text: Optional[str] = None
+    parsed: Optional[Dict[str, Any]] = None
+    cached: bool = False
+    duplicate_of: Optional[int] = None
+    receipt_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y/%m/%d") if value else None
+    except ValueError:
+        return None
+
+
+class ReceiptBatchService:
+    """
+    ورود دسته‌ای فیش‌ها
+    
+    فایل‌ها (یا اعضای یک ZIP) یکی‌یکی و تکه‌تکه در ذخیره‌ساز نوشته می‌شوند، پس
+    کل آرشیو هیچ‌وقت در حافظه نیست. نتیجه‌ها در پایان با یک درج چندتایی در
+    receipts ثبت می‌شوند.
+    """
+    
+    def __init__(self):
+        self.items: List[BatchItem] = []
+    
+    def _check_count(self):
+        if len(self.items) >= settings.OCR_BATCH_MAX_FILES:
+            raise BatchFileError(f"حداکثر {settings.OCR_BATCH_MAX_FILES} فایل در هر دسته مجاز است")
+    
+    def _add(self, name: str, stream: BinaryIO):
+        self._check_count()
+        item = BatchItem(file=name)
+        try:
+            stored = store_stream(stream, 'receipts')
+            item.key, item.path, item.content_hash = stored.key, stored.path, stored.content_hash
+        except UploadTooLargeError as e:
+            item.error = str(e)
+        self.items.append(item)
+    
+    def add_upload(self, filename: str, stream: BinaryIO):
+        """یک فایل بارگذاری‌شده؛ فایل ZIP باز و اعضای تصویری‌اش اضافه می‌شوند"""
+        if filename.lower().endswith('.zip') or zipfile.is_zipfile(stream):
+            stream.seek(0)
+            self.add_zip(filename, stream)
+        else:
+            stream.seek(0)
+            self._add(filename, stream)
+    
+    def add_zip(self, filename: str, stream: BinaryIO):
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            self._check_count()
+            self.items.append(BatchItem(file=filename, error="فایل ZIP نامعتبر است"))
+            return
+        
+        with archive:
+            for member in archive.infolist():
+                name = f"{filename}/{member.filename}"
+                if member.is_dir() or os.path.splitext(member.filename)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                if member.file_size > settings.MAX_UPLOAD_SIZE:
+                    self._check_count()
+                    self.items.append(BatchItem(file=name, error="حجم فایل بیش از حد مجاز است"))
+                    continue
+                # اندازه‌ی سرآیند ZIP ممکن است درست نباشد؛ store_stream هنگام کپی هم می‌شمارد
+                with archive.open(member) as member_stream:
+                    self._add(name, member_stream)
+    
+    def pending(self) -> List[BatchItem]:
+        return [item for item in self.items if item.error is None]
+    
+    def apply_cache(self, db: Session):
+        items = self.pending()
+        cached = OCRCache.get_many(db, [item.content_hash for item in items])
+        db.commit()
+        for item in items:
+            if item.content_hash in cached:
+                item.extracted_text, item.parsed = cached[item.content_hash]
+                item.cached = True
+    
+    def work(self) -> List[Tuple[BatchItem, bool]]:
+        """
+        فایل‌هایی که به پردازه‌ی کارگر می‌روند و اینکه OCR لازم دارند یا فقط hash ادراکی
+        
+        از فایل‌های یکسان داخل دسته فقط اولی OCR می‌شود.
+        """
+        seen = set()
+        work = []
+        for item in self.pending():
+            work.append((item, not item.cached and item.content_hash not in seen))
+            seen.add(item.content_hash)
+        return work
+    
+    def share_results(self):
+        """
+        نتیجه‌ی OCR اولین نمونه به نمونه‌های یکسان بعدی داخل دسته داده می‌شود
+        
+        اگر OCR اولین نمونه شکست خورده باشد، همان خطا برای نمونه‌های بعدی ثبت
+        می‌شود. cached فقط برای نتیجه‌ای است که از جدول کش OCR آمده است.
+        """
+        first: Dict[str, BatchItem] = {}
+        for item in self.items:
+            if item.content_hash is None or item.cached:
+                continue
+            source = first.setdefault(item.content_hash, item)
+            if source is item or item.error is not None:
+                continue
+            if source.parsed is not None:
+                item.extracted_text, item.parsed = source.extracted_text, source.parsed
+            else:
+                item.error = source.error or "نتیجه‌ی OCR این فایل در دسترس نیست"
+    
+    def save(self, db: Session):
+        items = [item for item in self.pending() if item.parsed is not None]
+        if not items:
+            return
+        
+        by_content, by_perceptual = OCRCache.find_duplicates(
+            db,
+            [item.content_hash for item in items],
+            [item.perceptual_hash for item in items]
+        )
+        
+        receipts = []
+        for item in items:
+            item.duplicate_of = by_content.get(item.content_hash) or by_perceptual.get(item.perceptual_hash)
+            receipts.append(models.Receipt(
+                image_path=item.key,
+                extracted_text=item.extracted_text,
+                amount=item.parsed.get('amount'),
+                date=_parse_date(item.parsed.get('date')),
+                vendor=item.parsed.get('vendor'),
+                is_processed=False,
+                content_hash=item.content_hash,
+                perceptual_hash=item.perceptual_hash,
+                duplicate_of_id=item.duplicate_of
+            ))
+        db.add_all(receipts)
+        db.flush()
+        
+        # تکراری‌های داخل همین دسته به اولین نمونه در دسته اشاره می‌کنند
+        first_in_batch: Dict[str, int] = {}
+        for item, receipt in zip(items, receipts):
+            item.receipt_id = receipt.id
+            keys = [key for key in (item.content_hash, item.perceptual_hash) if key]
+            if item.duplicate_of is None:
+                earlier = next((first_in_batch[key] for key in keys if key in first_in_batch), None)
+                if earlier is not None:
+                    item.duplicate_of = receipt.duplicate_of_id = earlier
+            for key in keys:
+                first_in_batch.setdefault(key, receipt.id)
+        
+        db.commit()
+        
+        fresh = {}
+        for item in items:
+            if not item.cached:
+                fresh[item.content_hash] = (item.content_hash, item.extracted_text, item.parsed)
+        try:
+            OCRCache.put_many(db, list(fresh.values()))
+            db.commit()
+        except Exception:
+            db.rollback()
+    
+    def manifest(self, elapsed: float) -> schemas.OCRBatchResponse:
+        entries = []
+        for item in self.items:
+            parsed = item.parsed or {}
+            entries.append(schemas.OCRBatchItem(
+                file=item.file,
+                status="failed" if item.error else "done",
+                success=bool(parsed.get('success')),
+                receipt_id=item.receipt_id,
+                amount=parsed.get('amount'),
+                date=parsed.get('date'),
+                vendor=parsed.get('vendor'),
+                cached=item.cached,
+                duplicate_of=item.duplicate_of,
+                error=item.error
+            ))
+        
+        failed = sum(1 for entry in entries if entry.status == "failed")
+        return schemas.OCRBatchResponse(
+            total=len(entries),
+            processed=len(entries) - failed,
+            failed=failed,
+            elapsed_seconds=round(elapsed, 3),
+            items=entries
+        )
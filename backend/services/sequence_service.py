@@ -0,0 +1,109 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+import jdatetime
+import models
+from config import settings
+
+
+class SequenceService:
+    """
+    شمارنده‌های اتمی در جدول number_sequences
+    
+    رزرو با یک UPDATE روی ردیف همان شمارنده انجام می‌شود، پس قفل ردیف تا پایان
+    تراکنش فراخواننده باقی می‌ماند و دو درخواست هم‌زمان هرگز مقدار یکسان
+    نمی‌گیرند. اگر تراکنش rollback شود شماره‌ها هم برمی‌گردند.
+    """
+    
+    @staticmethod
+    def _insert_if_missing(db: Session, name: str, next_value: int):
+        table = models.NumberSequence.__table__
+        dialect = db.get_bind().dialect.name
+        values = {'name': name, 'next_value': next_value}
+        
+        if dialect == 'postgresql':
+            statement = postgresql.insert(table).values(**values).on_conflict_do_nothing()
+        elif dialect == 'sqlite':
+            statement = sqlite.insert(table).values(**values).on_conflict_do_nothing()
+        else:
+            exists = db.execute(select(table.c.name).where(table.c.name == name)).first()
+            if exists:
+                return
+            statement = table.insert().values(**values)
+        
+        db.execute(statement)
+    
+    @staticmethod
+    def reserve(db: Session, name: str, count: int = 1,
+                seed: Optional[Callable[[Session], int]] = None) -> int:
+        """رزرو count مقدار پشت‌سرهم و برگرداندن اولین مقدار"""
+        table = models.NumberSequence.__table__
+        increment = update(table).where(table.c.name == name).values(
+            next_value=table.c.next_value + count
+        )
+        
+        if db.execute(increment).rowcount == 0:
+            # اولین استفاده از این شمارنده: مقدار اولیه یک بار از داده‌های موجود خوانده می‌شود
+            SequenceService._insert_if_missing(db, name, seed(db) if seed else 1)
+            db.execute(increment)
+        
+        next_value = db.execute(select(table.c.next_value).where(table.c.name == name)).scalar()
+        return next_value - count
+
+
+def fiscal_year(moment: datetime) -> int:
+    if settings.FISCAL_CALENDAR == 'jalali':
+        return jdatetime.date.fromgregorian(date=moment.date()).year
+    return moment.year
+
+
+class EntryNumberAllocator:
+    """شماره‌ی سند JE-000001 یا با پیشوند سال مالی JE-1403-000001"""
+    
+    PREFIX = "JE"
+    DIGITS = 6
+    
+    @staticmethod
+    def prefix_for(moment: datetime) -> str:
+        if settings.ENTRY_NUMBER_PER_FISCAL_YEAR:
+            return f"{EntryNumberAllocator.PREFIX}-{fiscal_year(moment)}-"
+        return f"{EntryNumberAllocator.PREFIX}-"
+    
+    @staticmethod
+    def _seed(prefix: str) -> Callable[[Session], int]:
+        def seed(db: Session) -> int:
+            last = db.query(func.max(models.JournalEntry.entry_number)).filter(
+                models.JournalEntry.entry_number.like(f"{prefix}%"),
+                func.length(models.JournalEntry.entry_number) == len(prefix) + EntryNumberAllocator.DIGITS
+            ).scalar()
+            
+            if last and last[len(prefix):].isdigit():
+                return int(last[len(prefix):]) + 1
+            return 1
+        return seed
+    
+    @staticmethod
+    def reserve(db: Session, moment: datetime, count: int = 1) -> List[str]:
+        prefix = EntryNumberAllocator.prefix_for(moment)
+        first = SequenceService.reserve(db, prefix, count, EntryNumberAllocator._seed(prefix))
+        return [
+            f"{prefix}{number:0{EntryNumberAllocator.DIGITS}d}"
+            for number in range(first, first + count)
+        ]
+    
+    @staticmethod
+    def assign(db: Session, dates: List[datetime]) -> List[str]:
+        """شماره برای هر تاریخ؛ برای هر پیشوند یک بلوک رزرو می‌شود"""
+        groups: Dict[str, List[int]] = {}
+        for index, moment in enumerate(dates):
+            groups.setdefault(EntryNumberAllocator.prefix_for(moment), []).append(index)
+        
+        numbers: List[Optional[str]] = [None] * len(dates)
+        for prefix in sorted(groups):
+            indexes = groups[prefix]
+            block = EntryNumberAllocator.reserve(db, dates[indexes[0]], len(indexes))
+            for index, number in zip(indexes, block):
+                numbers[index] = number
+        return numbers
@@ -0,0 +1,203 @@
+from sqlalchemy import BigInteger, Date, Integer, select, func, case, cast, literal_column
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional, Type
+from datetime import datetime
+import models
+
+
+class TrialBalanceBackend:
+    """
+    موتور تراز آزمایشی
+
+    هر تراز با یک کوئری ساخته می‌شود و یکی از سه مسیر زیر را دارد:
+    - بدون as_of (stored_totals_query): debit_total و credit_total نگهداری‌شده
+      در accounts خوانده می‌شود و تراکنش‌ها پیمایش نمی‌شوند.
+    - as_of با دوره‌ی بسته‌شده‌ی پیش از آن (balances_query با snapshot): مانده‌ی
+      BalanceSnapshot آن دوره به‌علاوه‌ی GROUP BY تراکنش‌های پس از پایان دوره تا as_of.
+    - as_of بدون دوره‌ی بسته‌شده: یک GROUP BY روی همه‌ی تراکنش‌های تا as_of و
+      LEFT JOIN به accounts.
+    هر پایگاه داده فقط نحوه‌ی نوشتن جمع شرطی را تعیین می‌کند.
+    """
+
+    def sum(self, expression):
+        """جمع مبالغ (BIGINT ریال)؛ نتیجه در همه‌ی پایگاه داده‌ها عدد صحیح است"""
+        return func.sum(expression)
+    
+    def conditional_sum(self, transaction_type: models.TransactionType):
+        # else_=0 و نه 0.0: یک مقدار REAL نتیجه‌ی SUM را در SQLite اعشاری می‌کند
+        return self.sum(case(
+            (models.Transaction.transaction_type == transaction_type, models.Transaction.amount),
+            else_=0
+        ))
+
+    def day_number(self, column):
+        """
+        شماره‌ی روز تاریخ (مانند date.toordinal) در SQL برای تحلیل ستونی؛
+        None یعنی تاریخ‌ها خام خوانده و در پایتون تبدیل شوند
+        """
+        return None
+    
+    def totals_subquery(self, as_of: Optional[datetime] = None, since: Optional[datetime] = None,
+                        before: Optional[datetime] = None, account_id: Optional[int] = None):
+        query = select(
+            models.Transaction.account_id.label('account_id'),
+            self.conditional_sum(models.TransactionType.DEBIT).label('debit'),
+            self.conditional_sum(models.TransactionType.CREDIT).label('credit'),
+        )
+
+        if account_id is not None:
+            query = query.where(models.Transaction.account_id == account_id)
+        
+        if as_of or since or before:
+            query = query.join(
+                models.JournalEntry,
+                models.JournalEntry.id == models.Transaction.journal_entry_id
+            )
+            if as_of:
+                query = query.where(models.JournalEntry.date <= as_of)
+            if since:
+                query = query.where(models.JournalEntry.date >= since)
+            if before:
+                query = query.where(models.JournalEntry.date < before)
+
+        return query.group_by(models.Transaction.account_id).subquery('totals')
+    
+    def stored_totals_query(self) -> Select:
+        """تراز جاری از روی مانده‌های نگهداری‌شده در accounts، بدون پیمایش تراکنش‌ها"""
+        return select(
+            models.Account.code,
+            models.Account.name,
+            func.coalesce(models.Account.debit_total, 0).label('debit'),
+            func.coalesce(models.Account.credit_total, 0).label('credit'),
+        ).where(
+            models.Account.is_active == True
+        ).order_by(models.Account.id)
+    
+    def balances_query(self, as_of: Optional[datetime] = None, before: Optional[datetime] = None,
+                       snapshot: Optional[models.ClosedPeriod] = None,
+                       account_id: Optional[int] = None) -> Select:
+        """
+        جمع بدهکار و بستانکار همه‌ی حساب‌ها
+
+        اگر snapshot داده شود، مانده‌ی بسته‌شده‌ی آن دوره مبنا قرار می‌گیرد و فقط
+        تراکنش‌های بعد از پایان دوره جمع زده می‌شوند.
+        """
+        if snapshot is None:
+            totals = self.totals_subquery(as_of=as_of, before=before, account_id=account_id)
+            debit = func.coalesce(totals.c.debit, 0)
+            credit = func.coalesce(totals.c.credit, 0)
+        else:
+            totals = self.totals_subquery(as_of=as_of, since=snapshot.end, before=before, account_id=account_id)
+            opening = select(
+                models.BalanceSnapshot.account_id,
+                models.BalanceSnapshot.debit_total,
+                models.BalanceSnapshot.credit_total,
+            ).where(
+                models.BalanceSnapshot.period_id == snapshot.id
+            ).subquery('opening')
+            debit = func.coalesce(opening.c.debit_total, 0) + func.coalesce(totals.c.debit, 0)
+            credit = func.coalesce(opening.c.credit_total, 0) + func.coalesce(totals.c.credit, 0)
+        
+        query = select(
+            models.Account.id.label('account_id'),
+            models.Account.code,
+            models.Account.name,
+            debit.label('debit'),
+            credit.label('credit'),
+        ).outerjoin(
+            totals, totals.c.account_id == models.Account.id
+        )
+        
+        if snapshot is not None:
+            query = query.outerjoin(opening, opening.c.account_id == models.Account.id)
+        if account_id is not None:
+            query = query.where(models.Account.id == account_id)
+        
+        return query.order_by(models.Account.id)
+    
+    def build_query(self, as_of: Optional[datetime] = None,
+                    snapshot: Optional[models.ClosedPeriod] = None) -> Select:
+        return self.balances_query(as_of=as_of, snapshot=snapshot).where(
+            models.Account.is_active == True
+        )
+    
+    def rollup_query(self, depth: Optional[int] = None, as_of: Optional[datetime] = None,
+                     snapshot: Optional[models.ClosedPeriod] = None,
+                     account_types: Optional[List[models.AccountType]] = None) -> Select:
+        """
+        جمع هر حساب با همه‌ی زیرمجموعه‌هایش در یک کوئری
+        
+        هر حساب (ancestor) با همه‌ی حساب‌هایی که مسیرشان با مسیر او شروع می‌شود
+        join می‌شود. بدون as_of از مانده‌های نگهداری‌شده استفاده می‌شود.
+        """
+        ancestor = aliased(models.Account, name='ancestor')
+        descendant = aliased(models.Account, name='descendant')
+        
+        query = select(
+            ancestor.id,
+            ancestor.code,
+            ancestor.name,
+            ancestor.account_type,
+            ancestor.parent_id,
+            ancestor.depth,
+        ).join(
+            descendant, descendant.path.like(ancestor.path + '%')
+        )
+        
+        if as_of is None:
+            debit = self.sum(func.coalesce(descendant.debit_total, 0))
+            credit = self.sum(func.coalesce(descendant.credit_total, 0))
+        else:
+            balances = self.balances_query(as_of=as_of, snapshot=snapshot).subquery('balances')
+            query = query.join(balances, balances.c.account_id == descendant.id)
+            debit = self.sum(balances.c.debit)
+            credit = self.sum(balances.c.credit)
+        
+        query = query.add_columns(debit.label('debit'), credit.label('credit')).where(
+            ancestor.is_active == True
+        )
+        
+        if depth is not None:
+            query = query.where(ancestor.depth <= depth)
+        if account_types:
+            query = query.where(ancestor.account_type.in_(account_types))
+        
+        return query.group_by(
+            ancestor.id, ancestor.code, ancestor.name, ancestor.account_type, ancestor.parent_id, ancestor.depth
+        ).order_by(ancestor.code)
+
+
+class SQLiteTrialBalanceBackend(TrialBalanceBackend):
+    
+    def day_number(self, column):
+        # julianday('0001-01-01') = 1721425.5 و ordinal آن روز 1 است
+        return cast(func.julianday(column) - 1721424.5, Integer)
+
+
+class PostgreSQLTrialBalanceBackend(TrialBalanceBackend):
+    """PostgreSQL جمع شرطی را با FILTER (WHERE ...) سریع‌تر از CASE اجرا می‌کند"""
+
+    def sum(self, expression):
+        # SUM(bigint) در PostgreSQL از نوع numeric است (Decimal در پایتون)
+        return cast(func.sum(expression), BigInteger)
+    
+    def conditional_sum(self, transaction_type: models.TransactionType):
+        return cast(func.sum(models.Transaction.amount).filter(
+            models.Transaction.transaction_type == transaction_type
+        ), BigInteger)
+    
+    def day_number(self, column):
+        # تفاضل دو date در PostgreSQL تعداد روزهاست
+        return cast(cast(column, Date) - literal_column("DATE '0001-01-01'"), Integer) + 1
+
+
+BACKENDS: Dict[str, Type[TrialBalanceBackend]] = {
+    'sqlite': SQLiteTrialBalanceBackend,
+    'postgresql': PostgreSQLTrialBalanceBackend,
+}
+
+
+def get_backend(db: Session) -> TrialBalanceBackend:
+    dialect = db.get_bind().dialect.name
+    return BACKENDS.get(dialect, TrialBalanceBackend)()
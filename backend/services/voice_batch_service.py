@@ -0,0 +1,110 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import logging
+import time
+import schemas
+from services.accounting_service import AccountingService
+from services.voice_service import VoiceService
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceBatchService:
+    """
+    ثبت دسته‌ای دستورهای صوتی (همگام‌سازی دستورهای ضبط‌شده‌ی آفلاین)
+    
+    همه‌ی دستورها ابتدا تجزیه می‌شوند، سپس اسناد در یک تراکنش یا در
+    تراکنش‌های chunk_size تایی ثبت می‌شوند؛ طرف حساب‌های هر دسته با یک جستجو
+    یافته یا ساخته می‌شوند.
+    
+    on_error="skip": دستور نامفهوم کنار گذاشته می‌شود؛ اگر ثبت یک دسته خطا
+    بدهد، دستورهای آن دسته یکی‌یکی دوباره ثبت می‌شوند تا فقط دستور معیوب
+    کنار برود و بقیه ثبت شوند.
+    on_error="abort": اگر دستوری نامفهوم باشد هیچ سندی ثبت نمی‌شود و خطای
+    ثبت یک دسته بقیه را متوقف می‌کند (دسته‌هایی که پیش‌تر commit شده‌اند
+    می‌مانند؛ بدون chunk_size یعنی همه یا هیچ).
+    """
+    
+    def __init__(self, db: Session, parser: VoiceService, chunk_size: Optional[int] = None,
+                 on_error: str = "skip"):
+        self.db = db
+        self.parser = parser
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+    
+    def run(self, texts: List[str]) -> schemas.VoiceBatchResponse:
+        started = time.perf_counter()
+        items = [schemas.VoiceBatchItem(index=index, text=text) for index, text in enumerate(texts)]
+        
+        parsed = []
+        for item in items:
+            item.parsed_data = self.parser.parse_voice_command(item.text)
+            if item.parsed_data['success']:
+                parsed.append(item)
+            else:
+                item.status = "failed"
+                item.error = item.parsed_data.get('error')
+        
+        if self.on_error == "abort" and len(parsed) < len(items):
+            self._skip(parsed)
+            return self._response(items, started)
+        
+        size = self.chunk_size or len(parsed) or 1
+        for start in range(0, len(parsed), size):
+            chunk = parsed[start:start + size]
+            if self._post(chunk):
+                continue
+            if self.on_error == "abort":
+                self._fail(chunk)
+                self._skip(parsed[start + size:])
+                break
+            if len(chunk) == 1:
+                self._fail(chunk)
+                continue
+            for item in chunk:
+                if not self._post([item]):
+                    self._fail([item])
+        
+        return self._response(items, started)
+    
+    def _post(self, chunk: List[schemas.VoiceBatchItem]) -> bool:
+        """ثبت یک دسته در یک تراکنش؛ در صورت خطا rollback و False"""
+        try:
+            posted = AccountingService.post_voice_entries(
+                self.db, [(item.parsed_data, item.text) for item in chunk]
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            logger.exception("posting voice batch of %d command(s) failed", len(chunk))
+            return False
+        
+        for item, (entry_id, entry_number) in zip(chunk, posted):
+            item.status = "posted"
+            item.journal_entry_id = entry_id
+            item.entry_number = entry_number
+        return True
+    
+    @staticmethod
+    def _fail(items: List[schemas.VoiceBatchItem]):
+        # جزئیات خطای پایگاه داده فقط در لاگ است
+        for item in items:
+            item.status = "failed"
+            item.error = "ثبت سند با خطا مواجه شد"
+    
+    @staticmethod
+    def _skip(items: List[schemas.VoiceBatchItem]):
+        for item in items:
+            item.status = "skipped"
+    
+    @staticmethod
+    def _response(items: List[schemas.VoiceBatchItem], started: float) -> schemas.VoiceBatchResponse:
+        counts = {"posted": 0, "failed": 0, "skipped": 0}
+        for item in items:
+            counts[item.status] += 1
+        return schemas.VoiceBatchResponse(
+            total=len(items),
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+            items=items,
+            **counts
+        )
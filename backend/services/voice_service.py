@@ -1,34 +1,116 @@
+from typing import Optional, Dict, Any, List, Tuple
 import re
-from typing import Optional, Dict, Any
-import jdatetime
+
+# ی و ک عربی و نشانه‌های نگارشی؛ بیشتر دستورها هیچ‌کدام را ندارند و از
+# translate (که برای متن غیر ASCII نویسه‌به‌نویسه کار می‌کند) معاف می‌شوند
+PUNCTUATION = '،؛:;!?؟()«»"'
+NORMALIZE = str.maketrans({'ي': 'ی', 'ك': 'ک', **{mark: ' ' for mark in PUNCTUATION}})
+NEEDS_NORMALIZE = re.compile('[يك' + re.escape(PUNCTUATION) + ']')
+
+# ارقام فارسی و عربی، ممیز و جداکننده‌ی هزارگان؛ فقط روی توکن‌های عددی اعمال می‌شود
+DIGITS = str.maketrans({
+    **{persian: str(i) for i, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(i) for i, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    '٫': '.',
+    '٬': None,
+    ',': None,
+})
+DIGIT_CHARS = frozenset('0123456789۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩')
+
+# نوع توکن‌ها در VOCAB
+NUMBER, SCALE, CURRENCY, AND, COUNTERPARTY, PURPOSE, STOP, KEYWORD, OTHER = range(9)
+
+PERSIAN_NUMBERS = {
+    'صفر': 0, 'یک': 1, 'دو': 2, 'سه': 3, 'چهار': 4, 'پنج': 5,
+    'شش': 6, 'هفت': 7, 'هشت': 8, 'نه': 9, 'ده': 10,
+    'یازده': 11, 'دوازده': 12, 'سیزده': 13, 'چهارده': 14, 'پانزده': 15,
+    'شانزده': 16, 'هفده': 17, 'هجده': 18, 'نوزده': 19, 'بیست': 20,
+    'سی': 30, 'چهل': 40, 'پنجاه': 50, 'شصت': 60, 'هفتاد': 70,
+    'هشتاد': 80, 'نود': 90, 'صد': 100, 'یکصد': 100, 'دویست': 200,
+    'سیصد': 300, 'چهارصد': 400, 'پانصد': 500, 'ششصد': 600,
+    'هفتصد': 700, 'هشتصد': 800, 'نهصد': 900,
+    'نیم': 0.5,  # «یک و نیم میلیون»
+}
+
+SCALES = {'هزار': 1_000, 'میلیون': 1_000_000, 'میلیارد': 1_000_000_000}
+
+# ضریب تبدیل به ریال
+CURRENCIES = {'ریال': 1, 'تومان': 10, 'تومن': 10}
+
+VOCAB: Dict[str, Tuple[int, Any]] = {
+    **{word: (NUMBER, float(value)) for word, value in PERSIAN_NUMBERS.items()},
+    **{word: (SCALE, float(value)) for word, value in SCALES.items()},
+    **{word: (CURRENCY, value) for word, value in CURRENCIES.items()},
+    'و': (AND, None),
+    'به': (COUNTERPARTY, None),
+    'از': (COUNTERPARTY, None),
+    # «بابت» بر «برای» مقدم است
+    'بابت': (PURPOSE, 0),
+    'برای': (PURPOSE, 1),
+    'کن': (STOP, None),
+    'کنید': (STOP, None),
+    'کردم': (STOP, None),
+    'کردیم': (STOP, None),
+    # «به مبلغ ...» طرف حساب نیست
+    'مبلغ': (STOP, None),
+}
+
+PLAIN = (OTHER, None)
+MAX_COUNTERPARTY_WORDS = 3
+
+# پسوندهای صرفی که پس از کلیدواژه‌ی داخل نام طرف حساب پذیرفته می‌شوند
+INFLECTIONS = frozenset({'', 'ها', 'های', 'هایی', 'ی', 'ای', 'م', 'یم', 'ش', 'شان'})
+
+
+class KeywordTrie:
+    """
+    درخت پیشوندی کلیدواژه‌ها
+    
+    هر توکن یک بار از ریشه پیمایش می‌شود و بلندترین کلیدواژه‌ای که پیشوند آن
+    است، همراه با باقی‌مانده‌ی توکن، برمی‌گردد؛ فقط برای توکن‌هایی که عیناً در
+    واژگان نیستند به کار می‌رود تا «پرداخت‌ها» و «خریدهای» هم پیدا شوند.
+    """
+    
+    END = ''
+    
+    def __init__(self, words: Dict[str, Any]):
+        self.root: Dict[str, Any] = {}
+        for word, value in words.items():
+            node = self.root
+            for char in word:
+                node = node.setdefault(char, {})
+            node[self.END] = value
+    
+    def match(self, token: str) -> Tuple[Optional[Any], str]:
+        node = self.root
+        found = None
+        end = 0
+        for i, char in enumerate(token):
+            node = node.get(char)
+            if node is None:
+                break
+            if self.END in node:
+                found, end = node[self.END], i + 1
+        return found, token[end:]
 
 
 class VoiceService:
     def __init__(self):
-        # الگوهای عددی فارسی
-        self.persian_numbers = {
-            'صفر': 0, 'یک': 1, 'دو': 2, 'سه': 3, 'چهار': 4, 'پنج': 5,
-            'شش': 6, 'هفت': 7, 'هشت': 8, 'نه': 9, 'ده': 10,
-            'یازده': 11, 'دوازده': 12, 'سیزده': 13, 'چهارده': 14, 'پانزده': 15,
-            'شانزده': 16, 'هفده': 17, 'هجده': 18, 'نوزده': 19, 'بیست': 20,
-            'سی': 30, 'چهل': 40, 'پنجاه': 50, 'شصت': 60, 'هفتاد': 70,
-            'هشتاد': 80, 'نود': 90, 'صد': 100, 'یکصد': 100, 'دویست': 200,
-            'سیصد': 300, 'چهارصد': 400, 'پانصد': 500, 'ششصد': 600,
-            'هفتصد': 700, 'هشتصد': 800, 'نهصد': 900
-        }
-        
-        self.amount_patterns = [
-            r'(\d+)\s*(?:هزار|تومان|ریال)',
-            r'(\d+)\s*(?:میلیون)',
-            r'(\d+[\d,]*)',
-        ]
-        
+        # به ترتیب اولویت؛ اولین دسته‌ای که در دستور باشد نوع تراکنش را تعیین می‌کند
         self.keywords = {
-            'payment': ['پرداخت', 'پرداختی', 'دادم', 'دادیم', 'پرداخته', 'کردم', 'کردیم'],
+            'payment': ['پرداخت', 'پرداختی', 'دادم', 'دادیم', 'پرداخته'],
             'receive': ['دریافت', 'دریافتی', 'گرفتم', 'گرفتیم', 'دریافته', 'آوردم'],
             'purchase': ['خرید', 'خریداری', 'خریدم'],
             'sale': ['فروش', 'فروخته', 'فروختم'],
         }
+        self.transaction_types = ['payment', 'receive', 'payment', 'receive']
+        priorities = {
+            keyword: priority
+            for priority, keywords in enumerate(self.keywords.values())
+            for keyword in keywords
+        }
+        self.trie = KeywordTrie(priorities)
+        self.vocab = {**VOCAB, **{keyword: (KEYWORD, priority) for keyword, priority in priorities.items()}}
     
     def parse_voice_command(self, text: str) -> Dict[str, Any]:
         """پردازش دستور صوتی و استخراج اطلاعات"""
@@ -44,25 +126,27 @@ class VoiceService:
             'error': None,
         }
         
-        # 1. استخراج مبلغ (ضروری)
-        amount = self._extract_amount(text)
+        normalized = text.translate(NORMALIZE) if NEEDS_NORMALIZE.search(text) else text
+        tokens = normalized.rstrip('.').split()
+        amount, priority, counterparty, purpose_at = self._scan(tokens)
+        
+        # 1. مبلغ (ضروری)
         if not amount or amount <= 0:
             result['error'] = 'مبلغ تراکنش مشخص نیست'
             return result
         
         result['amount'] = amount
         
-        # 2. تشخیص نوع تراکنش (پرداخت/دریافت)
-        transaction_type = self._detect_transaction_type(text)
+        # 2. نوع تراکنش (پرداخت/دریافت)
+        transaction_type = 'payment' if priority is None else self.transaction_types[priority]
         result['transaction_type'] = transaction_type
         
-        # 3. استخراج طرف حساب
-        counterparty = self._extract_counterparty(text)
+        # 3. طرف حساب
         if counterparty:
             result['counterparty'] = counterparty
         
-        # 4. استخراج موضوع/هدف
-        purpose = self._extract_purpose(text)
+        # 4. موضوع/هدف
+        purpose = self._read_purpose(tokens, purpose_at) if purpose_at is not None else None
         if purpose:
             result['account_name'] = purpose
         else:
@@ -72,122 +156,120 @@ class VoiceService:
             else:
                 result['account_name'] = 'درآمدهای متفرقه'
         
-        # اگر همه چیز OK بود
         result['success'] = True
         
         return result
     
-    def _extract_amount(self, text: str) -> Optional[float]:
-        """استخراج مبلغ از متن - پشتیبانی از اعداد فارسی و انگلیسی"""
-        text = text.replace('،', '').replace(',', '')
+    def _scan(self, tokens: List[str]) -> Tuple[Optional[float], Optional[int], Optional[str], Optional[int]]:
+        """
+        پیمایش یک‌باره‌ی توکن‌ها
         
-        # تبدیل اعداد فارسی به انگلیسی
-        text_converted = self._convert_persian_numbers_to_digits(text)
+        خروجی: مبلغ به ریال، اولویت کلیدواژه‌ی نوع تراکنش، طرف حساب و محل
+        شروع توضیحات پس از «بابت/برای».
         
-        # الگوهای مختلف برای استخراج مبلغ
-        patterns = [
-            # عدد + میلیون
-            r'(\d+(?:\.\d+)?)\s*میلیون',
-            # عدد + هزار
-            r'(\d+(?:\.\d+)?)\s*هزار',
-            # فقط عدد
-            r'(\d+(?:\.\d+)?)',
-        ]
+        اعداد ترکیبی مثل «دو میلیون و پانصد هزار» یا «۲ میلیون و ۵۰۰ هزار» یک
+        عبارت خوانده می‌شوند؛ اگر چند عدد در دستور باشد، اولین عددی که مقیاس
+        (هزار/میلیون) یا واحد پول دارد مبلغ است. طرف حساب حداکثر سه کلمه‌ی
+        ساده‌ی پس از اولین «به/از» است که نامی بگیرد (عددی که کلمه‌ی ساده‌ای در
+        پی دارد، مثل «سه برادران»، جزء نام است)، وگرنه دو کلمه‌ی پس از «بابت/برای».
+        """
+        vocab = self.vocab
+        match_keyword = self.trie.match
+        phrases = []  # (مقدار، مقیاس دارد، ضریب واحد پول بلافاصله پس از عدد)
+        total = current = 0.0
+        in_number = has_scale = False
+        unit = None
+        priority = None
+        counterparty: List[str] = []
+        purpose_name: List[str] = []
+        name: List[str] = []
+        name_left = 0
+        purpose_at = None
+        purpose_rank = 2
         
-        for pattern in patterns:
-            match = re.search(pattern, text_converted)
-            if match:
+        for i, token in enumerate(tokens):
+            kind, value = vocab.get(token, PLAIN)
+            if kind == OTHER and token[0] in DIGIT_CHARS:
                 try:
-                    amount = float(match.group(1))
-                    
-                    # اعمال ضریب
-                    if 'میلیون' in text:
-                        amount *= 1_000_000
-                    elif 'هزار' in text:
-                        amount *= 1_000
-                    
-                    # تبدیل تومان به ریال
-                    if 'تومان' in text:
-                        amount *= 10
-                    
-                    return amount
+                    kind, value = NUMBER, float(token.translate(DIGITS))
                 except ValueError:
-                    continue
-        
-        return None
-    
-    def _convert_persian_numbers_to_digits(self, text: str) -> str:
-        """تبدیل اعداد فارسی به رقم"""
-        result = text
+                    pass
+            
+            if kind == NUMBER:
+                # «از سه برادران»: عددی که یک کلمه‌ی ساده در پی دارد بخشی از نام است
+                if name_left and not in_number and i + 1 < len(tokens):
+                    following = tokens[i + 1]
+                    if vocab.get(following, PLAIN)[0] == OTHER and following[0] not in DIGIT_CHARS:
+                        name.append(token)
+                        name_left -= 1
+                        continue
+                current += value
+                in_number = True
+                continue
+            if kind == SCALE:
+                total += (current or 1.0) * value
+                current = 0.0
+                in_number = has_scale = True
+                continue
+            if kind == AND and in_number:
+                continue
+            
+            if in_number:
+                phrases.append((total + current, has_scale, value if kind == CURRENCY else None))
+                total = current = 0.0
+                in_number = has_scale = False
+            
+            if kind == OTHER:
+                # شکل‌های صرف‌شده‌ی کلیدواژه‌ها (پرداخت‌ها) با درخت پیشوندی
+                if priority != 0 or name_left:
+                    match, suffix = match_keyword(token)
+                    # درون نام فقط شکل صرف‌شده پذیرفته می‌شود؛ «خریدار» و «فروشگاه» بخشی از نام‌اند
+                    if match is not None and (not name_left or suffix.lstrip('\u200c') in INFLECTIONS):
+                        if priority is None or match < priority:
+                            priority = match
+                        name_left = 0
+                        continue
+                if name_left:
+                    name.append(token)
+                    name_left -= 1
+                continue
+            
+            name_left = 0
+            if kind == KEYWORD:
+                if priority is None or value < priority:
+                    priority = value
+            elif kind == CURRENCY:
+                if unit is None:
+                    unit = value
+            elif kind == COUNTERPARTY:
+                # اگر «به/از» قبلی نامی نگرفت («به مبلغ ...»)، «به/از» بعدی جای آن را می‌گیرد
+                if not counterparty:
+                    name, name_left = counterparty, MAX_COUNTERPARTY_WORDS
+            elif kind == PURPOSE:
+                if value < purpose_rank:
+                    purpose_at, purpose_rank = i + 1, value
+                    purpose_name.clear()
+                    name, name_left = purpose_name, 2
         
-        # جایگزینی اعداد فارسی
-        for word, number in sorted(self.persian_numbers.items(), key=lambda x: -len(x[0])):
-            if word in result:
-                # برای اعداد ترکیبی مثل "پانصد و پنجاه"
-                result = result.replace(word, str(number))
+        if in_number:
+            phrases.append((total + current, has_scale, None))
         
-        # حذف "و" بین اعداد و جمع آنها
-        # مثال: "500 و 50" -> "550"
-        parts = result.split()
-        cleaned_parts = []
-        i = 0
-        while i < len(parts):
-            if parts[i].isdigit():
-                num = int(parts[i])
-                # بررسی اعداد بعدی
-                while i + 2 < len(parts) and parts[i + 1] == 'و' and parts[i + 2].isdigit():
-                    num += int(parts[i + 2])
-                    i += 2
-                cleaned_parts.append(str(num))
-            else:
-                cleaned_parts.append(parts[i])
-            i += 1
+        name = ' '.join(counterparty)
+        if len(name) <= 1:
+            name = ' '.join(purpose_name)
         
-        return ' '.join(cleaned_parts)
+        amount = None
+        if phrases:
+            value, _, phrase_unit = next(
+                (phrase for phrase in phrases if phrase[1] or phrase[2]), phrases[0]
+            )
+            amount = value * (phrase_unit or unit or 1)
+        return amount, priority, name if len(name) > 1 else None, purpose_at
     
-    def _detect_transaction_type(self, text: str) -> str:
-        for trans_type, keywords in self.keywords.items():
-            if any(keyword in text for keyword in keywords):
-                if trans_type in ['payment', 'purchase']:
-                    return 'payment'
-                elif trans_type in ['receive', 'sale']:
-                    return 'receive'
-        
-        return 'payment'
-    
-    def _extract_counterparty(self, text: str) -> Optional[str]:
-        """استخراج طرف حساب (نام شخص/شرکت)"""
-        patterns = [
-            r'(?:به|از)\s+([^\s]+(?:\s+[^\s]+)?(?:\s+[^\s]+)?)',  # به/از + نام
-            r'(?:بابت|برای)\s+([^\s]+(?:\s+[^\s]+)?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                name = match.group(1).strip()
-                # حذف کلمات اضافی
-                name = name.replace('بابت', '').replace('برای', '').strip()
-                if name and len(name) > 1:
-                    return name
-        
-        return None
-    
-    def _extract_purpose(self, text: str) -> Optional[str]:
-        """استخراج موضوع/هدف تراکنش"""
-        patterns = [
-            r'بابت\s+(.+?)(?:\s*$)',  # بابت + توضیحات تا آخر
-            r'برای\s+(.+?)(?:\s*$)',  # برای + توضیحات تا آخر
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                purpose = match.group(1).strip()
-                # حذف کلمات اضافی از انتها
-                purpose = re.sub(r'\s+(به|از|کن|کنید)\s*$', '', purpose)
-                if purpose and len(purpose) > 2:
-                    return purpose
-        
-        # اگر الگوی خاصی پیدا نشد، از کل متن استفاده کن
-        return None
+    def _read_purpose(self, tokens: List[str], start: int) -> Optional[str]:
+        """توضیحات پس از «بابت/برای» تا پایان دستور، بدون «به/از/کن» انتهایی"""
+        words = tokens[start:]
+        if words and self.vocab.get(words[-1], PLAIN)[0] in (COUNTERPARTY, STOP):
+            words = words[:-1]
+        purpose = ' '.join(words)
+        return purpose if len(purpose) > 2 else None
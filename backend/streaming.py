@@ -0,0 +1,47 @@
+"""
+پاسخ‌های جریانی برای گزارش‌های بزرگ
+
+ردیف‌ها از یک generator خوانده و به صورت تکه‌تکه نوشته می‌شوند تا حافظه‌ی
+سرور مستقل از اندازه‌ی گزارش ثابت بماند.
+"""
+from typing import Iterable, Iterator
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+CHUNK_ROWS = 500
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_ndjson(items: Iterable[BaseModel]) -> Iterator[str]:
+    buffer = []
+    for item in items:
+        buffer.append(item.model_dump_json())
+        if len(buffer) >= CHUNK_ROWS:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def iter_json_array(items: Iterable[BaseModel]) -> Iterator[str]:
+    yield "["
+    buffer = []
+    first = True
+    for item in items:
+        buffer.append(item.model_dump_json())
+        if len(buffer) >= CHUNK_ROWS:
+            yield ("" if first else ",") + ",".join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ("" if first else ",") + ",".join(buffer)
+    yield "]"
+
+
+def stream_models(items: Iterable[BaseModel], format: str = "json", headers: dict = None) -> StreamingResponse:
+    body = iter_ndjson(items) if format == "ndjson" else iter_json_array(items)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,91 @@
+"""
+ذخیره‌ی جریانی فایل‌های بارگذاری‌شده
+
+فایل تکه‌تکه (UPLOAD_CHUNK_SIZE) در یک فایل موقت در پوشه‌ی staging ذخیره‌ساز
+نوشته و هم‌زمان hash می‌شود؛ با گذشتن از سقف حجم، کپی همان‌جا متوقف و فایل
+موقت پاک می‌شود. فایل کامل با کلید محتوامحور به ذخیره‌ساز سپرده می‌شود، پس
+فایل نیمه‌کاره هیچ‌وقت با کلید نهایی دیده نمی‌شود و حافظه‌ی هر بارگذاری
+مستقل از حجم فایل است.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from config import settings
+from services.blob_storage import get_blob_store
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, max_size: int):
+        super().__init__(f"حجم فایل بیش از {max_size // (1024 * 1024)} مگابایت است")
+        self.max_size = max_size
+
+
+@dataclass
+class StoredFile:
+    key: str  # کلید ذخیره‌ساز
+    path: str  # مسیر محلی برای خواندن
+    size: int
+    content_hash: str  # sha256
+
+
+def spool(stream: BinaryIO, directory: str, max_size: int) -> Tuple[str, int, str]:
+    """کپی تکه‌تکه‌ی stream در یک فایل موقت؛ خروجی (مسیر موقت، حجم، sha256)"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    try:
+        # mkstemp فایل را 0600 می‌سازد؛ همان دسترسی open() معمولی
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(max_size)
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return temp_path, size, digest.hexdigest()
+
+
+def store_stream(stream: BinaryIO, namespace: str, max_size: Optional[int] = None) -> StoredFile:
+    """ذخیره‌ی stream در ذخیره‌ساز؛ فایل تکراری دوباره نوشته نمی‌شود"""
+    store = get_blob_store()
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    
+    temp_path, size, content_hash = spool(stream, store.staging_dir, max_size)
+    try:
+        key = store.put(temp_path, namespace, content_hash)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return StoredFile(key=key, path=store.local_path(key), size=size, content_hash=content_hash)
+
+
+async def save_upload(file: UploadFile, namespace: str, max_size: Optional[int] = None) -> StoredFile:
+    """
+    ذخیره‌ی UploadFile در فضای نام namespace؛ بیش از سقف حجم 413 و خطای دیسک 500
+    
+    اگر حجم از پیش معلوم باشد (file.size) پیش از کپی رد می‌شود. خواندن و
+    نوشتن در threadpool انجام می‌شود تا حلقه‌ی رویداد بسته نماند.
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    try:
+        if file.size is not None and file.size > max_size:
+            raise UploadTooLargeError(max_size)
+        return await run_in_threadpool(store_stream, file.file, namespace, max_size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"خطا در ذخیره‌ی فایل: {str(e)}")
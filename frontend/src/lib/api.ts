@@ -97,8 +97,10 @@ export const ocrApi = {
     formData.append('file', file)
     return api.post('/ocr/process-receipt', formData, {
       headers: { 'Content-Type': 'multipart/form-data' },
+      params: { wait: 30 },
     })
   },
+  getJob: (jobId: string, wait = 0) => api.get(`/ocr/jobs/${jobId}`, { params: { wait } }),
   getReceipts: () => api.get('/ocr/receipts'),
   createEntry: (receiptId: number, data: any) => 
     api.post(`/ocr/receipts/${receiptId}/create-entry`, data),
@@ -89,7 +89,7 @@ export default function Accounts() {
       setFormData({
         name: account.name,
         account_type: account.account_type,
-        parent_id: null,
+        parent_id: account.parent_id ?? null,
       })
     }
     setShowModal(true)